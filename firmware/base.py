@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 PhysicalKeySerial = int  # p.e. LEFT_PINKY_DOWN
+PhysicalKeysMask = int  # bit (1 << pkey_serial) is set for every pressed pkey
 VirtualKeySerial = int  # p.e. LPD
 KeyGroupSerial = int  # pw. LP (left pinky), RI (right index)
 
@@ -1,4 +1,4 @@
-from base import PhysicalKeySerial
+from base import PhysicalKeySerial, PhysicalKeysMask
 from digitalio import DigitalInOut, Direction, Pull
 
 
@@ -6,6 +6,7 @@ class Button:
 
     def __init__(self, pkey_serial: PhysicalKeySerial, gp_pin):
         self._pkey_serial = pkey_serial
+        self._pkey_mask = 1 << pkey_serial
         self._digital_input = DigitalInOut(gp_pin)
         self._digital_input.direction = Direction.INPUT
         self._digital_input.pull = Pull.UP
@@ -14,5 +15,9 @@ class Button:
     def pkey_serial(self) -> PhysicalKeySerial:
         return self._pkey_serial
 
+    @property
+    def pkey_mask(self) -> PhysicalKeysMask:
+        return self._pkey_mask
+
     def is_pressed(self) -> bool:
         return not self._digital_input.value
\ No newline at end of file
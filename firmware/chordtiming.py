@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from array import array
+
+from base import TimeInMs, KeyGroupSerial
+
+
+class ChordTimingStats:
+    """ histogram of the press gaps of the chords of one key group
+
+        The learned combo term is the PERCENTILE of the gaps plus SAFETY_MARGIN (at least MIN_TERM).
+        The key group uses it, if it is smaller than KeyGroup.COMBO_TERM.
+    """
+    BIN_WIDTH = 5  # ms
+    NUM_BINS = 32  # => 0 - 160 ms
+    PERCENTILE = 95  # %
+    SAFETY_MARGIN = 15  # ms
+    MIN_TERM = 30  # ms
+    MIN_SAMPLES = 30
+    _MAX_COUNT = 0xFFFF
+
+    def __init__(self):
+        self._histogram = array('H', [0] * self.NUM_BINS)
+        self._num_new_samples = 0  # since last save
+        self._term: TimeInMs | None = None
+
+    @property
+    def term(self) -> TimeInMs | None:
+        """ None: not enough samples
+        """
+        return self._term
+
+    @property
+    def num_new_samples(self) -> int:
+        return self._num_new_samples
+
+    def record_gap(self, gap: TimeInMs) -> None:
+        """ gap: time between the first and the last press of the pkeys of a chord
+        """
+        bin_index = int(gap) // self.BIN_WIDTH
+        if bin_index >= self.NUM_BINS:
+            bin_index = self.NUM_BINS - 1
+
+        if self._histogram[bin_index] == self._MAX_COUNT:
+            self._halve_counts()  # old samples become less important
+
+        self._histogram[bin_index] += 1
+        self._num_new_samples += 1
+        self._update_term()
+
+    def _halve_counts(self) -> None:
+        for i in range(self.NUM_BINS):
+            self._histogram[i] >>= 1
+
+    def _update_term(self) -> None:
+        num_samples = 0
+        for count in self._histogram:
+            num_samples += count
+
+        if num_samples < self.MIN_SAMPLES:
+            self._term = None
+            return
+
+        count_sum = 0
+        for i in range(self.NUM_BINS):
+            count_sum += self._histogram[i]
+            if count_sum * 100 >= num_samples * self.PERCENTILE:
+                term = (i + 1) * self.BIN_WIDTH + self.SAFETY_MARGIN
+                self._term = term if term > self.MIN_TERM else self.MIN_TERM
+                return
+
+    def to_bytes(self) -> bytes:
+        data = bytearray(2 * self.NUM_BINS)
+        for i in range(self.NUM_BINS):
+            count = self._histogram[i]
+            data[2 * i] = count & 0xFF
+            data[2 * i + 1] = count >> 8
+        return bytes(data)
+
+    def load_bytes(self, data: bytes) -> None:
+        for i in range(self.NUM_BINS):
+            self._histogram[i] = data[2 * i] | (data[2 * i + 1] << 8)
+        self._num_new_samples = 0
+        self._update_term()
+
+    def mark_saved(self) -> None:
+        self._num_new_samples = 0
+
+
+class ChordTimingStore:
+    """ keeps the chord timing stats of one half in non volatile memory (p.e. microcontroller.nvm)
+
+        layout: MAGIC, number of groups, per group: group serial + histogram (uint16, little endian)
+        Writing the flash takes some ms, so it is only done after SAVE_INTERVAL new chords.
+    """
+    SAVE_INTERVAL = 50
+    _MAGIC = b'CT1'
+
+    def __init__(self, nvm, stats_map: dict[KeyGroupSerial, ChordTimingStats], offset: int = 0):
+        self._nvm = nvm
+        self._stats_map = stats_map
+        self._offset = offset
+        self._group_size = 1 + 2 * ChordTimingStats.NUM_BINS
+
+    def load(self) -> bool:
+        """ returns False, if nothing (valid) was saved before
+        """
+        header_size = len(self._MAGIC) + 1
+        header = bytes(self._nvm[self._offset:self._offset + header_size])
+        if header[:-1] != self._MAGIC or header[-1] != len(self._stats_map):
+            return False
+
+        pos = self._offset + header_size
+        for _ in range(len(self._stats_map)):
+            data = bytes(self._nvm[pos:pos + self._group_size])
+            stats = self._stats_map.get(data[0])
+            if stats is not None:
+                stats.load_bytes(data[1:])
+            pos += self._group_size
+        return True
+
+    def save_if_needed(self) -> None:
+        if any(stats.num_new_samples >= self.SAVE_INTERVAL for stats in self._stats_map.values()):
+            self.save()
+
+    def save(self) -> None:
+        data = bytearray(self._MAGIC)
+        data.append(len(self._stats_map))
+        for group_serial, stats in self._stats_map.items():
+            data.append(group_serial)
+            data.extend(stats.to_bytes())
+            stats.mark_saved()
+
+        self._nvm[self._offset:self._offset + len(data)] = data
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from base import TimeInMs
+
+
+class ClockSkewEstimator:
+    """ converts the 16 bit timestamps of the right half (ms, wrapping) into the time of the left half
+
+        Every received event gives a sample local time - remote time = skew + transfer delay.
+        The smallest sample is the best estimate of the skew, so it is taken at once. The estimate creeps
+        up by DRIFT_STEP per later sample, so it follows a drifting clock and forgets a single outlier.
+        All arithmetic is modulo 2^16, so the wrapping of the timestamps and the boot times of the halves
+        do not matter.
+    """
+    DRIFT_STEP = 1  # ms per sample
+    MAX_DELAY = 500  # ms, larger delays are not plausible -> the estimate is reset
+    _MASK = 0xFFFF
+    _HALF = 0x8000
+
+    def __init__(self):
+        self._offset: int | None = None  # (local - remote) & _MASK, None: no sample yet
+
+    @property
+    def offset(self) -> int | None:
+        return self._offset
+
+    def to_local_time(self, remote_time16: int, receive_time: TimeInMs) -> TimeInMs:
+        """ remote_time16: timestamp of the right half (int(ms) & 0xFFFF)
+            receive_time: local time, when the event was read (never before the event)
+        """
+        sample = (int(receive_time) - remote_time16) & self._MASK
+        if self._offset is None:
+            self._offset = sample
+            return receive_time
+
+        # delay above the estimated skew, signed
+        delay = ((sample - self._offset + self._HALF) & self._MASK) - self._HALF
+        if delay < 0 or delay > self.MAX_DELAY:
+            self._offset = sample  # new minimum (or lost sync)
+            return receive_time
+
+        if delay > 0:
+            self._offset = (self._offset + self.DRIFT_STEP) & self._MASK
+        return receive_time - delay
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from base import TimeInMs
+
+
+class DeadlineHeap:
+    """ min heap with at most one deadline per slot (p.e. one slot per key group)
+
+        All lists are preallocated, so set() and remove() need O(log n) and allocate nothing,
+        reading the next deadline needs O(1).
+    """
+
+    def __init__(self, capacity: int):
+        self._times: list[TimeInMs] = [0.0] * capacity  # slot -> deadline
+        self._heap: list[int] = [0] * capacity  # heap position -> slot
+        self._positions: list[int] = [-1] * capacity  # slot -> heap position, -1: no deadline
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def next_time(self) -> TimeInMs | None:
+        if self._size == 0:
+            return None
+        return self._times[self._heap[0]]
+
+    @property
+    def next_slot(self) -> int:
+        """ only valid, if the heap is not empty
+        """
+        return self._heap[0]
+
+    def get(self, slot: int) -> TimeInMs | None:
+        if self._positions[slot] < 0:
+            return None
+        return self._times[slot]
+
+    def set(self, slot: int, time: TimeInMs | None) -> None:
+        if time is None:
+            self.remove(slot)
+            return
+
+        self._times[slot] = time
+        pos = self._positions[slot]
+        if pos < 0:
+            pos = self._size
+            self._size += 1
+            self._heap[pos] = slot
+            self._positions[slot] = pos
+            self._sift_up(pos)
+        else:
+            self._sift_up(pos)
+            self._sift_down(self._positions[slot])
+
+    def remove(self, slot: int) -> None:
+        pos = self._positions[slot]
+        if pos < 0:
+            return
+
+        self._positions[slot] = -1
+        self._size -= 1
+        if pos < self._size:
+            last_slot = self._heap[self._size]
+            self._heap[pos] = last_slot
+            self._positions[last_slot] = pos
+            self._sift_up(pos)
+            self._sift_down(self._positions[last_slot])
+
+    def _is_before(self, slot1: int, slot2: int) -> bool:
+        """ same deadlines are ordered by slot
+        """
+        time1 = self._times[slot1]
+        time2 = self._times[slot2]
+        return time1 < time2 or (time1 == time2 and slot1 < slot2)
+
+    def _sift_up(self, pos: int) -> None:
+        heap = self._heap
+        slot = heap[pos]
+        while pos > 0:
+            parent_pos = (pos - 1) >> 1
+            parent_slot = heap[parent_pos]
+            if not self._is_before(slot, parent_slot):
+                break
+            heap[pos] = parent_slot
+            self._positions[parent_slot] = pos
+            pos = parent_pos
+        heap[pos] = slot
+        self._positions[slot] = pos
+
+    def _sift_down(self, pos: int) -> None:
+        heap = self._heap
+        slot = heap[pos]
+        while True:
+            child_pos = 2 * pos + 1
+            if child_pos >= self._size:
+                break
+            if child_pos + 1 < self._size and self._is_before(heap[child_pos + 1], heap[child_pos]):
+                child_pos += 1
+            child_slot = heap[child_pos]
+            if not self._is_before(child_slot, slot):
+                break
+            heap[pos] = child_slot
+            self._positions[child_slot] = pos
+            pos = child_pos
+        heap[pos] = slot
+        self._positions[slot] = pos
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from base import PhysicalKeysMask
+
+
+class DebounceMode:  # enum
+    EAGER = 0  # report the first edge at once, then ignore the bouncing pkey for DEBOUNCE_SCANS scans
+    DEFER = 1  # report an edge, after the pkey was stable for DEBOUNCE_SCANS scans
+
+
+class Debouncer:
+    """ debounces all pkeys of one half at once
+
+        Every pkey has a small counter. The counters are stored as vertical counters: bit plane i holds
+        bit i of the counters of all pkeys (bit (1 << pkey_serial) as in PhysicalKeysMask).
+        So one update handles all pkeys with a few bit operations and allocates nothing.
+    """
+    DEBOUNCE_SCANS = 5
+
+    def __init__(self, pkeys_mask: PhysicalKeysMask, mode: int = DebounceMode.EAGER, debounce_scans: int = 0):
+        self._pkeys_mask = pkeys_mask
+        self._mode = mode
+        self._debounce_scans = debounce_scans or self.DEBOUNCE_SCANS
+
+        num_planes = 0
+        while (1 << num_planes) <= self._debounce_scans:
+            num_planes += 1
+        self._counter_planes = [0] * num_planes
+
+        self._debounced_mask: PhysicalKeysMask = 0
+
+    @property
+    def pressed_pkeys_mask(self) -> PhysicalKeysMask:
+        return self._debounced_mask
+
+    def update(self, raw_pressed_pkeys_mask: PhysicalKeysMask) -> PhysicalKeysMask:
+        """ must be called once per scan, returns the debounced pressed pkeys
+        """
+        if self._mode == DebounceMode.EAGER:
+            self._update_eager(raw_pressed_pkeys_mask & self._pkeys_mask)
+        else:
+            self._update_defer(raw_pressed_pkeys_mask & self._pkeys_mask)
+
+        return self._debounced_mask
+
+    def _update_eager(self, raw_mask: PhysicalKeysMask) -> None:
+        locked_mask = self._get_running_counters_mask()
+        changed_mask = (raw_mask ^ self._debounced_mask) & ~locked_mask
+
+        if locked_mask:
+            self._decrement_counters(locked_mask)
+
+        if changed_mask:
+            self._debounced_mask ^= changed_mask
+            self._load_counters(changed_mask, self._debounce_scans)
+
+    def _update_defer(self, raw_mask: PhysicalKeysMask) -> None:
+        differing_mask = raw_mask ^ self._debounced_mask
+
+        self._load_counters(~differing_mask & self._pkeys_mask, 0)
+        if differing_mask == 0:
+            return
+
+        self._increment_counters(differing_mask)
+
+        stable_mask = self._get_counters_equal_mask(differing_mask, self._debounce_scans)
+        if stable_mask:
+            self._debounced_mask ^= stable_mask
+            self._load_counters(stable_mask, 0)
+
+    def _get_running_counters_mask(self) -> PhysicalKeysMask:
+        mask = 0
+        for plane in self._counter_planes:
+            mask |= plane
+        return mask
+
+    def _get_counters_equal_mask(self, mask: PhysicalKeysMask, value: int) -> PhysicalKeysMask:
+        planes = self._counter_planes
+        for i in range(len(planes)):
+            if value & (1 << i):
+                mask &= planes[i]
+            else:
+                mask &= ~planes[i]
+        return mask
+
+    def _load_counters(self, mask: PhysicalKeysMask, value: int) -> None:
+        planes = self._counter_planes
+        for i in range(len(planes)):
+            if value & (1 << i):
+                planes[i] |= mask
+            else:
+                planes[i] &= ~mask
+
+    def _increment_counters(self, mask: PhysicalKeysMask) -> None:
+        planes = self._counter_planes
+        carry = mask
+        for i in range(len(planes)):
+            plane = planes[i]
+            planes[i] = plane ^ carry
+            carry &= plane
+
+    def _decrement_counters(self, mask: PhysicalKeysMask) -> None:
+        planes = self._counter_planes
+        borrow = mask
+        for i in range(len(planes)):
+            plane = planes[i]
+            planes[i] = plane ^ borrow
+            borrow &= ~plane
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from base import TimeInMs
+
+
+class FixedKeyList:
+    """ ordered list of keys with a fixed capacity, all memory is allocated in the constructor
+
+        Keys are removed by mark() while iterating over the indices and compact() afterwards,
+        which moves the remaining keys forward in place. So no temporary lists are needed.
+        Optionally every entry has a time and a pressed flag (p.e. for deferred key events).
+    """
+
+    def __init__(self, capacity: int):
+        self._keys: list = [None] * capacity
+        self._times: list[TimeInMs] = [0.0] * capacity
+        self._pressed: list[bool] = [True] * capacity
+        self._marked: list[bool] = [False] * capacity
+        self._size = 0
+        self._num_marked = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int):
+        if index >= self._size:
+            raise IndexError(index)
+        return self._keys[index]
+
+    def __contains__(self, key) -> bool:
+        return self.index(key) >= 0
+
+    def get_time(self, index: int) -> TimeInMs:
+        return self._times[index]
+
+    def is_pressed(self, index: int) -> bool:
+        return self._pressed[index]
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == len(self._keys)
+
+    def index(self, key) -> int:
+        """ -1: not found
+        """
+        keys = self._keys
+        for i in range(self._size):
+            if keys[i] is key:
+                return i
+        return -1
+
+    def append(self, key, time: TimeInMs = 0.0, pressed: bool = True) -> None:
+        if self._size == len(self._keys):
+            raise IndexError('FixedKeyList is full')
+        self._keys[self._size] = key
+        self._times[self._size] = time
+        self._pressed[self._size] = pressed
+        self._size += 1
+
+    def mark(self, index: int) -> None:
+        """ the key is removed by the next compact()
+        """
+        if not self._marked[index]:
+            self._marked[index] = True
+            self._num_marked += 1
+
+    def compact(self) -> None:
+        if self._num_marked == 0:
+            return
+
+        keys = self._keys
+        marked = self._marked
+        write_index = 0
+        for read_index in range(self._size):
+            if marked[read_index]:
+                marked[read_index] = False
+            else:
+                keys[write_index] = keys[read_index]
+                self._times[write_index] = self._times[read_index]
+                self._pressed[write_index] = self._pressed[read_index]
+                write_index += 1
+
+        for i in range(write_index, self._size):
+            keys[i] = None  # no references to removed keys
+        self._size = write_index
+        self._num_marked = 0
+
+    def remove(self, key) -> None:
+        index = self.index(key)
+        if index < 0:
+            raise ValueError('key not in FixedKeyList')
+        self.mark(index)
+        self.compact()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from base import PhysicalKeysMask, TimeInMs
+from keyboardhalf import VKeyPressEvent
+
+
+class QueueItem:
+    """ the input of one or more main loop ticks, reused by InputQueue
+    """
+
+    def __init__(self):
+        # public
+        self.time: TimeInMs = 0.0
+        self.mouse_dx = 0
+        self.mouse_dy = 0
+        self.encoder_offset = 0
+        self.my_pressed_pkeys_mask: PhysicalKeysMask = 0
+        self.other_vkey_events: list[VKeyPressEvent] = []
+        self.has_key_change = False  # False: only mouse moves and time
+
+    def __str__(self) -> str:
+        return (f'QueueItem({self.time}, mouse=({self.mouse_dx}, {self.mouse_dy}), '
+                f'my-pkeys=({self.my_pressed_pkeys_mask:#x}), other-vkey={self.other_vkey_events})')
+
+
+class InputQueue:
+    """ ring buffer of QueueItems with a fixed capacity, all items are allocated in the constructor
+
+        An item without key changes (same pressed pkeys, no events of the other half) is merged into
+        the last item, its mouse moves and encoder offsets are summed. So a moving trackball does not
+        fill the queue. The time of the merged item is the latest one, unless it has key changes.
+        If the queue is full, every item is merged into the last one: the events of the other half are kept,
+        only my intermediate pressed pkeys are lost (counted in num_overflows).
+    """
+
+    def __init__(self, capacity: int):
+        self._items = [QueueItem() for _ in range(capacity)]
+        self._head = 0  # index of the first item
+        self._size = 0
+        self._last_pressed_pkeys_mask: PhysicalKeysMask = 0  # of the last pushed item
+        self._num_overflows = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def num_overflows(self) -> int:
+        return self._num_overflows
+
+    def push(self, time: TimeInMs, my_pressed_pkeys_mask: PhysicalKeysMask, mouse_dx: int, mouse_dy: int,
+             encoder_offset: int, other_vkey_events: list[VKeyPressEvent]) -> None:
+        """ other_vkey_events are copied, so the caller can reuse the list
+        """
+        is_key_change = len(other_vkey_events) > 0 or my_pressed_pkeys_mask != self._last_pressed_pkeys_mask
+        self._last_pressed_pkeys_mask = my_pressed_pkeys_mask
+
+        capacity = len(self._items)
+        if self._size > 0 and (not is_key_change or self._size == capacity):
+            item = self._items[(self._head + self._size - 1) % capacity]
+            if is_key_change:
+                self._num_overflows += 1
+                item.has_key_change = True
+            if not item.has_key_change or is_key_change:
+                item.time = time
+            item.mouse_dx += mouse_dx
+            item.mouse_dy += mouse_dy
+            item.encoder_offset += encoder_offset
+            item.my_pressed_pkeys_mask = my_pressed_pkeys_mask
+            item.other_vkey_events.extend(other_vkey_events)
+            return
+
+        item = self._items[(self._head + self._size) % capacity]
+        self._size += 1
+        item.time = time
+        item.mouse_dx = mouse_dx
+        item.mouse_dy = mouse_dy
+        item.encoder_offset = encoder_offset
+        item.my_pressed_pkeys_mask = my_pressed_pkeys_mask
+        item.other_vkey_events.clear()
+        item.other_vkey_events.extend(other_vkey_events)
+        item.has_key_change = is_key_change
+
+    def pop(self) -> QueueItem | None:
+        """ the item is valid until it is reused by push(), None: empty
+        """
+        if self._size == 0:
+            return None
+        item = self._items[self._head]
+        self._head = (self._head + 1) % len(self._items)
+        self._size -= 1
+        return item
@@ -98,6 +98,25 @@ RIGHT_KEY_GROUPS = {
 }
 
 
+# combos over several fingers of one half: combo vkey -> pkeys
+# p.e. LC1: [LEFT_THUMB_UP, LEFT_INDEX_UP]
+LEFT_COMBOS = {
+}
+
+RIGHT_COMBOS = {
+}
+
+# reactions of the combos (in all layers): combo vkey -> reaction name
+# p.e. LC1: 'Esc'
+COMBO_REACTIONS = {
+}
+
+# vkeys, which are sent at once, although they can still grow into a chord (opt-in)
+# If the chord completes, the reaction is undone (only printable chars, p.e. by Backspace).
+# p.e. {LMU, LMD, RMU, RMD}
+SPECULATIVE_VKEYS = set()
+
+
 VIRTUAL_KEYS = {
     LPU: [LEFT_PINKY_UP],
     LPM: [LEFT_PINKY_UP, LEFT_PINKY_DOWN],
@@ -183,6 +202,8 @@ LAYERS = {
     ],
 }
 
+# tap/hold keys decide by 'PermissiveHold' (default), 'HoldOnOtherKeyPress', 'TapPreferred' or 'RetroTapping'
+# p.e. LI1U: ('LShift', 'HoldOnOtherKeyPress') or in LAYERS: LTD: ([...], 'TapPreferred')
 MODIFIERS = {
     LI1U: 'LShift',
     LMU: 'LCtrl',
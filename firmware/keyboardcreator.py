@@ -1,7 +1,11 @@
+from array import array
+
 from base import KeyCode, VirtualKeySerial
 from keysdata import NO_KEY
-from virtualkeyboard import SimpleKey, ModKey, LayerKey, VirtualKeyboard
-from reactions import KeyCmdKind, KeyCmd, OneKeyReactions, MouseButtonCmd, MouseWheelCmd, MouseButtonCmdKind, LogCmd
+from virtualkeyboard import SimpleKey, ModKey, LayerKey, VirtualKeyboard, TapHoldStrategy, Layer, \
+    create_flat_layer, create_layer_tables
+from reactions import KeyCmdKind, KeyCmd, OneKeyReactions, MouseButtonCmd, MouseWheelCmd, MouseButtonCmdKind, LogCmd, \
+    ReactionCommands, ReactionCodes, DelayCmd, MacroCmd
 
 try:
     from typing import Callable, Iterator
@@ -12,8 +16,9 @@ from adafruit_hid.keycode import Keycode as KC
 from adafruit_hid.mouse import Mouse
 
 MacroName = str  # p.e. 'M3'
-MacroDescription = str
+MacroDescription = str  # p.e. 'x 50ms Enter': reaction names (tapped) and delays
 ModKeyName = str  # p.e. 'LCtrl'
+TapHoldStrategyName = str  # p.e. 'PermissiveHold'
 ReactionName = str  # p.e. 'a', '$', 'M5'
 
 
@@ -148,32 +153,68 @@ class KeyboardCreator:
         'RAlt': KC.RIGHT_ALT,
         'RGui': KC.RIGHT_GUI,
     }
+    _TAP_HOLD_STRATEGY_MAP = {
+        'HoldOnOtherKeyPress': TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS,
+        'PermissiveHold': TapHoldStrategy.PERMISSIVE_HOLD,
+        'TapPreferred': TapHoldStrategy.TAP_PREFERRED,
+        'RetroTapping': TapHoldStrategy.RETRO_TAPPING,
+    }
+    _DEAD_KEY_NAMES = {'^', '´', '`'}  # they print nothing alone, so Backspace would delete the char before
 
     def __init__(self, virtual_key_order: list[list[VirtualKeySerial]],
-                 layers: dict[VirtualKeySerial, list[ReactionName]],
-                 modifiers: dict[VirtualKeySerial, ModKeyName],
-                 macros: dict[MacroName, MacroDescription]
+                 layers: dict[VirtualKeySerial, list[str] | tuple[list[str], TapHoldStrategyName]],
+                 modifiers: dict[VirtualKeySerial, ModKeyName | tuple[ModKeyName, TapHoldStrategyName]],
+                 macros: dict[MacroName, MacroDescription],
+                 combos: dict[VirtualKeySerial, ReactionName] | None = None,
+                 combo_vkeys: set[VirtualKeySerial] | None = None,
                  ):
+        """
+            layers, modifiers: the tap/hold strategy can be given in a tuple, p.e. ('LShift', 'HoldOnOtherKeyPress')
+                               (default: 'PermissiveHold')
+            combo_vkeys: the combo vkeys of both halves (LEFT_COMBOS, RIGHT_COMBOS), each needs a reaction in combos
+                         (None: not checked)
+        """
         self._virtual_key_order = virtual_key_order
-        self._layers = layers
-        self._modifiers = modifiers
+        self._layers = {vkey_serial: self._split_strategy(value)[0] for vkey_serial, value in layers.items()}
+        self._layer_strategies = {vkey_serial: self._split_strategy(value)[1] for vkey_serial, value in layers.items()}
+        self._modifiers = {vkey_serial: self._split_strategy(value)[0] for vkey_serial, value in modifiers.items()}
+        self._modifier_strategies = {vkey_serial: self._split_strategy(value)[1]
+                                     for vkey_serial, value in modifiers.items()}
         self._macros = macros
+        self._macro_indices = {macro_name: i for i, macro_name in enumerate(macros)}
+        self._macro_codes: list[ReactionCodes] = []
+        self._combos = combos or {}
+        self._combo_vkeys = combo_vkeys
 
         self._reaction_map: dict[ReactionName, _KeyReactionData] = {}
+        # every distinct reaction is created once and shared by all layers
+        self._interned_reactions: dict[ReactionName, OneKeyReactions | None] = {}
+        self._num_reaction_cells = 0
+
+    @classmethod
+    def _split_strategy(cls, value: object) -> tuple[object, int]:
+        if isinstance(value, tuple):
+            value, strategy_name = value
+            return value, cls._TAP_HOLD_STRATEGY_MAP[strategy_name]
+        return value, TapHoldStrategy.PERMISSIVE_HOLD
 
     def create(self) -> VirtualKeyboard:
         self._reaction_map = dict(self._create_reaction_map())
+        self._interned_reactions = {}
+        self._num_reaction_cells = 0
+        self._check_combos()
 
         all_vkey_serials = {vkey_serial
                             for vkey_row in self._virtual_key_order
                             for vkey_serial in vkey_row}
 
         simple_key_serials = all_vkey_serials - set(self._modifiers.keys()) - set(self._layers.keys())
+        simple_key_serials |= set(self._combos.keys())
+        # the layers are flat lists indexed by vkey serial
+        self._num_vkeys = max(all_vkey_serials | set(self._combos.keys()) | set(self._modifiers.keys())
+                              | set(self._layers.keys())) + 1
 
-        self._macros = {
-            macro_name: self._create_macro(macro_desc)
-            for macro_name, macro_desc in self._macros.items()
-        }
+        self._macro_codes = [self._create_macro(macro_desc) for macro_desc in self._macros.values()]
 
         simple_keys = [self._create_simple_key(vkey_serial)
                        for vkey_serial in simple_key_serials]
@@ -182,13 +223,34 @@ class KeyboardCreator:
         layer_keys = [self._create_layer_key(vkey_serial, lines)
                       for vkey_serial, lines in self._layers.items() if vkey_serial != NO_KEY]
 
+        default_layer = self._create_flat_layer(self._layers[NO_KEY])
+        layer_tables = create_layer_tables(default_layer, [layer_key.layer for layer_key in layer_keys],
+                                           VirtualKeyboard.MAX_LAYER_STACK_DEPTH)
+
         return VirtualKeyboard(
             simple_keys=simple_keys,
             mod_keys= mod_keys,
             layer_keys=layer_keys,
-            default_layer=dict(self._create_layer(self._layers[NO_KEY])),
+            default_layer=default_layer,
+            layer_tables=layer_tables,
         )
 
+    def _check_combos(self) -> None:
+        if self._combo_vkeys is None:
+            return
+        missing_reactions = sorted(self._combo_vkeys - set(self._combos.keys()))
+        if missing_reactions:
+            raise ValueError(f'no reaction for the combo vkeys {missing_reactions} in combos')
+        unknown_combos = sorted(set(self._combos.keys()) - self._combo_vkeys)
+        if unknown_combos:
+            raise ValueError(f'combo vkeys {unknown_combos} are not combos of a keyboard half')
+
+    @property
+    def macro_codes(self) -> list[ReactionCodes]:
+        """ macro index -> reaction codes, played by MacroPlayer (valid after create())
+        """
+        return self._macro_codes
+
     def create_key_code_map(self) -> dict[KeyCode, str]:
         key_code_map: dict[KeyCode, str] = {}
         for reaction_name, reaction_data in self._create_reaction_map():
@@ -234,8 +296,25 @@ class KeyboardCreator:
             if de_lower_char == 'q':
                 yield '@', _KeyReactionData(key_code=key_code, with_shift=False, with_alt=True, name='@')
 
-    def _create_macro(self, macro_desc: str) -> OneKeyReactions:
-        pass  # todo: implement
+    def _create_macro(self, macro_desc: MacroDescription) -> ReactionCodes:
+        reaction_codes = array('H')
+        for item in macro_desc.split():
+            if item.endswith('ms') and item[:-2].isdigit():
+                delay = int(item[:-2])
+                while delay > 0:
+                    delay_cmd = DelayCmd(min(delay, DelayCmd.MAX_DELAY))
+                    reaction_codes.append(delay_cmd.to_code())
+                    delay -= delay_cmd.delay
+                continue
+
+            if item in self._macro_indices:
+                raise ValueError(f'macro {item} in macro {macro_desc!r}')
+            reaction = self._create_new_reaction(item)
+            if reaction is None:
+                raise ValueError(f'no reaction {item} in macro {macro_desc!r}')
+            reaction_codes.extend(reaction.on_press_reaction_codes)
+            reaction_codes.extend(reaction.on_release_reaction_codes)
+        return reaction_codes
 
     @staticmethod
     def _create_simple_key(vkey_serial: VirtualKeySerial) -> SimpleKey:
@@ -244,12 +323,15 @@ class KeyboardCreator:
     def _create_mod_key(self, vkey_serial: VirtualKeySerial, mod_key_name: ModKeyName) -> ModKey:
         mod_key_code = self._MOD_KEY_CODE_MAP[mod_key_name]
 
-        return ModKey(vkey_serial, mod_key_code=mod_key_code)
+        return ModKey(vkey_serial, mod_key_code=mod_key_code, strategy=self._modifier_strategies[vkey_serial])
 
     def _create_layer_key(self, vkey_serial: VirtualKeySerial, lines: list[str]) -> LayerKey:
-        layer = dict(self._create_layer(lines))
+        layer = self._create_flat_layer(lines)
+
+        return LayerKey(vkey_serial, layer=layer, strategy=self._layer_strategies[vkey_serial])
 
-        return LayerKey(vkey_serial, layer=layer)
+    def _create_flat_layer(self, lines: list[str]) -> Layer:
+        return create_flat_layer(dict(self._create_layer(lines)), self._num_vkeys)
 
     def _create_layer(self, lines: list[str]) -> Iterator[tuple[VirtualKeySerial, OneKeyReactions]]:
         assert len(lines) == len(self._virtual_key_order)
@@ -265,12 +347,39 @@ class KeyboardCreator:
                 if reaction:
                     yield vkey_serial, reaction
 
+        for vkey_serial, reaction_name in self._combos.items():
+            reaction = self._create_reaction(reaction_name)
+            if reaction:
+                yield vkey_serial, reaction
+
+    @property
+    def num_reaction_cells(self) -> int:
+        """ number of set reactions in all layers (without interning: number of OneKeyReactions)
+        """
+        return self._num_reaction_cells
+
+    @property
+    def num_interned_reactions(self) -> int:
+        return sum(1 for reaction in self._interned_reactions.values() if reaction is not None)
+
     def _create_reaction(self, reaction_name: ReactionName) -> OneKeyReactions | None:
+        if reaction_name in self._interned_reactions:
+            reaction = self._interned_reactions[reaction_name]
+        else:
+            reaction = self._create_new_reaction(reaction_name)
+            self._interned_reactions[reaction_name] = reaction
+
+        if reaction is not None:
+            self._num_reaction_cells += 1
+        return reaction
+
+    def _create_new_reaction(self, reaction_name: ReactionName) -> OneKeyReactions | None:
         if reaction_name == '·':
             return None  # not set
 
-        if reaction_name in self._macros:
-            return None  # todo: implement
+        if reaction_name in self._macro_indices:
+            return OneKeyReactions(on_press_key_reaction_commands=[MacroCmd(self._macro_indices[reaction_name])],
+                                   on_release_key_reaction_commands=[])
         elif reaction_name == 'MouseLeft':
             press_cmd = MouseButtonCmd(Mouse.LEFT_BUTTON, kind=MouseButtonCmdKind.MOUSE_PRESS)
             release_cmd = MouseButtonCmd(Mouse.LEFT_BUTTON, kind=MouseButtonCmdKind.MOUSE_RELEASE)
@@ -309,17 +418,31 @@ class KeyboardCreator:
         key_code = reaction_data.key_code
         press_cmd = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=key_code)
         release_cmd = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=key_code)
+        undo_cmds = self._create_undo_commands(reaction_name)
 
         if reaction_data.with_shift:
             shift_press_cmd = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.LEFT_SHIFT)
             shift_release_cmd = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.LEFT_SHIFT)
             return OneKeyReactions(on_press_key_reaction_commands=[shift_press_cmd, press_cmd],
-                                   on_release_key_reaction_commands=[release_cmd, shift_release_cmd])
+                                   on_release_key_reaction_commands=[release_cmd, shift_release_cmd],
+                                   on_undo_reaction_commands=undo_cmds)
         elif reaction_data.with_alt:
             alt_press_cmd = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.RIGHT_ALT)
             alt_release_cmd = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.RIGHT_ALT)
             return OneKeyReactions(on_press_key_reaction_commands=[alt_press_cmd, press_cmd],
-                                   on_release_key_reaction_commands=[release_cmd, alt_release_cmd])
+                                   on_release_key_reaction_commands=[release_cmd, alt_release_cmd],
+                                   on_undo_reaction_commands=undo_cmds)
         else:
             return OneKeyReactions(on_press_key_reaction_commands=[press_cmd],
-                                   on_release_key_reaction_commands=[release_cmd])
+                                   on_release_key_reaction_commands=[release_cmd],
+                                   on_undo_reaction_commands=undo_cmds)
+
+    def _create_undo_commands(self, reaction_name: ReactionName) -> ReactionCommands | None:
+        """ only printable chars can be undone safely (by Backspace)
+
+            Backspace is pressed and released, KEY_SEND (Keyboard.send()) would release all held keys.
+        """
+        if (len(reaction_name) == 1 or reaction_name == 'Space') and reaction_name not in self._DEAD_KEY_NAMES:
+            return [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.BACKSPACE),
+                    KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.BACKSPACE)]
+        return None
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 try:
-    from typing import Iterator
+    from typing import Iterable, Iterator
 except ImportError:
     pass
 
-from base import PhysicalKeySerial, TimeInMs, VirtualKeySerial, KeyGroupSerial
+from base import PhysicalKeySerial, PhysicalKeysMask, TimeInMs, VirtualKeySerial, KeyGroupSerial
+from chordtiming import ChordTimingStats
+from deadlineheap import DeadlineHeap
 
 
 # def main():
@@ -30,58 +32,270 @@ from base import PhysicalKeySerial, TimeInMs, VirtualKeySerial, KeyGroupSerial
 
 
 class KeyboardHalf:
+    """ feeds the pressed pkeys into the key groups
 
-    def __init__(self, key_groups: list[KeyGroup]):
+        Optional combos consist of pkeys of several groups (p.e. thumb + index). Pressed pkeys, which can still
+        grow into a combo, are held back from the groups until the combo is complete, COMBO_TERM has expired
+        or another key is pressed. All sub patterns of the combos are indexed in advance, so one masked
+        lookup per change is enough. Pkeys, which are not part of any combo, are not delayed at all.
+
+        Only groups, whose pkeys have changed, are updated. The pending decision times of the groups
+        are kept in a heap, so without changes nothing is done until the next decision time.
+    """
+
+    def __init__(self, key_groups: list[KeyGroup],
+                 combos: dict[VirtualKeySerial, list[PhysicalKeySerial]] | None = None):
         self._key_groups = key_groups
 
-        self._prev_pressed_pkeys: set[PhysicalKeySerial] = set()
-        self._next_decision_time: TimeInMs | None = None
+        combos = combos or {}
+        combo_serials = sorted(combos.keys())
+        self._combo_patterns = tuple(pkeys_to_mask(combos[vkey_serial]) for vkey_serial in combo_serials)
+        self._combo_pkeys_mask = pkeys_to_mask(pkey for pkeys in combos.values() for pkey in pkeys)
+        self._combo_index = self._create_combo_index(self._combo_patterns)
+        self._combo_press_events = tuple(VKeyPressEvent(vkey_serial, pressed=True) for vkey_serial in combo_serials)
+        self._combo_release_events = tuple(VKeyPressEvent(vkey_serial, pressed=False) for vkey_serial in combo_serials)
+
+        self._prev_pressed_pkeys_mask: PhysicalKeysMask = 0
+        self._prev_group_pkeys_mask: PhysicalKeysMask = 0  # pressed pkeys, which the groups have seen
+        self._pending_combo_pkeys_mask: PhysicalKeysMask = 0  # held back, cause they can grow into a combo
+        self._bound_combo_pkeys_mask: PhysicalKeysMask = 0  # used by a combo, hidden from the groups until released
+        self._pressed_combo_bits = 0  # bit i is set, if combo with index i is pressed
+        self._combo_time_of_decision: TimeInMs | None = None
+        self._pending_combo_since: TimeInMs = 0  # first press of the pending pkeys
+        self._group_decision_times = DeadlineHeap(capacity=len(key_groups))  # group index -> time of decision
+
+    @staticmethod
+    def _create_combo_index(combo_patterns: tuple[PhysicalKeysMask, ...]
+                            ) -> dict[PhysicalKeysMask, tuple[int, bool]]:
+        """ sub pattern of a combo -> (combo index or -1, can grow into a bigger combo)
+        """
+        combo_index = {}
+        for combo_pattern in combo_patterns:
+            sub_pattern = combo_pattern
+            while sub_pattern:
+                if sub_pattern not in combo_index:
+                    exact_index = combo_patterns.index(sub_pattern) if sub_pattern in combo_patterns else -1
+                    can_grow = any(sub_pattern & other == sub_pattern and sub_pattern != other
+                                   for other in combo_patterns)
+                    combo_index[sub_pattern] = (exact_index, can_grow)
+                sub_pattern = (sub_pattern - 1) & combo_pattern
+        return combo_index
+
+    @property
+    def next_decision_time(self) -> TimeInMs | None:
+        group_decision_time = self._group_decision_times.next_time
+        if self._combo_time_of_decision is None:
+            return group_decision_time
+        if group_decision_time is None or self._combo_time_of_decision < group_decision_time:
+            return self._combo_time_of_decision
+        return group_decision_time
 
     def update(self, time: TimeInMs, cur_pressed_pkeys: set[PhysicalKeySerial]) -> Iterator[VKeyPressEvent]:
-        if cur_pressed_pkeys == self._prev_pressed_pkeys:
-            if self._next_decision_time is None or self._next_decision_time > time:
+        yield from self.update_by_mask(time, pkeys_to_mask(cur_pressed_pkeys))
+
+    def update_by_mask(self, time: TimeInMs, cur_pressed_pkeys_mask: PhysicalKeysMask) -> Iterator[VKeyPressEvent]:
+        if cur_pressed_pkeys_mask == self._prev_pressed_pkeys_mask:
+            next_decision_time = self.next_decision_time
+            if next_decision_time is None or next_decision_time > time:
                 return  # too early
+
+        if self._combo_pkeys_mask == 0:
+            yield from self._update_groups(time, cur_pressed_pkeys_mask)
+        else:
+            yield from self._update_combos(time, cur_pressed_pkeys_mask)
+            yield from self._update_groups(time, cur_pressed_pkeys_mask
+                                           & ~(self._pending_combo_pkeys_mask | self._bound_combo_pkeys_mask))
+
+        self._prev_pressed_pkeys_mask = cur_pressed_pkeys_mask
+
+    def _update_groups(self, time: TimeInMs, group_pkeys_mask: PhysicalKeysMask) -> Iterator[VKeyPressEvent]:
+        changed_pkeys_mask = group_pkeys_mask ^ self._prev_group_pkeys_mask
+        self._prev_group_pkeys_mask = group_pkeys_mask
+        decision_times = self._group_decision_times
+
+        if changed_pkeys_mask == 0:
+            # only groups with an expired decision time
+            while len(decision_times) > 0 and decision_times.next_time <= time:
+                group_index = decision_times.next_slot
+                group = self._key_groups[group_index]
+                yield from group.update_by_time(time)
+                decision_times.set(group_index, group.time_of_decision)
+            return
+
+        for group_index in range(len(self._key_groups)):
+            group = self._key_groups[group_index]
+            if changed_pkeys_mask & group.pkeys_mask:
+                yield from group.update_by_mask(time, group_pkeys_mask)
             else:
-                for group in self._key_groups:
-                    yield from group.update_by_time(time)
+                time_of_decision = decision_times.get(group_index)
+                if time_of_decision is None or time_of_decision > time:
+                    continue
+                yield from group.update_by_time(time)
+
+            decision_times.set(group_index, group.time_of_decision)
+
+    def _update_combos(self, time: TimeInMs, cur_pressed_pkeys_mask: PhysicalKeysMask) -> Iterator[VKeyPressEvent]:
+        prev_pressed_pkeys_mask = self._prev_pressed_pkeys_mask
+        released_pkeys_mask = prev_pressed_pkeys_mask & ~cur_pressed_pkeys_mask
+        new_pkeys_mask = cur_pressed_pkeys_mask & ~prev_pressed_pkeys_mask
+
+        # pending combo timed out? (before the releases, its pkeys can be released in this update)
+        if self._combo_time_of_decision is not None and time >= self._combo_time_of_decision:
+            yield from self._decide_pending_combo(time)
+
+        # release pressed combos (the rest of its pkeys stays hidden until released)
+        if released_pkeys_mask & self._bound_combo_pkeys_mask:
+            for combo_index in range(len(self._combo_patterns)):
+                combo_bit = 1 << combo_index
+                if self._pressed_combo_bits & combo_bit and self._combo_patterns[combo_index] & released_pkeys_mask:
+                    yield self._combo_release_events[combo_index]
+                    self._pressed_combo_bits &= ~combo_bit
+            self._bound_combo_pkeys_mask &= cur_pressed_pkeys_mask
+
+        # pending pkeys released or a pkey pressed, which can't be part of a combo => no combo
+        if self._pending_combo_pkeys_mask and (released_pkeys_mask & self._pending_combo_pkeys_mask
+                                               or new_pkeys_mask & ~self._combo_pkeys_mask):
+            yield from self._release_pending_combo_pkeys()
+
+        new_combo_pkeys_mask = new_pkeys_mask & self._combo_pkeys_mask
+        if new_combo_pkeys_mask == 0:
+            return
+
+        pattern = self._pending_combo_pkeys_mask | new_combo_pkeys_mask
+        combo_index, can_grow = self._combo_index.get(pattern, _NO_COMBO)
+        if can_grow:
+            # undecided
+            if self._pending_combo_pkeys_mask == 0:
+                self._combo_time_of_decision = time + KeyGroup.COMBO_TERM
+                self._pending_combo_since = time
+            self._pending_combo_pkeys_mask = pattern
+        elif combo_index >= 0:
+            # combo detected
+            self._pending_combo_pkeys_mask = pattern
+            yield from self._decide_pending_combo(time)
         else:
-            for group in self._key_groups:
-                yield from group.update(time, cur_pressed_pkeys)
+            # no combo possible: the new pkeys go to the groups at once
+            yield from self._release_pending_combo_pkeys()
 
-            self._prev_pressed_pkeys = cur_pressed_pkeys.copy()
+    def _decide_pending_combo(self, time: TimeInMs) -> Iterator[VKeyPressEvent]:
+        combo_index, _ = self._combo_index.get(self._pending_combo_pkeys_mask, _NO_COMBO)
+        if combo_index < 0:
+            yield from self._release_pending_combo_pkeys()
+            return
 
-        self._next_decision_time = min((group.time_of_decision
-                                        for group in self._key_groups
-                                        if group.time_of_decision is not None),
-                                       default=None)
+        yield self._combo_press_events[combo_index]
+        self._pressed_combo_bits |= 1 << combo_index
+        self._bound_combo_pkeys_mask |= self._pending_combo_pkeys_mask
+        self._pending_combo_pkeys_mask = 0
+        self._combo_time_of_decision = None
+
+    def _release_pending_combo_pkeys(self) -> Iterator[VKeyPressEvent]:
+        """ the held back pkeys are passed to the groups - as they were pressed before all other changes,
+            at the time of their first press (so the groups do not wait COMBO_TERM a second time)
+        """
+        pending_combo_pkeys_mask = self._pending_combo_pkeys_mask
+        if pending_combo_pkeys_mask == 0:
+            return
+        self._pending_combo_pkeys_mask = 0
+        self._combo_time_of_decision = None
+
+        yield from self._update_groups(self._pending_combo_since,
+                                       self._prev_group_pkeys_mask | pending_combo_pkeys_mask)
+
+
+_NO_COMBO = (-1, False)
+
+
+def pkeys_to_mask(pkeys: Iterable[PhysicalKeySerial]) -> PhysicalKeysMask:
+    mask = 0
+    for pkey in pkeys:
+        mask |= 1 << pkey
+    return mask
+
+
+def _count_bits(value: int) -> int:
+    n = 0
+    while value:
+        value &= value - 1
+        n += 1
+    return n
 
 
 class VKeyPressEvent:
+    """ speculative press: the vkey can still grow into a chord
+                              -> later a normal press (confirmation) or a speculative release (rollback) follows
+        time: time of the event in the clock of the left half (None: events_time of VirtualKeyboard.update())
+    """
 
-    def __init__(self, vkey_serial: VirtualKeySerial, pressed: bool):
+    def __init__(self, vkey_serial: VirtualKeySerial, pressed: bool, speculative: bool = False,
+                 time: TimeInMs | None = None):
         # public
         self.vkey_serial = vkey_serial
         self.pressed = pressed
+        self.speculative = speculative
+        self.time = time
 
 
 class KeyGroup:
+    """ recognizes the vkeys of one finger
+
+        The pkeys of a group are compiled to bit indices, so the pressed pkeys of this group are a small int
+        (called pattern here). All lookups are done in tables indexed by pattern or vkey index,
+        so update() and update_by_time() work only on ints and allocate nothing (beside the generator).
+
+        Every pattern of unbound pressed pkeys is split in advance into the best set of disjoint vkeys
+        (most pkeys covered, then fewest vkeys). So several vkeys of a group can be pressed or undecided at once.
+        Like the combos, the press of another vkey decides the undecided vkeys, so the vkeys are sent in press order.
+        Every undecided vkey times out COMBO_TERM after the first press of its pkeys, later presses do not postpone it.
+
+        With chord_stats the group records the press gaps of its chords and waits only for the learned
+        combo term (never longer than COMBO_TERM).
+
+        Undecided speculative_vkeys are sent at once as speculative press. If they grow into a chord,
+        they are rolled back, else the normal press confirms them.
+    """
     COMBO_TERM = 100  # ms
 
-    def __init__(self, serial: KeyGroupSerial, vkey_map: dict[VirtualKeySerial, list[PhysicalKeySerial]]):
+    def __init__(self, serial: KeyGroupSerial, vkey_map: dict[VirtualKeySerial, list[PhysicalKeySerial]],
+                 chord_stats: ChordTimingStats | None = None,
+                 speculative_vkeys: set[VirtualKeySerial] | None = None):
         # static
         self._serial = serial
-        self._pkeys_of_this_group = frozenset(self._iter_group_pkeys(vkey_map))
-        self._vkey2pkeys = { vkey: frozenset(pkeys) for vkey, pkeys in vkey_map.items()}
-        self._pkeys2vkeys = { frozenset(pkeys): vkey for vkey, pkeys in vkey_map.items()}
-        self._is_vkey_part_of_bigger_one_map = self._create_is_part_of_bigger_one_map(vkey_map)
+        group_pkeys = sorted(set(self._iter_group_pkeys(vkey_map)))
+        self._pkeys_mask = pkeys_to_mask(group_pkeys)
+        self._pkey_bits = tuple((1 << pkey, 1 << i) for i, pkey in enumerate(group_pkeys))  # (mask bit, pattern bit)
+
+        vkey_serials = sorted(vkey_map.keys())  # vkey index -> vkey serial
+        self._vkey_patterns = tuple(self._to_pattern(pkeys_to_mask(vkey_map[vkey_serial]))
+                                    for vkey_serial in vkey_serials)
+        self._decided_vkeys_table, self._undecided_vkeys_table = \
+            self._create_decomposition_tables(self._vkey_patterns, len(group_pkeys))
+        self._press_events = tuple(VKeyPressEvent(vkey_serial, pressed=True) for vkey_serial in vkey_serials)
+        self._release_events = tuple(VKeyPressEvent(vkey_serial, pressed=False) for vkey_serial in vkey_serials)
+        self._speculative_press_events = tuple(VKeyPressEvent(vkey_serial, pressed=True, speculative=True)
+                                               for vkey_serial in vkey_serials)
+        self._rollback_events = tuple(VKeyPressEvent(vkey_serial, pressed=False, speculative=True)
+                                      for vkey_serial in vkey_serials)
+        speculative_vkeys = speculative_vkeys or set()
+        self._speculative_vkey_bits = sum(1 << vkey_index for vkey_index, vkey_serial in enumerate(vkey_serials)
+                                          if vkey_serial in speculative_vkeys)
+        self._chord_vkey_bits = sum(1 << vkey_index for vkey_index, pattern in enumerate(self._vkey_patterns)
+                                    if _count_bits(pattern) > 1)
+        self._chord_stats = chord_stats
 
         # dynamic
-        self._prev_pressed_pkeys: set[PhysicalKeySerial] = set()
-        self._bound_pkeys: set[PhysicalKeySerial] = set()
+        self._prev_pattern = 0
+        self._bound_pattern = 0
+
+        self._pressed_vkey_bits = 0  # bit i is set, if vkey with index i is pressed
+        self._undecided_vkey_bits = 0  # bit i is set, if vkey with index i is undecided
+        self._speculated_vkey_bits = 0  # undecided vkeys, whose speculative press was sent
+        self._time_of_decision: TimeInMs | None = None  # if undecided vkeys exist
+        self._undecided_since_times: list[TimeInMs] = [0] * len(vkey_serials)  # vkey index -> first press
 
-        self._pressed_vkeys: set[VirtualKeySerial] = set()
-        self._undecided_vkey: VirtualKeySerial | None = None  # pressed or undecided
-        self._time_of_decision: TimeInMs | None = None  # if open_vkey is undecided
+        # only with chord_stats: unbound pkeys pressed, when the undecided vkeys timed out
+        self._timed_out_pattern = 0
+        self._timed_out_since: TimeInMs = 0
 
     @staticmethod
     def _iter_group_pkeys(vkey_map: dict[VirtualKeySerial, list[PhysicalKeySerial]]
@@ -89,109 +303,276 @@ class KeyGroup:
         for pkeys in vkey_map.values():
             yield from pkeys
 
+    @classmethod
+    def _create_decomposition_tables(cls, vkey_patterns: tuple[int, ...], num_pkeys: int
+                                     ) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        """ pattern of unbound pressed pkeys -> vkey bits to press at once, vkey bits which are undecided
+
+            A vkey of the decomposition is undecided, if it can still grow into a bigger vkey,
+            i.e. the additional pkeys of the bigger vkey are not pressed yet.
+        """
+        decided_table = []
+        undecided_table = []
+
+        for pattern in range(1 << num_pkeys):
+            vkey_bits = cls._find_best_decomposition(vkey_patterns, pattern)
+            undecided_bits = 0
+            for vkey_index, vkey_pattern in enumerate(vkey_patterns):
+                if vkey_bits & (1 << vkey_index) and any(other & vkey_pattern == vkey_pattern
+                                                         and other != vkey_pattern
+                                                         and other & pattern == vkey_pattern
+                                                         for other in vkey_patterns):
+                    undecided_bits |= 1 << vkey_index
+
+            decided_table.append(vkey_bits & ~undecided_bits)
+            undecided_table.append(undecided_bits)
+
+        return tuple(decided_table), tuple(undecided_table)
+
     @staticmethod
-    def _create_is_part_of_bigger_one_map(vkey_map: dict[VirtualKeySerial, list[PhysicalKeySerial]]
-                                          ) -> dict[VirtualKeySerial, bool]:
-        vkey2pkeys = {vkey: frozenset(pkey_list) for vkey, pkey_list in vkey_map.items()}
-        return {
-            vkey: any(pkeys_set < other_set for other_set in vkey2pkeys.values())
-            for vkey, pkeys_set in vkey2pkeys.items()
-        }
+    def _find_best_decomposition(vkey_patterns: tuple[int, ...], pattern: int) -> int:
+        best_vkey_bits = 0
+        best_score = (0, 0)
+
+        for vkey_bits in range(1, 1 << len(vkey_patterns)):
+            covered = 0
+            num_vkeys = 0
+            for vkey_index, vkey_pattern in enumerate(vkey_patterns):
+                if vkey_bits & (1 << vkey_index):
+                    if vkey_pattern & covered or vkey_pattern & ~pattern:
+                        break  # not disjoint or not pressed
+                    covered |= vkey_pattern
+                    num_vkeys += 1
+            else:
+                score = (_count_bits(covered), -num_vkeys)
+                if score > best_score:
+                    best_vkey_bits = vkey_bits
+                    best_score = score
+
+        return best_vkey_bits
 
     @property
     def serial(self) -> KeyGroupSerial:
         return self._serial
 
+    @property
+    def pkeys_mask(self) -> PhysicalKeysMask:
+        return self._pkeys_mask
+
     @property
     def time_of_decision(self) -> TimeInMs | None:
         return self._time_of_decision
 
+    @property
+    def combo_term(self) -> TimeInMs:
+        if self._chord_stats is not None:
+            learned_term = self._chord_stats.term
+            if learned_term is not None and learned_term < self.COMBO_TERM:
+                return learned_term
+        return self.COMBO_TERM
+
     def update(self, time: TimeInMs, all_pressed_pkeys: set[PhysicalKeySerial]) -> Iterator[VKeyPressEvent]:
         """
             all_pressed_pkeys: this can contain pkeys of other groups
         """
-        cur_pressed_pkeys = frozenset(all_pressed_pkeys & self._pkeys_of_this_group)
+        yield from self.update_by_mask(time, pkeys_to_mask(all_pressed_pkeys))
+
+    def update_by_mask(self, time: TimeInMs, all_pressed_pkeys_mask: PhysicalKeysMask) -> Iterator[VKeyPressEvent]:
+        """
+            all_pressed_pkeys_mask: this can contain pkeys of other groups
+        """
+        cur_pattern = self._to_pattern(all_pressed_pkeys_mask)
+        prev_pattern = self._prev_pattern
 
-        if cur_pressed_pkeys == self._prev_pressed_pkeys:
+        if cur_pattern == prev_pattern:
             yield from self.update_by_time(time)
 
         else:  # pressed pkeys has changed
-            if self._prev_pressed_pkeys < cur_pressed_pkeys:
-                yield from self._update_with_press(time, cur_pressed_pkeys)
-            elif cur_pressed_pkeys < self._prev_pressed_pkeys:
-                yield from self._update_with_release(time, cur_pressed_pkeys)
+            if prev_pattern & ~cur_pattern == 0:  # prev < cur
+                yield from self._update_with_press(time, cur_pattern)
+            elif cur_pattern & ~prev_pattern == 0:  # cur < prev
+                yield from self._update_with_release(time, cur_pattern)
             else:
-                yield from self._update_with_press_and_release(time, cur_pressed_pkeys)
+                yield from self._update_with_press_and_release(time, cur_pattern)
+
+            self._prev_pattern = cur_pattern
 
-            self._prev_pressed_pkeys = cur_pressed_pkeys
+    def _to_pattern(self, pkeys_mask: PhysicalKeysMask) -> int:
+        pattern = 0
+        for mask_bit, pattern_bit in self._pkey_bits:
+            if pkeys_mask & mask_bit:
+                pattern |= pattern_bit
+        return pattern
 
     def update_by_time(self, time: TimeInMs) -> Iterator[VKeyPressEvent]:
         if self._time_of_decision is None or time < self._time_of_decision:
             return  # too early
 
-        # decided: press now
-        if self._undecided_vkey is None:
-            self._time_of_decision = None  # ERROR => fix it
-            return
-
-        yield VKeyPressEvent(self._undecided_vkey, pressed=True)
-        self._bound_pkeys |= self._vkey2pkeys[self._undecided_vkey]
-        self._pressed_vkeys.add(self._undecided_vkey)
-        self._undecided_vkey = None
-        self._time_of_decision = None
-
-    def _update_with_press(self, time: TimeInMs, cur_pressed_pkeys: frozenset[PhysicalKeySerial]) -> Iterator[VKeyPressEvent]:
+        # decided: press the timed out vkeys now, the later pressed ones keep their own term
+        combo_term = self.combo_term
+        timed_out_vkey_bits = 0
+        timed_out_pattern = 0
+        timed_out_since = time
+        for vkey_index in range(len(self._vkey_patterns)):
+            since = self._undecided_since_times[vkey_index]
+            if self._undecided_vkey_bits & (1 << vkey_index) and time - since >= combo_term:
+                timed_out_vkey_bits |= 1 << vkey_index
+                timed_out_pattern |= self._vkey_patterns[vkey_index]
+                if since < timed_out_since:
+                    timed_out_since = since
+        self._undecided_vkey_bits &= ~timed_out_vkey_bits
+        self._time_of_decision = self._get_time_of_decision()
+
+        if self._chord_stats is not None and timed_out_vkey_bits:
+            self._timed_out_pattern = timed_out_pattern
+            self._timed_out_since = timed_out_since
+
+        yield from self._press_vkeys(timed_out_vkey_bits)
+
+    def _get_time_of_decision(self) -> TimeInMs | None:
+        first_since = self._get_first_press_time(self._undecided_vkey_bits)
+        if first_since is None:
+            return None
+        return first_since + self.combo_term
+
+    def _get_first_press_time(self, vkey_bits: int, pattern: int = -1) -> TimeInMs | None:
+        """ the first press of the undecided vkeys in vkey_bits, which overlap pattern (None: no such vkey)
+        """
+        first_since = None
+        for vkey_index in range(len(self._vkey_patterns)):
+            if vkey_bits & (1 << vkey_index) and self._vkey_patterns[vkey_index] & pattern:
+                since = self._undecided_since_times[vkey_index]
+                if first_since is None or since < first_since:
+                    first_since = since
+        return first_since
+
+    def _update_with_press(self, time: TimeInMs, cur_pattern: int) -> Iterator[VKeyPressEvent]:
         # undecided timed out?
         yield from self.update_by_time(time)
 
-        unbound_pressed_pkeys = frozenset(cur_pressed_pkeys - self._bound_pkeys)
+        unbound_pressed_pattern = cur_pattern & ~self._bound_pattern
+        decided_vkey_bits = self._decided_vkeys_table[unbound_pressed_pattern]
 
-        vkey_serial = self._pkeys2vkeys.get(unbound_pressed_pkeys)  # !! only recognize one vkey-press at a time !!
-        if vkey_serial is None:
-            self._undecided_vkey = None
-            self._time_of_decision = None
-            return
+        if self._chord_stats is not None:
+            self._record_chord_gaps(time, cur_pattern, decided_vkey_bits)
 
-        if self._is_vkey_part_of_bigger_one_map.get(vkey_serial, False):
-            # undecided
-            self._undecided_vkey = vkey_serial
-            self._time_of_decision = time + self.COMBO_TERM
+        undecided_vkey_bits = self._undecided_vkeys_table[unbound_pressed_pattern]
+        if undecided_vkey_bits and decided_vkey_bits:
+            # another vkey is pressed: the undecided vkeys were pressed before (or at once) -> decided first
+            first_vkey_bits = undecided_vkey_bits
+            undecided_vkey_bits = 0
         else:
-            # press detected
-            yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=True)
-            self._bound_pkeys |= unbound_pressed_pkeys
-            self._pressed_vkeys.add(vkey_serial)
-            self._undecided_vkey = None
-            self._time_of_decision = None
+            first_vkey_bits = 0
+
+        # the undecided vkeys keep the first press of their pkeys, so rolling presses do not postpone them
+        new_undecided_vkey_bits = undecided_vkey_bits & ~self._undecided_vkey_bits
+        if new_undecided_vkey_bits:
+            for vkey_index in range(len(self._vkey_patterns)):
+                if new_undecided_vkey_bits & (1 << vkey_index):
+                    since = self._get_first_press_time(self._undecided_vkey_bits, self._vkey_patterns[vkey_index])
+                    self._undecided_since_times[vkey_index] = time if since is None else since
+        self._undecided_vkey_bits = undecided_vkey_bits
+        self._time_of_decision = self._get_time_of_decision()
+
+        # grown into a chord: roll back
+        if self._speculated_vkey_bits:
+            yield from self._roll_back_vkeys(self._speculated_vkey_bits
+                                             & ~(first_vkey_bits | decided_vkey_bits | undecided_vkey_bits))
+
+        # press detected (in press order)
+        yield from self._press_vkeys(first_vkey_bits)
+        yield from self._press_vkeys(decided_vkey_bits)
+
+        # speculate
+        speculate_vkey_bits = undecided_vkey_bits & self._speculative_vkey_bits & ~self._speculated_vkey_bits
+        if speculate_vkey_bits:
+            for vkey_index in range(len(self._vkey_patterns)):
+                if speculate_vkey_bits & (1 << vkey_index):
+                    yield self._speculative_press_events[vkey_index]
+            self._speculated_vkey_bits |= speculate_vkey_bits
+
+    def _roll_back_vkeys(self, vkey_bits: int) -> Iterator[VKeyPressEvent]:
+        if vkey_bits == 0:
+            return
+
+        for vkey_index in range(len(self._vkey_patterns)):
+            if vkey_bits & (1 << vkey_index):
+                yield self._rollback_events[vkey_index]
+        self._speculated_vkey_bits &= ~vkey_bits
+
+    def _record_chord_gaps(self, time: TimeInMs, cur_pattern: int, decided_vkey_bits: int) -> None:
+        """ chord_stats learns from
+            - every chord pressed now: the gap to the first press of the undecided vkeys (0: pressed in one scan)
+            - a chord missed because the learned term timed out, but COMBO_TERM would have caught it
+        """
+        decided_chord_bits = decided_vkey_bits & self._chord_vkey_bits
+        if decided_chord_bits:
+            for vkey_index in range(len(self._vkey_patterns)):
+                if decided_chord_bits & (1 << vkey_index):
+                    since = self._get_first_press_time(self._undecided_vkey_bits, self._vkey_patterns[vkey_index])
+                    self._chord_stats.record_gap(0 if since is None else time - since)
+
+        timed_out_pattern = self._timed_out_pattern
+        if timed_out_pattern:
+            self._timed_out_pattern = 0
+            gap = time - self._timed_out_since
+            if gap <= self.COMBO_TERM:
+                new_pattern = cur_pattern & ~self._prev_pattern
+                missed_pattern = timed_out_pattern | new_pattern
+                for vkey_index in range(len(self._vkey_patterns)):
+                    pattern = self._vkey_patterns[vkey_index]
+                    if (self._chord_vkey_bits & (1 << vkey_index) and pattern & timed_out_pattern
+                            and pattern & new_pattern and pattern & ~missed_pattern == 0):
+                        self._chord_stats.record_gap(gap)
+                        break
+
+    def _press_vkeys(self, vkey_bits: int) -> Iterator[VKeyPressEvent]:
+        """ for speculated vkeys this is the confirmation
+        """
+        if vkey_bits == 0:
+            return
+
+        self._speculated_vkey_bits &= ~vkey_bits
+
+        for vkey_index in range(len(self._vkey_patterns)):
+            vkey_bit = 1 << vkey_index
+            if vkey_bits & vkey_bit:
+                yield self._press_events[vkey_index]
+                self._bound_pattern |= self._vkey_patterns[vkey_index]
+                self._pressed_vkey_bits |= vkey_bit
 
-    def _update_with_release(self, time: TimeInMs, cur_pressed_pkeys: frozenset[PhysicalKeySerial]
-                             ) -> Iterator[VKeyPressEvent]:
-        released_pkeys = self._prev_pressed_pkeys - cur_pressed_pkeys
+    def _update_with_release(self, time: TimeInMs, cur_pattern: int) -> Iterator[VKeyPressEvent]:
+        released_pattern = self._prev_pattern & ~cur_pattern
+        self._timed_out_pattern &= cur_pattern
 
         # release pressed keys...
-        for vkey_serial in self._pressed_vkeys.copy():
-            pkeys = self._vkey2pkeys[vkey_serial]
-            if (pkeys & released_pkeys) != frozenset():
-                yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=False)
-                self._bound_pkeys -= self._vkey2pkeys[vkey_serial]
-                self._pressed_vkeys.remove(vkey_serial)
-
-        # release undecided key ...
-        if self._undecided_vkey:
-            vkey_serial = self._undecided_vkey
-            pkeys = self._vkey2pkeys[vkey_serial]
-            if (pkeys & released_pkeys) != frozenset():
-                yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=True)
-                yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=False)
-                self._undecided_vkey = None
-                self._time_of_decision = None
-            else:
-                yield from self.update_by_time(time)
+        if self._pressed_vkey_bits != 0:
+            for vkey_index in range(len(self._vkey_patterns)):
+                vkey_bit = 1 << vkey_index
+                pattern = self._vkey_patterns[vkey_index]
+                if self._pressed_vkey_bits & vkey_bit and pattern & released_pattern:
+                    yield self._release_events[vkey_index]
+                    self._bound_pattern &= ~pattern
+                    self._pressed_vkey_bits &= ~vkey_bit
+
+        # release undecided keys ...
+        if self._undecided_vkey_bits != 0:
+            for vkey_index in range(len(self._vkey_patterns)):
+                vkey_bit = 1 << vkey_index
+                if self._undecided_vkey_bits & vkey_bit and self._vkey_patterns[vkey_index] & released_pattern:
+                    yield self._press_events[vkey_index]
+                    yield self._release_events[vkey_index]
+                    self._undecided_vkey_bits &= ~vkey_bit
+                    self._speculated_vkey_bits &= ~vkey_bit
+
+            self._time_of_decision = self._get_time_of_decision()
+            if self._undecided_vkey_bits == 0:
+                return
+
+        yield from self.update_by_time(time)
 
-    def _update_with_press_and_release(self, time: TimeInMs, cur_pressed_pkeys: frozenset[PhysicalKeySerial]
-                                       ) -> Iterator[VKeyPressEvent]:
+    def _update_with_press_and_release(self, time: TimeInMs, cur_pattern: int) -> Iterator[VKeyPressEvent]:
         """ This is VERY unusual - the reaction can change later maybe
         """
-        yield from self._update_with_release(time, cur_pressed_pkeys)
-        yield from self._update_with_press(time, cur_pressed_pkeys)
-
+        yield from self._update_with_release(time, cur_pattern)
+        yield from self._update_with_press(time, cur_pattern)
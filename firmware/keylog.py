@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from array import array
+
+from base import KeyCode, TimeInMs
+from keyboardhalf import VKeyPressEvent
+from keysdata import VKEY_NAMES
+from reactions import Opcode, ReactionCode
+
+try:
+    from typing import Iterator
+except ImportError:
+    pass
+
+
+class KeyLogKind:  # enum
+    TICK = 0  # starts the entries of one main loop tick
+    MY_VKEY_EVENT = 1  # value: vkey serial << 2 | pressed << 1 | speculative
+    OTHER_VKEY_EVENT = 2
+    REACTION = 3  # value: reaction code
+
+
+class KeyLog:
+    """ ring buffer of the last key events and reactions for the diagnostic dump (s. the Log reaction)
+
+        Every entry is packed into two 16 bit ints (time & 0xFFFF and kind << 14 | value) and written in place,
+        so logging allocates nothing (all ints stay small ints on the device). The LogItems are created only by iter_log_items(), when the log is sent.
+        If the ring is full, the oldest entries are overwritten.
+    """
+
+    def __init__(self, capacity: int):
+        self._times = array('H', (0 for _ in range(capacity)))
+        self._entries = array('H', (0 for _ in range(capacity)))  # kind << 14 | value
+        self._next = 0  # index of the next entry
+        self._size = 0
+        self._time = 0  # of the current tick
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_tick(self, time: TimeInMs) -> None:
+        self._time = int(time) & 0xFFFF
+        self._add(KeyLogKind.TICK, 0)
+
+    def add_vkey_events(self, kind: int, vkey_events: list[VKeyPressEvent]) -> None:
+        for vkey_event in vkey_events:
+            self._add(kind, vkey_event.vkey_serial << 2 | vkey_event.pressed << 1 | vkey_event.speculative)
+
+    def add_reaction_codes(self, reaction_codes: list[ReactionCode]) -> None:
+        for reaction_code in reaction_codes:
+            self._add(KeyLogKind.REACTION, reaction_code)
+
+    def _add(self, kind: int, value: int) -> None:
+        self._times[self._next] = self._time
+        self._entries[self._next] = kind << 14 | (value & 0x3FFF)
+        self._next = (self._next + 1) % len(self._entries)
+        if self._size < len(self._entries):
+            self._size += 1
+
+    def iter_log_items(self, num_skipped_ticks: int = 0) -> Iterator[LogItem]:
+        """ oldest first, the last num_skipped_ticks ticks are left out (the time of a LogItem wraps every 65 s)
+        """
+        num_ticks = sum(1 for i in self._iter_indices() if self._entries[i] >> 14 == KeyLogKind.TICK)
+        num_ticks -= num_skipped_ticks
+        log_item = None
+        for i in self._iter_indices():
+            entry = self._entries[i]
+            kind = entry >> 14
+            value = entry & 0x3FFF
+            if kind == KeyLogKind.TICK:
+                if log_item is not None:
+                    yield log_item
+                if num_ticks <= 0:
+                    return
+                num_ticks -= 1
+                log_item = LogItem(time_=self._times[i], my_vkey_events=[], other_vkey_events=[], reaction_codes=[])
+            elif log_item is None:
+                continue  # the tick of this entry is overwritten
+            elif kind == KeyLogKind.REACTION:
+                log_item.reaction_codes.append(value)
+            else:
+                vkey_event = VKeyPressEvent(value >> 2, pressed=bool(value & 0x2), speculative=bool(value & 0x1))
+                if kind == KeyLogKind.MY_VKEY_EVENT:
+                    log_item.my_vkey_events.append(vkey_event)
+                else:
+                    log_item.other_vkey_events.append(vkey_event)
+        if log_item is not None:
+            yield log_item
+
+    def _iter_indices(self) -> Iterator[int]:
+        """ oldest first
+        """
+        capacity = len(self._entries)
+        start = (self._next - self._size) % capacity
+        for i in range(self._size):
+            yield (start + i) % capacity
+
+
+class LogItem:
+
+    def __init__(self, time_: TimeInMs, my_vkey_events: list[VKeyPressEvent], other_vkey_events: list[VKeyPressEvent],
+                 reaction_codes: list[ReactionCode]):
+        self._time = time_
+        self._my_vkey_events = my_vkey_events
+        self._other_vkey_events = other_vkey_events
+        self._reaction_codes = reaction_codes
+
+    @property
+    def time(self) -> TimeInMs:
+        return self._time
+
+    @property
+    def my_vkey_events(self) -> list[VKeyPressEvent]:
+        return self._my_vkey_events
+
+    @property
+    def other_vkey_events(self) -> list[VKeyPressEvent]:
+        return self._other_vkey_events
+
+    @property
+    def reaction_codes(self) -> list[ReactionCode]:
+        return self._reaction_codes
+
+
+class LogItemDumper:
+
+    def __init__(self, key_code_map: dict[KeyCode, str]):
+        self._key_code_map = key_code_map
+
+    def dump(self, log_item: LogItem) -> str:
+        return ', '.join(self._iter_str_parts(log_item))
+
+    def _iter_str_parts(self, log_item: LogItem) -> Iterator[str]:
+        yield f'{int(log_item.time)}: '
+
+        yield ', '.join(self._iter_vkey_parts(log_item))
+
+        if len(log_item.reaction_codes) > 0:
+            reaction_str = ', '.join(self._create_reaction_str(reaction_code)
+                                     for reaction_code in log_item.reaction_codes)
+            yield ' -> [' + reaction_str + ']'
+
+    def _iter_vkey_parts(self, log_item: LogItem) -> Iterator[str]:
+        if len(log_item.other_vkey_events) > 0:
+            other_str = self._create_vkey_events_str(log_item.other_vkey_events)
+            yield f'other={other_str}'
+
+        if len(log_item.my_vkey_events) > 0:
+            self_str = self._create_vkey_events_str(log_item.my_vkey_events)
+            yield f'self={self_str}'
+
+    def _create_vkey_events_str(self, vkey_events: list[VKeyPressEvent]) -> str:
+        return '[' + ', '.join(self._create_vkey_event_str(vkey_event) for vkey_event in vkey_events) + ']'
+
+    @staticmethod
+    def _create_vkey_event_str(vkey_event: VKeyPressEvent) -> str:
+        if vkey_event.speculative:
+            prefix = '?' if vkey_event.pressed else '~'  # speculative press, rollback
+        else:
+            prefix = '+' if vkey_event.pressed else '-'
+        vkey_name = VKEY_NAMES[vkey_event.vkey_serial].lower()
+        return prefix + vkey_name
+
+    _KEY_OPCODE_STRS = ('-', '+', '*')  # KEY_RELEASE, KEY_PRESS, KEY_SEND -> str
+
+    def _create_reaction_str(self, reaction_code: ReactionCode) -> str:
+        opcode = reaction_code >> 8
+        if opcode <= Opcode.KEY_SEND:
+            kind_str = self._KEY_OPCODE_STRS[opcode]
+            key_code_str = self._key_code_map[reaction_code & 0xFF]
+            return f'{kind_str}{key_code_str}'
+        else:
+            return ''
@@ -28,6 +28,7 @@ NO_KEY = 0
 LPU, LRU, LMU, LI1U, LI2U, LTU,   RTU, RI2U, RI1U, RMU, RRU, RPU = range(1, 13)
 LPM, LRM, LMM, LI1M, LI2M, LTM,   RTM, RI2M, RI1M, RMM, RRM, RPM = range(13, 25)
 LPD, LRD, LMD, LI1D, LI2D, LTD,   RTD, RI2D, RI1D, RMD, RRD, RPD = range(25, 37)
+LC1, LC2, LC3,   RC1, RC2, RC3 = range(37, 43)  # combos (s. LEFT_COMBOS, RIGHT_COMBOS)
 
 VKEY_NAMES = {
     LPU: 'LPU',
@@ -77,6 +78,14 @@ VKEY_NAMES = {
     RPU: 'RPU',
     RPM: 'RPM',
     RPD: 'RPD',
+
+    LC1: 'LC1',
+    LC2: 'LC2',
+    LC3: 'LC3',
+
+    RC1: 'RC1',
+    RC2: 'RC2',
+    RC3: 'RC3',
 }
 
 # virtual groups
@@ -0,0 +1,179 @@
+""" host side layout compiler (CPython, not for the device): kbdlayoutdata.py -> layouttables.py
+
+    usage: python layoutcompiler.py [kbdlayoutdata.py] [-o layouttables.py]
+           mpy-cross layouttables.py  (optional)
+
+    KeyboardCreator parses KEYCODES_DATA and the LAYERS strings here once. The generated module contains only
+    constant tuples and bytes, which layoutloader.create_virtual_keyboard() turns into the VirtualKeyboard.
+    So keyboardcreator.py is not needed in the device image.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import time
+import tracemalloc
+import types
+
+from keyboardcreator import KeyboardCreator
+from layoutloader import create_virtual_keyboard
+from reactions import OneKeyReactions
+from textoutput import create_char_reports
+
+_HEADER = '# generated by layoutcompiler.py from {layout_name} - do not edit\n'
+
+
+class LayoutCompiler:
+
+    def __init__(self, layout_module: types.ModuleType):
+        self._layout_module = layout_module
+
+    def create_creator(self) -> KeyboardCreator:
+        layout = self._layout_module
+        return KeyboardCreator(virtual_key_order=layout.VIRTUAL_KEY_ORDER,
+                               layers=layout.LAYERS,
+                               modifiers=layout.MODIFIERS,
+                               macros=layout.MACROS,
+                               combos=getattr(layout, 'COMBO_REACTIONS', None),
+                               combo_vkeys=(set(getattr(layout, 'LEFT_COMBOS', {}))
+                                            | set(getattr(layout, 'RIGHT_COMBOS', {}))))
+
+    def compile(self, layout_name: str = 'kbdlayoutdata.py') -> str:
+        """ returns the source of the tables module
+        """
+        creator = self.create_creator()
+        keyboard = creator.create()
+
+        reaction_indices: dict[tuple, int] = {}  # equal reactions are stored once
+        layer_tables = [self._compile_layer(layer, reaction_indices) if layer is not None else None
+                        for layer in keyboard.layer_tables]
+        num_reaction_cells = sum(1 for indices in layer_tables if indices is not None
+                                 for reaction_index in indices if reaction_index)
+
+        char_key_codes = {reaction_name: (data.key_code, data.with_shift, data.with_alt)
+                          for reaction_name, data in creator.create_reaction_map().items()
+                          if len(reaction_name) == 1}
+
+        lines = [_HEADER.format(layout_name=layout_name)]
+        lines.append(f'NUM_VKEYS = {len(keyboard.layer_tables[0])}\n')
+        lines.append(f'SIMPLE_KEYS = {tuple(sorted(key.serial for key in keyboard.simple_keys))!r}\n')
+        lines.append('# (vkey serial, mod key code, TapHoldStrategy)')
+        lines.append(self._format_tuple('MOD_KEYS', [(key.serial, key.mod_key_code, key.strategy)
+                                                     for key in keyboard.mod_keys]))
+        lines.append('# (vkey serial, TapHoldStrategy), layer index = position + 1')
+        lines.append(self._format_tuple('LAYER_KEYS', [(key.serial, key.strategy) for key in keyboard.layer_keys]))
+        lines.append('# (press codes, release codes, undo codes or None), s. reactions.Opcode')
+        lines.append('# number of set reactions in all layer tables, all sharing the REACTIONS objects')
+        lines.append(f'NUM_REACTION_CELLS = {num_reaction_cells}\n')
+        lines.append(self._format_tuple('REACTIONS', list(reaction_indices.keys())))
+        lines.append('# layer stack code -> reaction index + 1 per vkey serial (0: not set), None: no valid stack')
+        lines.append(self._format_tuple('LAYER_TABLES', layer_tables))
+        lines.append('# macro index -> reaction codes, s. macroplayer.py')
+        lines.append(self._format_tuple('MACROS', [tuple(reaction_codes) for reaction_codes in creator.macro_codes]))
+        lines.append('# vkey serial -> bit table of the simple keys independent of the decision of this tap/hold key\n'
+                     '# (bit (serial & 7) of byte (serial >> 3)), None: no tap/hold key')
+        lines.append(self._format_tuple('INDEPENDENT_KEYS', keyboard.independent_keys))
+        lines.append(self._format_dict('KEY_CODE_NAMES', creator.create_key_code_map()))
+        lines.append('# char -> (modifier byte, key code) of the keyboard HID report, s. textoutput.py')
+        lines.append(self._format_dict('CHAR_REPORTS', create_char_reports(char_key_codes)))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _compile_layer(layer: list[OneKeyReactions | None], reaction_indices: dict[tuple, int]) -> bytes:
+        data = bytearray(len(layer))
+        for vkey_serial, one_key_reactions in enumerate(layer):
+            if one_key_reactions is None:
+                continue
+            undo_codes = one_key_reactions.on_undo_reaction_codes
+            key = (tuple(one_key_reactions.on_press_reaction_codes),
+                   tuple(one_key_reactions.on_release_reaction_codes),
+                   None if undo_codes is None else tuple(undo_codes))
+            index = reaction_indices.setdefault(key, len(reaction_indices))
+            if index >= 0xFF:
+                raise ValueError('too many different reactions for a byte table')
+            data[vkey_serial] = index + 1
+        return bytes(data)
+
+    @staticmethod
+    def _format_tuple(name: str, items: list) -> str:
+        return f'{name} = (\n' + ''.join(f'    {item!r},\n' for item in items) + ')\n'
+
+    @staticmethod
+    def _format_dict(name: str, items: dict) -> str:
+        return f'{name} = {{\n' + ''.join(f'    {key!r}: {value!r},\n' for key, value in items.items()) + '}\n'
+
+    def report_independent_keys(self) -> str:
+        keyboard = self.create_creator().create()
+        num_pairs = sum(bin(byte).count('1')
+                        for bits in keyboard.independent_keys if bits is not None
+                        for byte in bits)
+        num_all_pairs = len(keyboard.simple_keys) * (len(keyboard.mod_keys) + len(keyboard.layer_keys))
+        return f'decision independent (tap/hold key, simple key) pairs: {num_pairs} of {num_all_pairs}'
+
+    @staticmethod
+    def report_interned_reactions(tables_source: str) -> str:
+        """ the numbers of the generated tables (the layer tables of all layer stacks)
+        """
+        tables = types.ModuleType('layouttables')
+        exec(tables_source, tables.__dict__)
+        return (f'interned reactions: {len(tables.REACTIONS)} objects '
+                f'for {tables.NUM_REACTION_CELLS} layer table cells')
+
+    def measure(self, tables_source: str) -> str:
+        """ boot time and RAM of KeyboardCreator vs. the generated tables (on the host, so only as a ratio)
+        """
+        def create_by_creator() -> object:
+            creator = self.create_creator()
+            return creator.create(), creator.create_reaction_map(), creator.create_key_code_map()
+
+        tables_code = compile(tables_source, 'layouttables.py', 'exec')  # like the .mpy on the device
+
+        def create_by_tables() -> object:
+            tables = types.ModuleType('layouttables')
+            exec(tables_code, tables.__dict__)
+            return create_virtual_keyboard(tables), tables
+
+        creator_ms, creator_bytes = self._measure(create_by_creator)
+        tables_ms, tables_bytes = self._measure(create_by_tables)
+        return (f'boot (host): KeyboardCreator {creator_ms:.1f} ms -> tables {tables_ms:.1f} ms\n'
+                f'RAM peak (host): KeyboardCreator {creator_bytes // 1024} kB -> tables {tables_bytes // 1024} kB')
+
+    @staticmethod
+    def _measure(create) -> tuple[float, int]:
+        start = time.perf_counter()
+        create()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        tracemalloc.start()
+        create()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return duration_ms, peak
+
+
+def _load_layout_module(path: str) -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location('kbdlayoutdata', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='compiles the keyboard layout to firmware tables')
+    parser.add_argument('layout', nargs='?', default='kbdlayoutdata.py')
+    parser.add_argument('-o', '--output', default='layouttables.py')
+    args = parser.parse_args()
+
+    compiler = LayoutCompiler(_load_layout_module(args.layout))
+    source = compiler.compile(layout_name=args.layout)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        file.write(source)
+
+    print(f'{args.output} written')
+    print(compiler.measure(source))
+    print(compiler.report_independent_keys())
+    print(compiler.report_interned_reactions(source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from array import array
+
+from macroplayer import MacroPlayer
+from reactions import OneKeyReactions
+from virtualkeyboard import SimpleKey, ModKey, LayerKey, VirtualKeyboard, Layer
+
+
+def create_virtual_keyboard(tables, all_reactions: list[OneKeyReactions] | None = None) -> VirtualKeyboard:
+    """ tables: the module generated by layoutcompiler.py (layouttables.py)
+        all_reactions: created by create_reactions(tables) (None: created here)
+
+        Only the reactions and layer lists are created here, nothing is parsed.
+    """
+    if all_reactions is None:
+        all_reactions = create_reactions(tables)  # shared by all layers
+
+    layer_tables: list[Layer | None] = []
+    for reaction_indices in tables.LAYER_TABLES:
+        if reaction_indices is None:
+            layer_tables.append(None)
+        else:
+            # reaction index + 1, 0: not set
+            layer_tables.append([all_reactions[i - 1] if i > 0 else None for i in reaction_indices])
+
+    simple_keys = [SimpleKey(vkey_serial) for vkey_serial in tables.SIMPLE_KEYS]
+    mod_keys = [ModKey(vkey_serial, mod_key_code=mod_key_code, strategy=strategy)
+                for vkey_serial, mod_key_code, strategy in tables.MOD_KEYS]
+    # the layer of a layer key alone is layer_tables[layer index]
+    layer_keys = [LayerKey(vkey_serial, layer=layer_tables[layer_index], strategy=strategy)
+                  for layer_index, (vkey_serial, strategy) in enumerate(tables.LAYER_KEYS, 1)]
+
+    return VirtualKeyboard(simple_keys=simple_keys, mod_keys=mod_keys, layer_keys=layer_keys,
+                           default_layer=layer_tables[0], layer_tables=layer_tables,
+                           independent_keys=list(tables.INDEPENDENT_KEYS))
+
+
+def create_macro_player(tables) -> MacroPlayer:
+    return MacroPlayer([array('H', reaction_codes) for reaction_codes in tables.MACROS])
+
+
+def create_reactions(tables) -> list[OneKeyReactions]:
+    """ reaction index -> reaction, shared by all layer table cells
+    """
+    return [OneKeyReactions.from_codes(array('H', press_codes), array('H', release_codes),
+                                       None if undo_codes is None else array('H', undo_codes))
+            for press_codes, release_codes, undo_codes in tables.REACTIONS]
@@ -0,0 +1,457 @@
+# generated by layoutcompiler.py from kbdlayoutdata.py - do not edit
+
+NUM_VKEYS = 37
+
+SIMPLE_KEYS = (5, 8, 13, 14, 15, 16, 17, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 32, 33, 34, 35, 36)
+
+# (vkey serial, mod key code, TapHoldStrategy)
+MOD_KEYS = (
+    (4, 225, 1),
+    (3, 224, 1),
+    (2, 226, 1),
+    (1, 227, 1),
+    (9, 225, 1),
+    (10, 224, 1),
+    (11, 226, 1),
+    (12, 227, 1),
+)
+
+# (vkey serial, TapHoldStrategy), layer index = position + 1
+LAYER_KEYS = (
+    (30, 1),
+    (18, 1),
+    (6, 1),
+    (19, 1),
+    (31, 1),
+    (7, 1),
+)
+
+# (press codes, release codes, undo codes or None), s. reactions.Opcode
+# number of set reactions in all layer tables, all sharing the REACTIONS objects
+NUM_REACTION_CELLS = 1332
+
+REACTIONS = (
+    ((276,), (20,), (298, 42)),
+    ((282,), (26,), (298, 42)),
+    ((264,), (8,), (298, 42)),
+    ((277,), (21,), (298, 42)),
+    ((279,), (23,), (298, 42)),
+    ((332,), (76,), None),
+    ((298,), (42,), None),
+    ((284,), (28,), (298, 42)),
+    ((280,), (24,), (298, 42)),
+    ((268,), (12,), (298, 42)),
+    ((274,), (18,), (298, 42)),
+    ((275,), (19,), (298, 42)),
+    ((260,), (4,), (298, 42)),
+    ((278,), (22,), (298, 42)),
+    ((263,), (7,), (298, 42)),
+    ((265,), (9,), (298, 42)),
+    ((266,), (10,), (298, 42)),
+    ((299,), (43,), None),
+    ((296,), (40,), None),
+    ((267,), (11,), (298, 42)),
+    ((269,), (13,), (298, 42)),
+    ((270,), (14,), (298, 42)),
+    ((271,), (15,), (298, 42)),
+    ((307,), (51,), (298, 42)),
+    ((285,), (29,), (298, 42)),
+    ((283,), (27,), (298, 42)),
+    ((262,), (6,), (298, 42)),
+    ((281,), (25,), (298, 42)),
+    ((261,), (5,), (298, 42)),
+    ((300,), (44,), (298, 42)),
+    ((273,), (17,), (298, 42)),
+    ((272,), (16,), (298, 42)),
+    ((310,), (54,), (298, 42)),
+    ((311,), (55,), (298, 42)),
+    ((312,), (56,), (298, 42)),
+    ((297,), (41,), None),
+    ((1792,), (), None),
+    ((486, 276), (20, 230), (298, 42)),
+    ((481, 287), (31, 225), (298, 42)),
+    ((486, 292), (36, 230), (298, 42)),
+    ((486, 295), (39, 230), (298, 42)),
+    ((481, 302), (46, 225), None),
+    ((486, 301), (45, 230), (298, 42)),
+    ((481, 292), (36, 225), (298, 42)),
+    ((481, 293), (37, 225), (298, 42)),
+    ((481, 294), (38, 225), (298, 42)),
+    ((481, 289), (33, 225), (298, 42)),
+    ((306,), (50,), (298, 42)),
+    ((481, 306), (50, 225), (298, 42)),
+    ((486, 293), (37, 230), (298, 42)),
+    ((486, 294), (38, 230), (298, 42)),
+    ((302,), (46,), None),
+    ((304,), (48,), (298, 42)),
+    ((292,), (36,), (298, 42)),
+    ((293,), (37,), (298, 42)),
+    ((294,), (38,), (298, 42)),
+    ((303,), (47,), (298, 42)),
+    ((289,), (33,), (298, 42)),
+    ((290,), (34,), (298, 42)),
+    ((291,), (35,), (298, 42)),
+    ((308,), (52,), (298, 42)),
+    ((295,), (39,), (298, 42)),
+    ((286,), (30,), (298, 42)),
+    ((287,), (31,), (298, 42)),
+    ((288,), (32,), (298, 42)),
+    ((301,), (45,), (298, 42)),
+    ((1025,), (769,), None),
+    ((1026,), (770,), None),
+    ((314,), (58,), None),
+    ((315,), (59,), None),
+    ((316,), (60,), None),
+    ((317,), (61,), None),
+    ((318,), (62,), None),
+    ((319,), (63,), None),
+    ((320,), (64,), None),
+    ((321,), (65,), None),
+    ((322,), (66,), None),
+    ((323,), (67,), None),
+    ((324,), (68,), None),
+    ((325,), (69,), None),
+    ((481, 286), (30, 225), (298, 42)),
+    ((481, 295), (39, 225), (298, 42)),
+    ((481, 291), (35, 225), (298, 42)),
+    ((481, 290), (34, 225), (298, 42)),
+    ((481, 304), (48, 225), (298, 42)),
+    ((356,), (100,), (298, 42)),
+    ((309,), (53,), None),
+    ((486, 356), (100, 230), (298, 42)),
+    ((481, 356), (100, 225), (298, 42)),
+    ((481, 301), (45, 225), (298, 42)),
+    ((486, 304), (48, 230), (298, 42)),
+    ((2309,), (), None),
+    ((2306,), (), None),
+    ((2308,), (), None),
+    ((331,), (75,), None),
+    ((330,), (74,), None),
+    ((338,), (82,), None),
+    ((333,), (77,), None),
+    ((2304,), (), None),
+    ((2305,), (), None),
+    ((334,), (78,), None),
+    ((336,), (80,), None),
+    ((337,), (81,), None),
+    ((335,), (79,), None),
+)
+
+# layer stack code -> reaction index + 1 per vkey serial (0: not set), None: no valid stack
+LAYER_TABLES = (
+    b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\t\n\x0b\x0c\r\x0e\x0f\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x1a\x1b\x1c\x1d\x1e\x1e\x1f !"#',
+    b"\x00$%\x03\x04\x05\x06\x07&'()*\r\x0e\x0f\x10\x11\x12\x13+,-./\x19\x1a\x1b\x1c\x1d\x1e\x1e01234",
+    b'\x00\x01\x02\x03\x04\x05\x06\x0756789\r\x0e\x0f\x10\x11\x12\x13#:;<=\x19\x1a\x1b\x1c\x1d\x1e>\x1f?@AB',
+    b'\x00\x01\x02\x03\x04\x05\x06\x07\x08C\nD9\r\x0e\x0f\x10\x11\x12\x13\x14\x15\x16\x17=\x19\x1a\x1b\x1c\x1d\x1e\x1e\x1f !"B',
+    b'\x00\x01\x02\x03\x04\x05\x06\x07\x08EFGH\r\x0e\x0f\x10\x11\x12\x13\x14IJKL\x19\x1a\x1b\x1c\x1d\x1e\x1e\x1fMNOP',
+    b'\x00,5QRS\x06\x07\x08\t\n\x0b\x0cTUVWX\x12\x13\x14\x15\x16\x17\x18\x19#YZ[\x1e\x1e\x1f !"#',
+    b'\x00\x01\x02\\]^\x06\x07_`ab\x0c\r\x0e\x0f\x10c\x12\x13\x14\x15\x16\x17\x18\x19\x1a\x1b\x1cd\x1e\x1eefgh#',
+    None,
+    None,
+    b"\x00$%\x03\x04\x05\x06\x07&'()*\r\x0e\x0f\x10\x11\x12\x13+,-./\x19\x1a\x1b\x1c\x1d\x1e>01234",
+    b"\x00$%\x03\x04\x05\x06\x07&'()*\r\x0e\x0f\x10\x11\x12\x13+,-./\x19\x1a\x1b\x1c\x1d\x1e\x1e01234",
+    b"\x00$%\x03\x04\x05\x06\x07&'()*\r\x0e\x0f\x10\x11\x12\x13+,-./\x19\x1a\x1b\x1c\x1d\x1e\x1e01234",
+    b"\x00$%QRS\x06\x07&'()*TUVWX\x12\x13+,-./\x19#YZ[\x1e\x1e01234",
+    b"\x00$%\\]^\x06\x07&'()*\r\x0e\x0f\x10c\x12\x13+,-./\x19\x1a\x1b\x1cd\x1e\x1e01234",
+    None,
+    b'\x00$%\x03\x04\x05\x06\x0756789\r\x0e\x0f\x10\x11\x12\x13#:;<=\x19\x1a\x1b\x1c\x1d\x1e>0?@AB',
+    None,
+    b'\x00\x01\x02\x03\x04\x05\x06\x0756789\r\x0e\x0f\x10\x11\x12\x13#:;<=\x19\x1a\x1b\x1c\x1d\x1e>\x1f?@AB',
+    b'\x00\x01\x02\x03\x04\x05\x06\x0756789\r\x0e\x0f\x10\x11\x12\x13#:;<=\x19\x1a\x1b\x1c\x1d\x1e>\x1f?@AB',
+    b'\x00,5QRS\x06\x0756789TUVWX\x12\x13#:;<=\x19#YZ[\x1e>\x1f?@AB',
+    b'\x00\x01\x02\\]^\x06\x0756789\r\x0e\x0f\x10c\x12\x13#:;<=\x19\x1a\x1b\x1cd\x1e>e?@AB',
+    None,
+    b'\x00$%\x03\x04\x05\x06\x07&C(D9\r\x0e\x0f\x10\x11\x12\x13+,-.=\x19\x1a\x1b\x1c\x1d\x1e\x1e0123B',
+    b'\x00\x01\x02\x03\x04\x05\x06\x075C7D9\r\x0e\x0f\x10\x11\x12\x13#:;<=\x19\x1a\x1b\x1c\x1d\x1e>\x1f?@AB',
+    None,
+    b'\x00\x01\x02\x03\x04\x05\x06\x07\x08CFD9\r\x0e\x0f\x10\x11\x12\x13\x14IJK=\x19\x1a\x1b\x1c\x1d\x1e\x1e\x1fMNOB',
+    b'\x00,5QRS\x06\x07\x08C\nD9TUVWX\x12\x13\x14\x15\x16\x17=\x19#YZ[\x1e\x1e\x1f !"B',
+    b'\x00\x01\x02\\]^\x06\x07_CaD9\r\x0e\x0f\x10c\x12\x13\x14\x15\x16\x17=\x19\x1a\x1b\x1cd\x1e\x1eefghB',
+    None,
+    b'\x00$%\x03\x04\x05\x06\x07&EFGH\r\x0e\x0f\x10\x11\x12\x13+IJKL\x19\x1a\x1b\x1c\x1d\x1e\x1e0MNOP',
+    b'\x00\x01\x02\x03\x04\x05\x06\x075EFGH\r\x0e\x0f\x10\x11\x12\x13#IJKL\x19\x1a\x1b\x1c\x1d\x1e>\x1fMNOP',
+    b'\x00\x01\x02\x03\x04\x05\x06\x07\x08EFGH\r\x0e\x0f\x10\x11\x12\x13\x14IJKL\x19\x1a\x1b\x1c\x1d\x1e\x1e\x1fMNOP',
+    None,
+    b'\x00,5QRS\x06\x07\x08EFGHTUVWX\x12\x13\x14IJKL\x19#YZ[\x1e\x1e\x1fMNOP',
+    b'\x00\x01\x02\\]^\x06\x07_EFGH\r\x0e\x0f\x10c\x12\x13\x14IJKL\x19\x1a\x1b\x1cd\x1e\x1eeMNOP',
+    None,
+    b"\x00,5QRS\x06\x07&'()*TUVWX\x12\x13+,-./\x19#YZ[\x1e\x1e01234",
+    b'\x00,5QRS\x06\x0756789TUVWX\x12\x13#:;<=\x19#YZ[\x1e>\x1f?@AB',
+    b'\x00,5QRS\x06\x07\x08C\nD9TUVWX\x12\x13\x14\x15\x16\x17=\x19#YZ[\x1e\x1e\x1f !"B',
+    b'\x00,5QRS\x06\x07\x08EFGHTUVWX\x12\x13\x14IJKL\x19#YZ[\x1e\x1e\x1fMNOP',
+    None,
+    b'\x00,5QRS\x06\x07_`ab\x0cTUVWX\x12\x13\x14\x15\x16\x17\x18\x19#YZ[\x1e\x1eefgh#',
+    None,
+    b'\x00$%\\]^\x06\x07_`ab*\r\x0e\x0f\x10c\x12\x13+,-./\x19\x1a\x1b\x1cd\x1e\x1eefgh4',
+    b'\x00\x01\x02\\]^\x06\x07_`ab9\r\x0e\x0f\x10c\x12\x13#:;<=\x19\x1a\x1b\x1cd\x1e>efghB',
+    b'\x00\x01\x02\\]^\x06\x07_`ab9\r\x0e\x0f\x10c\x12\x13\x14\x15\x16\x17=\x19\x1a\x1b\x1cd\x1e\x1eefghB',
+    b'\x00\x01\x02\\]^\x06\x07_`abH\r\x0e\x0f\x10c\x12\x13\x14IJKL\x19\x1a\x1b\x1cd\x1e\x1eefghP',
+    b'\x00,5\\]^\x06\x07_`ab\x0cTUVWc\x12\x13\x14\x15\x16\x17\x18\x19#YZd\x1e\x1eefgh#',
+    None,
+)
+
+# macro index -> reaction codes, s. macroplayer.py
+MACROS = (
+    (283, 27, 283, 27, 283, 27),
+    (283, 27, 283, 27, 283, 27),
+    (283, 27, 283, 27, 283, 27),
+    (283, 27, 283, 27, 283, 27),
+    (283, 27, 283, 27, 283, 27),
+    (283, 27, 283, 27, 283, 27),
+)
+
+# vkey serial -> bit table of the simple keys independent of the decision of this tap/hold key
+# (bit (serial & 7) of byte (serial >> 3)), None: no tap/hold key
+INDEPENDENT_KEYS = (
+    None,
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    None,
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    None,
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    None,
+    None,
+    None,
+    None,
+    None,
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    None,
+    b'\x00\x00\x00\x00\x00',
+    b'\x00\x00\x00\x00\x00',
+    None,
+    None,
+    None,
+    None,
+    None,
+)
+
+KEY_CODE_NAMES = {
+    41: 'Esc',
+    58: 'F1',
+    59: 'F2',
+    60: 'F3',
+    61: 'F4',
+    62: 'F5',
+    63: 'F6',
+    64: 'F7',
+    65: 'F8',
+    66: 'F9',
+    67: 'F10',
+    68: 'F11',
+    69: 'F12',
+    53: '^',
+    30: '1',
+    31: '2',
+    32: '3',
+    33: '4',
+    34: '5',
+    35: '6',
+    36: '7',
+    37: '8',
+    38: '9',
+    39: '0',
+    45: 'ß',
+    46: '´',
+    42: 'Backspace',
+    43: 'Tab',
+    47: 'ü',
+    48: '+',
+    40: 'Enter',
+    57: 'CapsLock',
+    51: 'ö',
+    52: 'ä',
+    50: '#',
+    225: 'LShift',
+    100: '<',
+    54: ',',
+    55: '.',
+    56: '-',
+    229: 'RShift',
+    224: 'LCtrl',
+    227: 'LGui',
+    226: 'LAlt',
+    44: 'Space',
+    230: 'RAlt',
+    231: 'RGui',
+    101: 'Menu',
+    73: 'Insert',
+    74: 'Home',
+    75: 'PageUp',
+    76: 'Del',
+    77: 'End',
+    78: 'PageDown',
+    82: 'Up',
+    80: 'Left',
+    81: 'Down',
+    79: 'Right',
+    83: 'KpNumLock',
+    84: 'Kp/',
+    85: 'Kp*',
+    86: 'Kp',
+    95: 'Kp7',
+    96: 'Kp8',
+    97: 'Kp9',
+    87: 'Kp+',
+    92: 'Kp4',
+    93: 'Kp5',
+    94: 'Kp6',
+    89: 'Kp1',
+    90: 'Kp2',
+    91: 'Kp3',
+    88: 'KpEnter',
+    98: 'Kp0',
+    99: '',
+    4: 'a',
+    5: 'b',
+    6: 'c',
+    7: 'd',
+    8: 'e',
+    9: 'f',
+    10: 'g',
+    11: 'h',
+    12: 'i',
+    13: 'j',
+    14: 'k',
+    15: 'l',
+    16: 'm',
+    17: 'n',
+    18: 'o',
+    19: 'p',
+    20: 'q',
+    21: 'r',
+    22: 's',
+    23: 't',
+    24: 'u',
+    25: 'v',
+    26: 'w',
+    27: 'x',
+    28: 'z',
+    29: 'y',
+}
+
+# char -> (modifier byte, key code) of the keyboard HID report, s. textoutput.py
+CHAR_REPORTS = {
+    '\n': b'\x00(',
+    ' ': b'\x00,',
+    '^': b'\x005',
+    '°': b'\x025',
+    '1': b'\x00\x1e',
+    '!': b'\x02\x1e',
+    '2': b'\x00\x1f',
+    '"': b'\x02\x1f',
+    '3': b'\x00 ',
+    '§': b'\x02 ',
+    '4': b'\x00!',
+    '$': b'\x02!',
+    '5': b'\x00"',
+    '%': b'\x02"',
+    '6': b'\x00#',
+    '&': b'\x02#',
+    '7': b'\x00$',
+    '/': b'\x02$',
+    '{': b'@$',
+    '8': b'\x00%',
+    '(': b'\x02%',
+    '[': b'@%',
+    '9': b'\x00&',
+    ')': b'\x02&',
+    ']': b'@&',
+    '0': b"\x00'",
+    '=': b"\x02'",
+    '}': b"@'",
+    'ß': b'\x00-',
+    '?': b'\x02-',
+    '\\': b'@-',
+    '´': b'\x00.',
+    '`': b'\x02.',
+    'ü': b'\x00/',
+    'Ü': b'\x02/',
+    '+': b'\x000',
+    '*': b'\x020',
+    '~': b'@0',
+    'ö': b'\x003',
+    'Ö': b'\x023',
+    'ä': b'\x004',
+    'Ä': b'\x024',
+    '#': b'\x002',
+    "'": b'\x022',
+    '<': b'\x00d',
+    '>': b'\x02d',
+    '|': b'@d',
+    ',': b'\x006',
+    ';': b'\x026',
+    '.': b'\x007',
+    ':': b'\x027',
+    '-': b'\x008',
+    '_': b'\x028',
+    'a': b'\x00\x04',
+    'A': b'\x02\x04',
+    'b': b'\x00\x05',
+    'B': b'\x02\x05',
+    'c': b'\x00\x06',
+    'C': b'\x02\x06',
+    'd': b'\x00\x07',
+    'D': b'\x02\x07',
+    'e': b'\x00\x08',
+    'E': b'\x02\x08',
+    'f': b'\x00\t',
+    'F': b'\x02\t',
+    'g': b'\x00\n',
+    'G': b'\x02\n',
+    'h': b'\x00\x0b',
+    'H': b'\x02\x0b',
+    'i': b'\x00\x0c',
+    'I': b'\x02\x0c',
+    'j': b'\x00\r',
+    'J': b'\x02\r',
+    'k': b'\x00\x0e',
+    'K': b'\x02\x0e',
+    'l': b'\x00\x0f',
+    'L': b'\x02\x0f',
+    'm': b'\x00\x10',
+    'M': b'\x02\x10',
+    'n': b'\x00\x11',
+    'N': b'\x02\x11',
+    'o': b'\x00\x12',
+    'O': b'\x02\x12',
+    'p': b'\x00\x13',
+    'P': b'\x02\x13',
+    'q': b'\x00\x14',
+    'Q': b'\x02\x14',
+    '@': b'@\x14',
+    'r': b'\x00\x15',
+    'R': b'\x02\x15',
+    's': b'\x00\x16',
+    'S': b'\x02\x16',
+    't': b'\x00\x17',
+    'T': b'\x02\x17',
+    'u': b'\x00\x18',
+    'U': b'\x02\x18',
+    'v': b'\x00\x19',
+    'V': b'\x02\x19',
+    'w': b'\x00\x1a',
+    'W': b'\x02\x1a',
+    'x': b'\x00\x1b',
+    'X': b'\x02\x1b',
+    'z': b'\x00\x1c',
+    'Z': b'\x02\x1c',
+    'y': b'\x00\x1d',
+    'Y': b'\x02\x1d',
+}
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+
+from scheduler import DeadlineScheduler
+
+try:
+    from typing import Callable
+except ImportError:
+    pass
+
+ERROR_PAUSE = 0.5  # s, after an exception in a step
+
+
+async def run_periodically(step: Callable[[], None], interval_ms: int) -> None:
+    """ calls step() every interval_ms (at least, the other tasks run in between)
+
+        An exception is printed and the task continues after ERROR_PAUSE.
+    """
+    interval = interval_ms / 1000
+    while True:
+        await _run_step(step)
+        await asyncio.sleep(interval)
+
+
+async def run_scheduled(scheduler: DeadlineScheduler, step: Callable[[], None]) -> None:
+    """ calls step() at the next deadline of the scheduler or when it is woken up, step() sets the deadlines
+    """
+    while True:
+        await scheduler.wait()
+        await _run_step(step)
+
+
+async def _run_step(step: Callable[[], None]) -> None:
+    try:
+        step()
+    except Exception as err:
+        print(f'ERROR : {err}')
+        await asyncio.sleep(ERROR_PAUSE)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from base import TimeInMs
+from reactions import Opcode, ReactionCode, ReactionCodes
+
+try:
+    from typing import Iterator
+except ImportError:
+    pass
+
+
+class MacroPlayer:
+    """ plays the macros compiled by KeyboardCreator without blocking the main loop
+
+        update() yields at most MAX_CODES_PER_UPDATE reaction codes per call and stops at a DELAY code
+        until its time has passed, so the keys are scanned and the mouse moves while a long macro is played.
+        Macros started while playing are queued.
+    """
+    MAX_CODES_PER_UPDATE = 4
+    MAX_QUEUED_MACROS = 4
+
+    def __init__(self, macros: list[ReactionCodes]):
+        """ macros: macro index -> reaction codes (no MACRO codes)
+        """
+        self._macros = macros
+        self._queue: list[int] = []  # macro indices
+        self._codes: ReactionCodes | None = None  # the macro being played
+        self._pos = 0
+        self._resume_time: TimeInMs = 0
+
+    @property
+    def is_playing(self) -> bool:
+        return self._codes is not None or len(self._queue) > 0
+
+    @property
+    def next_step_time(self) -> TimeInMs | None:
+        """ update() can play the next codes at this time (None: nothing to play)
+        """
+        if not self.is_playing:
+            return None
+        return self._resume_time
+
+    def play(self, macro_index: int) -> None:
+        if len(self._queue) < self.MAX_QUEUED_MACROS:
+            self._queue.append(macro_index)
+
+    def update(self, time: TimeInMs) -> Iterator[ReactionCode]:
+        num_codes = 0
+        while num_codes < self.MAX_CODES_PER_UPDATE and time >= self._resume_time:
+            if self._codes is None:
+                if len(self._queue) == 0:
+                    return
+                self._codes = self._macros[self._queue.pop(0)]
+                self._pos = 0
+
+            if self._pos >= len(self._codes):
+                self._codes = None
+                continue
+
+            reaction_code = self._codes[self._pos]
+            self._pos += 1
+            if self._pos >= len(self._codes):
+                self._codes = None
+            if reaction_code >> 8 == Opcode.DELAY:
+                self._resume_time = time + (reaction_code & 0xFF)
+            else:
+                num_codes += 1
+                yield reaction_code
@@ -1,27 +1,36 @@
 from __future__ import annotations
 
-from keyboardcreator import KeyboardCreator, ReactionName, _KeyReactionData
-from reactions import KeyCmdKind, ReactionCommands, KeyCmd, MouseButtonCmd, MouseWheelCmd, ReactionCmd, \
-    MouseButtonCmdKind, LogCmd, KeyCmdKindValue
+from layoutloader import create_reactions, create_virtual_keyboard, create_macro_player
+from textoutput import TextReportWriter
 
 try:
     from typing import Iterator
 except ImportError:
     pass
+from tracing import MAIN_TRACE, MOUSE_TRACE, TRACE_RING, TraceLevel
 
+import asyncio
+import gc
 import time
 import board
+import microcontroller
 import usb_hid
 from digitalio import DigitalInOut, Direction, Pull
 import rotaryio
-from adafruit_hid.keycode import Keycode as KC
+from adafruit_hid import find_device
 from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.mouse import Mouse
 
-from base import PhysicalKeySerial, TimeInMs, KeyCode
+from base import PhysicalKeysMask, TimeInMs
 from button import Button
-from kbdlayoutdata import LEFT_KEY_GROUPS, VIRTUAL_KEY_ORDER, LAYERS, MODIFIERS, MACROS
-from keyboardhalf import KeyboardHalf, KeyGroup, VKeyPressEvent
+from kbdlayoutdata import LEFT_KEY_GROUPS, LEFT_COMBOS, SPECULATIVE_VKEYS
+from chordtiming import ChordTimingStats, ChordTimingStore
+from debouncer import Debouncer, DebounceMode
+from inputqueue import InputQueue, QueueItem
+from looptasks import run_periodically, run_scheduled
+from scheduler import DeadlineScheduler
+from keylog import KeyLog, KeyLogKind, LogItemDumper
+from keyboardhalf import KeyboardHalf, KeyGroup, VKeyPressEvent, pkeys_to_mask
 from keysdata import *
 from uart import LeftUart, MouseMove
 
@@ -44,7 +53,15 @@ LEFT_RX = board.GP1
 def main():
     left_kbd = LeftKeyboardSide()
     left_kbd.init()
-    left_kbd.main_loop()
+    asyncio.run(left_kbd.main_loop())
+
+
+class DeadlineSlot:  # enum, the sources of the deadlines of LeftKeyboardSide._make_decisions()
+    KEYBOARD_HALF = 0  # combo and chord terms
+    VIRTUAL_KEYBOARD = 1  # tap/hold terms
+    MACRO = 2  # next macro step
+    LOG_OUTPUT = 3  # next reports of the log (at once)
+    NUM_SLOTS = 4
 
 
 class RollerEncoder:
@@ -83,62 +100,107 @@ class LeftKeyboardSide:
     }
     _ROTARY_PIN1 = board.GP16
     _ROTARY_PIN2 = board.GP17
+    QUEUE_CAPACITY = 16  # items, the queue is emptied whenever the processing task runs
+    # task intervals in ms
+    KEY_SCAN_INTERVAL = 1  # the debouncer suppresses chatter
+    UART_READ_INTERVAL = 1
+    ENCODER_READ_INTERVAL = 5
+    CHORD_TIMING_SAVE_INTERVAL = 1000
+    KEY_LOG_CAPACITY = 4096  # entries (4 bytes each), s. KeyLog
+    LOG_REPORTS_PER_STEP = 4  # HID reports per step of the decision task, while the log is typed
 
     def __init__(self):
         self._uart = LeftUart(tx=LEFT_TX, rx=LEFT_RX)
         self._roller_encoder = RollerEncoder(self._ROTARY_PIN1, self._ROTARY_PIN2)
         self._buttons = [Button(pkey_serial=pkey_serial, gp_pin=gp_pin) for pkey_serial, gp_pin in self._BUTTON_MAP.items()]
-        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(group_serial, group_data)
-                                                  for group_serial, group_data in LEFT_KEY_GROUPS.items()])
-        creator = KeyboardCreator(virtual_key_order=VIRTUAL_KEY_ORDER,
-                                  layers=LAYERS,
-                                  modifiers=MODIFIERS,
-                                  macros=MACROS,
-                                  )
-        self._virt_keyboard = creator.create()
-        self._reaction_map = creator.create_reaction_map()
-        self._key_code_map = creator.create_key_code_map()
+        self._debouncer = Debouncer(pkeys_mask=pkeys_to_mask(self._BUTTON_MAP.keys()), mode=DebounceMode.EAGER)
+        chord_stats_map = {group_serial: ChordTimingStats() for group_serial in LEFT_KEY_GROUPS}
+        self._chord_timing_store = ChordTimingStore(microcontroller.nvm, chord_stats_map)
+        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(group_serial, group_data,
+                                                           chord_stats=chord_stats_map[group_serial],
+                                                           speculative_vkeys=SPECULATIVE_VKEYS)
+                                                  for group_serial, group_data in LEFT_KEY_GROUPS.items()],
+                                      combos=LEFT_COMBOS)
+        gc.collect()
+        free_before = gc.mem_free()
+        import layouttables  # generated by layoutcompiler.py, imported here to measure its heap
+        free_before_reactions = gc.mem_free()
+        reactions = create_reactions(layouttables)
+        reaction_bytes = free_before_reactions - gc.mem_free()
+        self._virt_keyboard = create_virtual_keyboard(layouttables, reactions)
+        # without interning every layer table cell would have its own reaction object
+        saved_bytes = (layouttables.NUM_REACTION_CELLS - len(reactions)) * reaction_bytes // max(len(reactions), 1)
+        print(f'layout heap: {free_before - gc.mem_free()} bytes (with the tables), {len(reactions)} reactions: '
+              f'{reaction_bytes} bytes shared by {layouttables.NUM_REACTION_CELLS} layer table cells, '
+              f'about {saved_bytes} bytes saved')
+        self._key_code_map = layouttables.KEY_CODE_NAMES
+        self._macro_player = create_macro_player(layouttables)
 
         self._kbd_device = Keyboard(usb_hid.devices)
+        self._kbd_hid_device = find_device(usb_hid.devices, usage_page=0x1, usage=0x06)  # for whole reports
+        self._text_writer = TextReportWriter(layouttables.CHAR_REPORTS)
         self._mouse_device = Mouse(usb_hid.devices)
-        self._queue: list[QueueItem] = []
-        self._log_items: list[LogItem] = []
+        # Opcode -> handler(argument)
+        self._reaction_code_handlers = [self._kbd_device.release,  # KEY_RELEASE
+                                        self._kbd_device.press,  # KEY_PRESS
+                                        self._kbd_device.send,  # KEY_SEND
+                                        self._mouse_device.release,  # MOUSE_RELEASE
+                                        self._mouse_device.press,  # MOUSE_PRESS
+                                        self._mouse_device.click,  # MOUSE_CLICK
+                                        self._move_mouse_wheel,  # MOUSE_WHEEL
+                                        self._send_log,  # LOG
+                                        self._ignore_delay,  # DELAY (only in macros)
+                                        self._macro_player.play]  # MACRO
+        self._queue = InputQueue(capacity=self.QUEUE_CAPACITY)
+        self._num_queue_overflows = 0  # traced, when the queue has lost pressed pkeys
+        self._other_vkey_events: list[VKeyPressEvent] = []  # reused by _read_uart()
+        self._my_pressed_pkeys_mask: PhysicalKeysMask = 0
+        self._scheduler = DeadlineScheduler(num_slots=DeadlineSlot.NUM_SLOTS)  # woken, when something is pushed
+        self._num_key_scans = 0
+        self._key_log = KeyLog(capacity=self.KEY_LOG_CAPACITY)
+        self._log_reports: Iterator[bytearray] | None = None  # the log being typed
 
     def init(self) -> None:
+        if self._chord_timing_store.load():
+            print('chord timing loaded')
         print('init uart...')
         self._uart.wait_for_start()
 
-    def main_loop(self) -> None:
+    async def main_loop(self) -> None:
+        """ every input is read by its own task at its own rate and pushed into the queue,
+            the queue is processed (VirtualKeyboard, HID reports, macros) by another task, when something
+            was pushed or at the next deadline (s. _make_decisions())
+        """
         print('start main loop')
-        i = 0
-        while True:
-            try:
-                if i % 500 == 0:
-                    print(i)
-                self._read_devices()
-
-                for queue_item in self._read_queue_items():
-                    self._process_queue_item(queue_item)
-
-                time.sleep(0.001)
-            except Exception as err:
-                print(f'ERROR : {err}')
-                time.sleep(0.5)
-            i += 1
-
-    def _read_devices(self) -> None:
-        t = time.monotonic() * 1000
-
-        #print(f'_read_devices: t={t}')
-        my_pressed_pkeys = self._get_pressed_pkeys()
-
+        await asyncio.gather(run_periodically(self._scan_keys, self.KEY_SCAN_INTERVAL),
+                             run_periodically(self._read_uart, self.UART_READ_INTERVAL),
+                             run_periodically(self._read_encoder, self.ENCODER_READ_INTERVAL),
+                             run_scheduled(self._scheduler, self._make_decisions),
+                             run_periodically(self._chord_timing_store.save_if_needed,
+                                              self.CHORD_TIMING_SAVE_INTERVAL))
+
+    def _scan_keys(self) -> None:
+        if MAIN_TRACE.level >= TraceLevel.DEBUG and self._num_key_scans % 500 == 0:
+            MAIN_TRACE.write('key scans', self._num_key_scans)
+        self._num_key_scans += 1
+
+        pressed_pkeys_mask = self._debouncer.update(self._get_pressed_pkeys_mask())
+        if pressed_pkeys_mask != self._my_pressed_pkeys_mask:
+            self._my_pressed_pkeys_mask = pressed_pkeys_mask
+            self._push_input(time.monotonic() * 1000, mouse_dx=0, mouse_dy=0, encoder_offset=0)
+
+    def _read_encoder(self) -> None:
         encoder_offset = self._roller_encoder.update()
         if encoder_offset != 0:
-            print(f'encoder_offset={encoder_offset}')
+            if MOUSE_TRACE.level >= TraceLevel.DEBUG:
+                MOUSE_TRACE.write('encoder offset', encoder_offset)
+            self._push_input(time.monotonic() * 1000, mouse_dx=0, mouse_dy=0, encoder_offset=encoder_offset)
 
+    def _read_uart(self) -> None:
+        t = time.monotonic() * 1000
         mouse_dx = mouse_dy = 0
-        other_vkey_events: list[VKeyPressEvent] = []
-        for uart_item in self._uart.read_items():
+        other_vkey_events = self._other_vkey_events
+        for uart_item in self._uart.read_items(time=t):
             if isinstance(uart_item, MouseMove):
                 mouse_move = uart_item
                 mouse_dx += mouse_move.dx
@@ -147,220 +209,135 @@ class LeftKeyboardSide:
                 vkey_evt = uart_item
                 other_vkey_events.append(vkey_evt)
 
-        queue_item = QueueItem(time=t, mouse_move=MouseMove(dx=mouse_dx, dy=mouse_dy),
-                               encoder_offset=encoder_offset,
-                               my_pressed_pkeys=my_pressed_pkeys,
-                               other_vkey_events=other_vkey_events)
-        #print(f'read_devices: {queue_item}')
-        self._queue.append(queue_item)
-
-    def _read_queue_items(self) -> Iterator[QueueItem]:
-        while len(self._queue) > 0:
-            queue_item = self._queue[0]
-            self._queue = self._queue[1:]
-            yield queue_item
+        if mouse_dx != 0 or mouse_dy != 0 or len(other_vkey_events) > 0:
+            self._push_input(t, mouse_dx=mouse_dx, mouse_dy=mouse_dy, encoder_offset=0)
+
+    def _push_input(self, t: TimeInMs, mouse_dx: int, mouse_dy: int, encoder_offset: int) -> None:
+        self._queue.push(time=t, my_pressed_pkeys_mask=self._my_pressed_pkeys_mask, mouse_dx=mouse_dx,
+                         mouse_dy=mouse_dy, encoder_offset=encoder_offset, other_vkey_events=self._other_vkey_events)
+        self._other_vkey_events.clear()
+        self._scheduler.wake()
+
+    def _make_decisions(self) -> None:
+        """ processes the queue and what is due, then sets the deadlines for the next wakeup
+        """
+        if len(self._queue) == 0:
+            # woken by a deadline: the same input at the current time (only this item is processed at 'now')
+            self._queue.push(time=time.monotonic() * 1000, my_pressed_pkeys_mask=self._my_pressed_pkeys_mask,
+                             mouse_dx=0, mouse_dy=0, encoder_offset=0, other_vkey_events=self._other_vkey_events)
+
+        num_queue_overflows = self._queue.num_overflows
+        if num_queue_overflows != self._num_queue_overflows:
+            self._num_queue_overflows = num_queue_overflows
+            if MAIN_TRACE.level >= TraceLevel.ERROR:
+                MAIN_TRACE.write('input queue overflows', num_queue_overflows)
+
+        queue_item = self._queue.pop()
+        while queue_item is not None:
+            self._process_queue_item(queue_item)
+            queue_item = self._queue.pop()
+        self._play_macros()
+        self._send_log_reports()
+
+        scheduler = self._scheduler
+        scheduler.set_deadline(DeadlineSlot.KEYBOARD_HALF, self._kbd_half.next_decision_time)
+        scheduler.set_deadline(DeadlineSlot.VIRTUAL_KEYBOARD, self._virt_keyboard.next_decision_time)
+        scheduler.set_deadline(DeadlineSlot.MACRO, self._macro_player.next_step_time)
+        scheduler.set_deadline(DeadlineSlot.LOG_OUTPUT, None if self._log_reports is None else 0)
 
     def _process_queue_item(self, queue_item: QueueItem) -> None:
         #print(f'_process_queue_item: {queue_item}')
-        mouse_dx = queue_item.mouse_move.dx
-        mouse_dy = queue_item.mouse_move.dy
+        mouse_dx = queue_item.mouse_dx
+        mouse_dy = queue_item.mouse_dy
         if mouse_dx != 0 or mouse_dy != 0:
             self._mouse_device.move(mouse_dx, mouse_dy)
 
         if queue_item.encoder_offset != 0:
-            print(f'mouse wheel: {queue_item.encoder_offset}')
             self._mouse_device.move(wheel=queue_item.encoder_offset)
 
-        my_vkey_events = list(self._kbd_half.update(time=queue_item.time,
-                                                    cur_pressed_pkeys=queue_item.my_pressed_pkeys))
-        t = time.monotonic() * 1000
-        reaction_commands = list(self._virt_keyboard.update(time=t,
-                                                            vkey_events=queue_item.other_vkey_events + my_vkey_events))
-        for reaction_cmd in reaction_commands:
-            self._send_reaction_cmd(reaction_cmd)
-
-        if len(my_vkey_events) > 0 or len(queue_item.other_vkey_events) > 0 or len(reaction_commands) > 0:
-            log_item = LogItem(time_=t, my_vkey_events=my_vkey_events, other_vkey_events=queue_item.other_vkey_events,
-                               reaction_commands=reaction_commands)
-            self._log_items.append(log_item)
-            if len(self._log_items) > 7:
-                self._log_items = self._log_items[-7:]
-
-    def _get_pressed_pkeys(self) -> set[PhysicalKeySerial]:
-        return {button.pkey_serial
-                for button in self._buttons
-                if button.is_pressed()}
-
-    def _send_reaction_cmd(self, reaction_cmd: ReactionCmd) -> None:
-        if isinstance(reaction_cmd, KeyCmd):
-            cmd_executer = KeyCmdExecuter(self._kbd_device)
-            cmd_executer.execute(reaction_cmd)
-        elif isinstance(reaction_cmd, MouseButtonCmd):
-            mouse_cmd = reaction_cmd
-            if mouse_cmd.kind == MouseButtonCmdKind.MOUSE_PRESS:
-                self._mouse_device.press(mouse_cmd.button_no)
-            elif mouse_cmd.kind == MouseButtonCmdKind.MOUSE_RELEASE:
-                self._mouse_device.release(mouse_cmd.button_no)
-        elif isinstance(reaction_cmd, MouseWheelCmd):
-            self._mouse_device.move(wheel=reaction_cmd.offset)
-        elif isinstance(reaction_cmd, LogCmd):
-            self._send_log_key_codes()
-
-    def _send_log_key_codes(self):
-        dumper = LogItemDumper(key_code_map=self._key_code_map)
-        text = '\n' + '\n'.join(dumper.dump(log_item) for log_item in self._log_items[:-2]) + '\n'
-
-        converter = TextToKeyCodeConverter(reaction_map=self._reaction_map)
-        key_commands = list(converter.convert_text(text))
-
-        cmd_executer = KeyCmdExecuter(self._kbd_device)
-        for key_cmd in key_commands:
-            cmd_executer.execute(key_cmd)
-
-
-class QueueItem:
-
-    def __init__(self, time: TimeInMs, mouse_move: MouseMove, encoder_offset: int,
-                 my_pressed_pkeys: set[PhysicalKeySerial], other_vkey_events: list[VKeyPressEvent]):
-        # public
-        self.time = time
-        self.mouse_move = mouse_move
-        self.encoder_offset = encoder_offset
-        self.my_pressed_pkeys = my_pressed_pkeys
-        self.other_vkey_events = other_vkey_events
-
-    def __str__(self) -> str:
-        return f'QueueItem({self.time}, mouse=({self.mouse_move.dx, self.mouse_move.dy}), my-pkeys=({self.my_pressed_pkeys})), other-vkey={self.other_vkey_events})'
-
-
-class LogItem:
-
-    def __init__(self, time_: TimeInMs, my_vkey_events: list[VKeyPressEvent], other_vkey_events: list[VKeyPressEvent],
-                 reaction_commands: list[ReactionCmd]):
-        self._time = time_
-        self._my_vkey_events = my_vkey_events
-        self._other_vkey_events = other_vkey_events
-        self._reaction_commands = reaction_commands
-
-    @property
-    def time(self) -> TimeInMs:
-        return self._time
-
-    @property
-    def my_vkey_events(self) -> list[VKeyPressEvent]:
-        return self._my_vkey_events
-
-    @property
-    def other_vkey_events(self) -> list[VKeyPressEvent]:
-        return self._other_vkey_events
-
-    @property
-    def reaction_commands(self) -> list[ReactionCmd]:
-        return self._reaction_commands
-
-
-class LogItemDumper:
-
-    def __init__(self, key_code_map: dict[KeyCode, str]):
-        self._key_code_map = key_code_map
-
-    def dump(self, log_item: LogItem) -> str:
-        return ', '.join(self._iter_str_parts(log_item))
-
-    def _iter_str_parts(self, log_item: LogItem) -> Iterator[str]:
-        yield f'{int(log_item.time)}: '
-
-        yield ', '.join(self._iter_vkey_parts(log_item))
-
-        if len(log_item.reaction_commands) > 0:
-            reaction_str = ', '.join(self._create_reaction_str(reaction_cmd)
-                                     for reaction_cmd in log_item.reaction_commands)
-            yield ' -> [' + reaction_str + ']'
-
-    def _iter_vkey_parts(self, log_item: LogItem) -> Iterator[str]:
-        if len(log_item.other_vkey_events) > 0:
-            other_str = self._create_vkey_events_str(log_item.other_vkey_events)
-            yield f'other={other_str}'
-
-        if len(log_item.my_vkey_events) > 0:
-            self_str = self._create_vkey_events_str(log_item.my_vkey_events)
-            yield f'self={self_str}'
-
-    def _create_vkey_events_str(self, vkey_events: list[VKeyPressEvent]) -> str:
-        return '[' + ', '.join(self._create_vkey_event_str(vkey_event) for vkey_event in vkey_events) + ']'
-
-    @staticmethod
-    def _create_vkey_event_str(vkey_event: VKeyPressEvent) -> str:
-        prefix = '+' if vkey_event.pressed else '-'
-        vkey_name = VKEY_NAMES[vkey_event.vkey_serial].lower()
-        return prefix + vkey_name
-
-    def _create_reaction_str(self, reaction_cmd: ReactionCmd) -> str:
-        if isinstance(reaction_cmd, KeyCmd):
-            key_cmd = reaction_cmd
-            kind_str = self._create_key_cmd_kind_str(key_cmd.kind)
-            key_code_str = self._key_code_map[key_cmd.key_code]
-            return f'{kind_str}{key_code_str}'
-        else:
-            return ''
-
-    @staticmethod
-    def _create_key_cmd_kind_str(key_cmd_kind: KeyCmdKindValue) -> str:
-        if key_cmd_kind == KeyCmdKind.KEY_PRESS:
-            return '+'
-        elif key_cmd_kind == KeyCmdKind.KEY_RELEASE:
-            return '-'
-        elif key_cmd_kind == KeyCmdKind.KEY_SEND:
-            return '*'
-        else:
-            return ''
-
-
-class TextToKeyCodeConverter:
-
-    def __init__(self, reaction_map: dict[ReactionName, _KeyReactionData]):
-        self._reaction_map = reaction_map
-
-    def convert_text(self, text: str) -> Iterator[KeyCmd]:
-        for char in text:
-            yield from self._convert_char(char)
-
-    def _convert_char(self, char: str) -> Iterator[KeyCmd]:
-        if char == '\n':
-            yield KeyCmd(kind=KeyCmdKind.KEY_SEND, key_code=KC.ENTER)
-            return
-
-        reaction_data = self._reaction_map.get(char)
-        if reaction_data is None:
+        my_vkey_events = list(self._kbd_half.update_by_mask(time=queue_item.time,
+                                                            cur_pressed_pkeys_mask=queue_item.my_pressed_pkeys_mask))
+        # the time of the item, not of processing: a later item can still release a tap in time
+        t = queue_item.time
+        for vkey_event in queue_item.other_vkey_events:
+            if vkey_event.time is not None and vkey_event.time > t:
+                t = vkey_event.time
+        # my events are merged with the events of the right half in press order
+        reaction_codes = list(self._virt_keyboard.update(time=t,
+                                                         vkey_events=queue_item.other_vkey_events + my_vkey_events,
+                                                         events_time=queue_item.time))
+        reaction_code_handlers = self._reaction_code_handlers
+        for reaction_code in reaction_codes:
+            reaction_code_handlers[reaction_code >> 8](reaction_code & 0xFF)
+
+        if self._log_reports is None and \
+                (len(my_vkey_events) > 0 or len(queue_item.other_vkey_events) > 0 or len(reaction_codes) > 0):
+            key_log = self._key_log
+            key_log.add_tick(t)
+            key_log.add_vkey_events(KeyLogKind.OTHER_VKEY_EVENT, queue_item.other_vkey_events)
+            key_log.add_vkey_events(KeyLogKind.MY_VKEY_EVENT, my_vkey_events)
+            key_log.add_reaction_codes(reaction_codes)
+
+    def _play_macros(self) -> None:
+        """ a few codes per step, so a long macro does not stall the keys and the mouse
+        """
+        if self._macro_player.is_playing:
+            reaction_code_handlers = self._reaction_code_handlers
+            for reaction_code in self._macro_player.update(time=time.monotonic() * 1000):
+                reaction_code_handlers[reaction_code >> 8](reaction_code & 0xFF)
+
+    def _get_pressed_pkeys_mask(self) -> PhysicalKeysMask:
+        mask = 0
+        for button in self._buttons:
+            if button.is_pressed():
+                mask |= button.pkey_mask
+        return mask
+
+    def _move_mouse_wheel(self, argument: int) -> None:
+        self._mouse_device.move(wheel=argument if argument < 128 else argument - 256)
+
+    def _ignore_delay(self, _argument: int) -> None:
+        pass
+
+    def _send_log(self, _argument: int) -> None:
+        """ starts typing the log, it is sent by _send_log_reports() in steps (the key log is paused meanwhile)
+        """
+        if self._log_reports is None:
+            self._log_reports = self._iter_log_reports()
+
+    def _send_log_reports(self) -> None:
+        """ a few reports per step, so typing the log does not stall the keys and the UART
+        """
+        log_reports = self._log_reports
+        if log_reports is None:
             return
 
-        if reaction_data.with_shift:
-            yield KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.LEFT_SHIFT)
-
-        if reaction_data.with_alt:
-            yield KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.RIGHT_ALT)
-
-        yield KeyCmd(kind=KeyCmdKind.KEY_SEND, key_code=reaction_data.key_code)
-
-        if reaction_data.with_alt:
-            yield KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.RIGHT_ALT)
-
-        if reaction_data.with_shift:
-            yield KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.LEFT_SHIFT)
-
-
-class KeyCmdExecuter:
-
-    def __init__(self, kbd_device: Keyboard):
-        self._kbd_device = kbd_device
-
-    def execute(self, key_cmd: KeyCmd) -> None:
-        if key_cmd.kind == KeyCmdKind.KEY_PRESS:
-            self._kbd_device.press(key_cmd.key_code)
-        elif key_cmd.kind == KeyCmdKind.KEY_RELEASE:
-            self._kbd_device.release(key_cmd.key_code)
-        elif key_cmd.kind == KeyCmdKind.KEY_SEND:
-            self._kbd_device.send(key_cmd.key_code)
+        send_report = self._kbd_hid_device.send_report
+        for _ in range(self.LOG_REPORTS_PER_STEP):
+            report = next(log_reports, None)
+            if report is None:
+                send_report(self._kbd_device.report)  # the keys still pressed by the reactions
+                self._log_reports = None
+                return
+            send_report(report)
+
+    def _iter_log_reports(self) -> Iterator[bytearray]:
+        # one report per char instead of press/release reports for every key and modifier
+        text_writer = self._text_writer
+        for line in self._iter_log_lines():
+            yield from text_writer.iter_reports(line)
+
+    def _iter_log_lines(self) -> Iterator[str]:
+        yield '\n'
+        dumper = LogItemDumper(key_code_map=self._key_code_map)
+        # without the press and release of the Log key
+        for log_item in self._key_log.iter_log_items(num_skipped_ticks=2):
+            yield dumper.dump(log_item) + '\n'
+        yield (f'speculations={self._virt_keyboard.num_speculations}, '
+               f'rollbacks={self._virt_keyboard.num_rollbacks}, '
+               f'queue overflows={self._queue.num_overflows}\n')
+        for line in TRACE_RING.iter_lines():
+            yield line + '\n'
 
 
 if __name__ == '__main__':
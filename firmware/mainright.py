@@ -1,14 +1,20 @@
+import asyncio
 import time
 
 import PMW3389
 import board
+import microcontroller
 from digitalio import DigitalInOut, Direction
 
-from base import PhysicalKeySerial
+from base import PhysicalKeysMask
 from button import Button
-from kbdlayoutdata import RIGHT_KEY_GROUPS
-from keyboardhalf import KeyboardHalf, KeyGroup
+from kbdlayoutdata import RIGHT_KEY_GROUPS, RIGHT_COMBOS, SPECULATIVE_VKEYS
+from chordtiming import ChordTimingStats, ChordTimingStore
+from debouncer import Debouncer, DebounceMode
+from keyboardhalf import KeyboardHalf, KeyGroup, pkeys_to_mask
 from keysdata import *
+from looptasks import run_periodically
+from tracing import MOUSE_TRACE, TraceLevel
 from uart import RightUart
 
 # TRRS
@@ -28,7 +34,7 @@ RIGHT_RX = board.GP1
 def main():
     right_kbd = RightKeyboardSide()
     right_kbd.init()
-    right_kbd.main_loop()
+    asyncio.run(right_kbd.main_loop())
 
 
 class TrackballSensor:
@@ -81,7 +87,8 @@ class TrackballSensor:
         # uncomment if mt_pin isn't used
         # if data["isOnSurface"] == True and data["isMotion"] and mt_pin.value == True:
         if self._mt_pin.value == 0 and (dy != 0 or dy != 0):
-            #print(f'move ({dx}, {dy})')
+            if MOUSE_TRACE.level >= TraceLevel.DEBUG:
+                MOUSE_TRACE.write('sensor move', dx, dy)
             #mouse_device.move(-dy, -dx)  # !! swap values - only for testing !!
             return -dy, -dx
 
@@ -116,38 +123,55 @@ class RightKeyboardSide:
         RIGHT_THUMB_UP: board.GP21,  # red
         RIGHT_THUMB_DOWN: board.GP20,  # yellow
     }
+    # task intervals in ms
+    KEY_SCAN_INTERVAL = 1  # the debouncer suppresses chatter
+    TRACKBALL_READ_INTERVAL = 2
+    CHORD_TIMING_SAVE_INTERVAL = 1000
 
     def __init__(self):
         self._trackball_sensor = TrackballSensor()
         self._uart = RightUart(tx=RIGHT_TX, rx=RIGHT_RX)
         self._buttons = [Button(pkey_serial=pkey_serial, gp_pin=gp_pin) for pkey_serial, gp_pin in self._BUTTON_MAP.items()]
-        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(group_serial, group_data)
-                                                  for group_serial, group_data in RIGHT_KEY_GROUPS.items()])
+        self._debouncer = Debouncer(pkeys_mask=pkeys_to_mask(self._BUTTON_MAP.keys()), mode=DebounceMode.EAGER)
+        chord_stats_map = {group_serial: ChordTimingStats() for group_serial in RIGHT_KEY_GROUPS}
+        self._chord_timing_store = ChordTimingStore(microcontroller.nvm, chord_stats_map)
+        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(group_serial, group_data,
+                                                           chord_stats=chord_stats_map[group_serial],
+                                                           speculative_vkeys=SPECULATIVE_VKEYS)
+                                                  for group_serial, group_data in RIGHT_KEY_GROUPS.items()],
+                                      combos=RIGHT_COMBOS)
     def init(self) -> None:
         print('init')
+        if self._chord_timing_store.load():
+            print('chord timing loaded')
         self._trackball_sensor.init_sensor()
         print('init uart...')
         self._uart.wait_for_start()
 
-    def main_loop(self) -> None:
-        while True:
-            t = time.monotonic() * 1000  # todo: before or after get_pressed_keys()?
-
-            mouse_dx_dy = self._trackball_sensor.update_sensor()
-            if mouse_dx_dy is not None:
-                self._uart.write_mouse_move(*mouse_dx_dy)
-
-            pressed_pkeys = self._get_pressed_pkeys()
-            vkey_events = list(self._kbd_half.update(time=t, cur_pressed_pkeys=pressed_pkeys))
-            if len(vkey_events) > 0:
-                self._uart.write_vkey_events(vkey_events)
-
-            time.sleep(0.01)
-
-    def _get_pressed_pkeys(self) -> set[PhysicalKeySerial]:
-        return {button.pkey_serial
-                for button in self._buttons
-                if button.is_pressed()}
+    async def main_loop(self) -> None:
+        await asyncio.gather(run_periodically(self._scan_keys, self.KEY_SCAN_INTERVAL),
+                             run_periodically(self._read_trackball, self.TRACKBALL_READ_INTERVAL),
+                             run_periodically(self._chord_timing_store.save_if_needed,
+                                              self.CHORD_TIMING_SAVE_INTERVAL))
+
+    def _scan_keys(self) -> None:
+        t = time.monotonic() * 1000  # todo: before or after get_pressed_keys()?
+        pressed_pkeys_mask = self._debouncer.update(self._get_pressed_pkeys_mask())
+        vkey_events = list(self._kbd_half.update_by_mask(time=t, cur_pressed_pkeys_mask=pressed_pkeys_mask))
+        if len(vkey_events) > 0:
+            self._uart.write_vkey_events(vkey_events, time=t)
+
+    def _read_trackball(self) -> None:
+        mouse_dx_dy = self._trackball_sensor.update_sensor()
+        if mouse_dx_dy is not None:
+            self._uart.write_mouse_move(*mouse_dx_dy)
+
+    def _get_pressed_pkeys_mask(self) -> PhysicalKeysMask:
+        mask = 0
+        for button in self._buttons:
+            if button.is_pressed():
+                mask |= button.pkey_mask
+        return mask
 
     # def print_keyboard_info(self, virt_keyboard: VirtualKeyboard) -> None:
     #     for vkey in virt_keyboard.iter_all_virtual_keys():
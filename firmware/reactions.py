@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from array import array
+
 from base import KeyCode
 
 
@@ -18,7 +20,32 @@ class MouseButtonCmdKind:
 KeyCmdKindValue = int
 
 
+class Opcode:  # enum, index into the handler table of the keyboard side
+    KEY_RELEASE = 0  # == KeyCmdKind, argument: key code
+    KEY_PRESS = 1
+    KEY_SEND = 2
+    MOUSE_RELEASE = 3  # == MOUSE_RELEASE + MouseButtonCmdKind, argument: button no
+    MOUSE_PRESS = 4
+    MOUSE_CLICK = 5
+    MOUSE_WHEEL = 6  # argument: offset (signed byte)
+    LOG = 7
+    DELAY = 8  # only in macros, argument: ms
+    MACRO = 9  # argument: macro index
+
+
+ReactionCode = int  # opcode << 8 | argument, fits in array('H')
+
+
+def make_reaction_code(opcode: int, argument: int = 0) -> ReactionCode:
+    return (opcode << 8) | (argument & 0xFF)
+
+
 class ReactionCmd:
+    """ readable form of a reaction code (used to create the layout and in tests)
+    """
+
+    def to_code(self) -> ReactionCode:
+        raise NotImplementedError()
 
     def __ne__(self, other: ReactionCmd) -> bool:
         return not self == other
@@ -33,6 +60,9 @@ class KeyCmd(ReactionCmd):
         self.kind = kind
         self.key_code = key_code
 
+    def to_code(self) -> ReactionCode:
+        return make_reaction_code(Opcode.KEY_RELEASE + self.kind, self.key_code)
+
     def __str__(self) -> str:
         if self.kind == KeyCmdKind.KEY_PRESS:
             return f'press({self.key_code})'
@@ -51,6 +81,9 @@ class MouseButtonCmd(ReactionCmd):
         self.button_no = button_no
         self.kind = kind
 
+    def to_code(self) -> ReactionCode:
+        return make_reaction_code(Opcode.MOUSE_RELEASE + self.kind, self.button_no)
+
     def __str__(self) -> str:
         return f'mouse press({self.button_no})'
 
@@ -63,6 +96,9 @@ class MouseWheelCmd(ReactionCmd):
     def __init__(self, offset: int):
         self.offset = offset
 
+    def to_code(self) -> ReactionCode:
+        return make_reaction_code(Opcode.MOUSE_WHEEL, self.offset)
+
     def __str__(self) -> str:
         return f'mouse wheel({self.offset})'
 
@@ -75,13 +111,106 @@ class LogCmd(ReactionCmd):
     def __init__(self):
         pass
 
+    def to_code(self) -> ReactionCode:
+        return make_reaction_code(Opcode.LOG)
+
+    def __str__(self) -> str:
+        return 'log'
+
+    def __eq__(self, other: ReactionCmd) -> bool:
+        return isinstance(other, LogCmd)
+
+
+class DelayCmd(ReactionCmd):
+    """ pause of a macro
+    """
+    MAX_DELAY = 0xFF  # ms per code, longer delays are split
+
+    def __init__(self, delay: int):
+        self.delay = delay
+
+    def to_code(self) -> ReactionCode:
+        assert 0 <= self.delay <= self.MAX_DELAY
+        return make_reaction_code(Opcode.DELAY, self.delay)
+
+    def __str__(self) -> str:
+        return f'delay({self.delay})'
+
+    def __eq__(self, other: ReactionCmd) -> bool:
+        return isinstance(other, DelayCmd) and self.delay == other.delay
+
+
+class MacroCmd(ReactionCmd):
+    """ starts playing a macro (s. macroplayer.py)
+    """
+
+    def __init__(self, macro_index: int):
+        self.macro_index = macro_index
+
+    def to_code(self) -> ReactionCode:
+        return make_reaction_code(Opcode.MACRO, self.macro_index)
+
+    def __str__(self) -> str:
+        return f'macro({self.macro_index})'
+
+    def __eq__(self, other: ReactionCmd) -> bool:
+        return isinstance(other, MacroCmd) and self.macro_index == other.macro_index
+
 
 ReactionCommands = list  # list[ReactionCmd]
+ReactionCodes = array  # array('H') of ReactionCode
+
+
+def encode_reaction_cmds(reaction_commands: ReactionCommands) -> ReactionCodes:
+    return array('H', [reaction_cmd.to_code() for reaction_cmd in reaction_commands])
+
+
+def decode_reaction_code(reaction_code: ReactionCode) -> ReactionCmd:
+    opcode = reaction_code >> 8
+    argument = reaction_code & 0xFF
+    if opcode <= Opcode.KEY_SEND:
+        return KeyCmd(kind=opcode - Opcode.KEY_RELEASE, key_code=argument)
+    elif opcode <= Opcode.MOUSE_CLICK:
+        return MouseButtonCmd(argument, kind=opcode - Opcode.MOUSE_RELEASE)
+    elif opcode == Opcode.MOUSE_WHEEL:
+        return MouseWheelCmd(offset=argument if argument < 128 else argument - 256)
+    elif opcode == Opcode.LOG:
+        return LogCmd()
+    elif opcode == Opcode.DELAY:
+        return DelayCmd(delay=argument)
+    elif opcode == Opcode.MACRO:
+        return MacroCmd(macro_index=argument)
+    raise ValueError(f'unknown reaction code {reaction_code:#x}')
+
+
+def decode_reaction_codes(reaction_codes) -> ReactionCommands:
+    """ p.e. for VirtualKeyboard.update() in tests and logs
+    """
+    return [decode_reaction_code(reaction_code) for reaction_code in reaction_codes]
 
 
 class OneKeyReactions:  # KeySetting?
+    """ the commands are stored as reaction codes, so sending them allocates nothing
+    """
 
     def __init__(self, on_press_key_reaction_commands: ReactionCommands,
-                 on_release_key_reaction_commands: ReactionCommands):
-        self.on_press_key_reaction_commands = on_press_key_reaction_commands
-        self.on_release_key_reaction_commands = on_release_key_reaction_commands
+                 on_release_key_reaction_commands: ReactionCommands,
+                 on_undo_reaction_commands: ReactionCommands | None = None):
+        """
+            on_undo_reaction_commands: None - not safe to undo (no speculative press)
+        """
+        self.on_press_reaction_codes = encode_reaction_cmds(on_press_key_reaction_commands)
+        self.on_release_reaction_codes = encode_reaction_cmds(on_release_key_reaction_commands)
+        self.on_undo_reaction_codes = None if on_undo_reaction_commands is None \
+            else encode_reaction_cmds(on_undo_reaction_commands)
+
+    @classmethod
+    def from_codes(cls, on_press_reaction_codes: ReactionCodes, on_release_reaction_codes: ReactionCodes,
+                   on_undo_reaction_codes: ReactionCodes | None = None) -> OneKeyReactions:
+        """ p.e. from the generated layout tables (s. layoutloader.py)
+        """
+        one_key_reactions = cls([], [])
+        one_key_reactions.on_press_reaction_codes = on_press_reaction_codes
+        one_key_reactions.on_release_reaction_codes = on_release_reaction_codes
+        one_key_reactions.on_undo_reaction_codes = on_undo_reaction_codes
+        return one_key_reactions
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from base import TimeInMs
+from deadlineheap import DeadlineHeap
+
+
+class DeadlineScheduler:
+    """ combines the deadlines of several sources (p.e. tap/hold terms, macro steps) into one wakeup time
+
+        Every source has a slot and sets its next deadline after each step. wait() sleeps until the earliest
+        deadline or until wake() is called (p.e. on a key change), so decisions are made at their deadline
+        and nothing is polled while idle.
+    """
+
+    def __init__(self, num_slots: int):
+        self._deadlines = DeadlineHeap(capacity=num_slots)
+        self._wake_event = asyncio.Event()
+
+    @property
+    def next_time(self) -> TimeInMs | None:
+        return self._deadlines.next_time
+
+    def set_deadline(self, slot: int, time: TimeInMs | None) -> None:
+        """ time: None - no deadline
+        """
+        self._deadlines.set(slot, time)
+
+    def wake(self) -> None:
+        self._wake_event.set()
+
+    async def wait(self) -> None:
+        next_time = self._deadlines.next_time
+        if next_time is None:
+            await self._wake_event.wait()
+        else:
+            delay_ms = next_time - time.monotonic() * 1000
+            if delay_ms > 0:
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), delay_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0)  # the other tasks run before the overdue step
+        self._wake_event.clear()
@@ -0,0 +1,92 @@
+import unittest
+
+from chordtiming import ChordTimingStats, ChordTimingStore
+
+
+class ChordTimingStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._stats = ChordTimingStats()
+
+    def test_not_enough_samples(self):
+        for _ in range(ChordTimingStats.MIN_SAMPLES - 1):
+            self._stats.record_gap(20)
+        self.assertIsNone(self._stats.term)
+
+        self._stats.record_gap(20)
+        self.assertEqual(25 + ChordTimingStats.SAFETY_MARGIN, self._stats.term)
+
+    def test_percentile(self):
+        """ 95 gaps of 20 ms and 5 slow ones - the slow ones are ignored
+        """
+        for _ in range(95):
+            self._stats.record_gap(22)
+        for _ in range(5):
+            self._stats.record_gap(140)
+        self.assertEqual(25 + ChordTimingStats.SAFETY_MARGIN, self._stats.term)
+
+        self._stats.record_gap(140)
+        self.assertEqual(145 + ChordTimingStats.SAFETY_MARGIN, self._stats.term)
+
+    def test_min_term(self):
+        for _ in range(ChordTimingStats.MIN_SAMPLES):
+            self._stats.record_gap(0)
+        self.assertEqual(ChordTimingStats.MIN_TERM, self._stats.term)
+
+    def test_gaps_beyond_last_bin(self):
+        for _ in range(ChordTimingStats.MIN_SAMPLES):
+            self._stats.record_gap(1000)
+        last_bin_end = ChordTimingStats.NUM_BINS * ChordTimingStats.BIN_WIDTH
+        self.assertEqual(last_bin_end + ChordTimingStats.SAFETY_MARGIN, self._stats.term)
+
+    def test_overflow_halves_counts(self):
+        stats = self._stats
+        for _ in range(0xFFFF):
+            stats.record_gap(32)
+        stats.record_gap(32)
+        self.assertEqual(bytes([0x00, 0x80]), stats.to_bytes()[12:14])  # 0x7FFF + 1
+        self.assertEqual(35 + ChordTimingStats.SAFETY_MARGIN, stats.term)
+
+
+class ChordTimingStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self._nvm = bytearray(256)
+
+    def test_empty_nvm(self):
+        store = ChordTimingStore(self._nvm, {1: ChordTimingStats()})
+        self.assertFalse(store.load())
+
+    def test_save_and_load(self):
+        stats_map = {1: ChordTimingStats(), 5: ChordTimingStats()}
+        for _ in range(ChordTimingStats.MIN_SAMPLES):
+            stats_map[5].record_gap(12)
+        store = ChordTimingStore(self._nvm, stats_map)
+        store.save()
+        self.assertEqual(0, stats_map[5].num_new_samples)
+
+        loaded_map = {1: ChordTimingStats(), 5: ChordTimingStats()}
+        self.assertTrue(ChordTimingStore(self._nvm, loaded_map).load())
+        self.assertIsNone(loaded_map[1].term)
+        self.assertEqual(stats_map[5].term, loaded_map[5].term)
+
+    def test_save_if_needed(self):
+        stats = ChordTimingStats()
+        store = ChordTimingStore(self._nvm, {1: stats})
+
+        for _ in range(ChordTimingStore.SAVE_INTERVAL - 1):
+            stats.record_gap(12)
+        store.save_if_needed()
+        self.assertFalse(ChordTimingStore(self._nvm, {1: ChordTimingStats()}).load())
+
+        stats.record_gap(12)
+        store.save_if_needed()
+        self.assertTrue(ChordTimingStore(self._nvm, {1: ChordTimingStats()}).load())
+
+    def test_other_group_count(self):
+        ChordTimingStore(self._nvm, {1: ChordTimingStats()}).save()
+        self.assertFalse(ChordTimingStore(self._nvm, {1: ChordTimingStats(), 2: ChordTimingStats()}).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from clockskew import ClockSkewEstimator
+
+
+class ClockSkewEstimatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self._estimator = ClockSkewEstimator()
+
+    def test_first_sample(self):
+        self.assertEqual(1000.0, self._estimator.to_local_time(200, receive_time=1000.0))
+        self.assertEqual(800, self._estimator.offset)
+
+    def test_delayed_event(self):
+        self._estimator.to_local_time(200, receive_time=1000.0)
+        # sent at remote 300, received 5 ms later than the best sample
+        self.assertEqual(1100.0, self._estimator.to_local_time(300, receive_time=1105.0))
+
+    def test_smaller_sample_is_taken(self):
+        self._estimator.to_local_time(200, receive_time=1005.0)
+        self.assertEqual(1103.0, self._estimator.to_local_time(300, receive_time=1103.0))
+        self.assertEqual(803, self._estimator.offset)
+
+    def test_wrapping(self):
+        self._estimator.to_local_time(0xFFF0, receive_time=100000.0)
+        # remote clock wrapped: 0xFFF0 + 0x20 -> 0x0010
+        self.assertEqual(100032.0, self._estimator.to_local_time(0x0010, receive_time=100034.0))
+
+    def test_drift(self):
+        self._estimator.to_local_time(0, receive_time=1000.0)
+        offset = self._estimator.offset
+        self._estimator.to_local_time(100, receive_time=1110.0)
+        self.assertEqual(offset + ClockSkewEstimator.DRIFT_STEP, self._estimator.offset)
+
+    def test_lost_sync(self):
+        self._estimator.to_local_time(0, receive_time=1000.0)
+        self.assertEqual(3000.0, self._estimator.to_local_time(100, receive_time=3000.0))
@@ -0,0 +1,39 @@
+import unittest
+
+from deadlineheap import DeadlineHeap
+
+
+class DeadlineHeapTest(unittest.TestCase):
+
+    def setUp(self):
+        self._heap = DeadlineHeap(capacity=4)
+
+    def test_empty(self):
+        self.assertEqual(0, len(self._heap))
+        self.assertIsNone(self._heap.next_time)
+
+    def test_next(self):
+        self._heap.set(0, 30)
+        self._heap.set(1, 10)
+        self._heap.set(2, 20)
+        self.assertEqual(10, self._heap.next_time)
+        self.assertEqual(1, self._heap.next_slot)
+
+    def test_update_and_remove(self):
+        self._heap.set(0, 30)
+        self._heap.set(1, 10)
+        self._heap.set(2, 20)
+        self._heap.set(1, 40)
+        self.assertEqual((2, 20), (self._heap.next_slot, self._heap.next_time))
+
+        self._heap.remove(2)
+        self._heap.set(3, None)
+        self.assertEqual((0, 30), (self._heap.next_slot, self._heap.next_time))
+        self.assertEqual(2, len(self._heap))
+        self.assertIsNone(self._heap.get(2))
+
+    def test_same_deadline_ordered_by_slot(self):
+        self._heap.set(3, 10)
+        self._heap.set(1, 10)
+        self._heap.set(2, 10)
+        self.assertEqual(1, self._heap.next_slot)
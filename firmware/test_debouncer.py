@@ -0,0 +1,55 @@
+import unittest
+
+from debouncer import Debouncer, DebounceMode
+
+
+PKEY_A = 1
+PKEY_B = 2
+
+A = 1 << PKEY_A
+B = 1 << PKEY_B
+
+
+class EagerDebouncerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._debouncer = Debouncer(pkeys_mask=A | B, mode=DebounceMode.EAGER, debounce_scans=3)
+
+    def test_bouncing_press(self):
+        """ raw:       _|‾|_|‾‾‾‾‾‾
+            debounced: _|‾‾‾‾‾‾‾‾‾‾
+        """
+        self._scans(raw=[0, A, 0, A, A, A], expected=[0, A, A, A, A, A])
+
+    def test_bouncing_release(self):
+        self._scans(raw=[A, A, A, A, 0, A, 0, 0, 0], expected=[A, A, A, A, 0, 0, 0, 0, 0])
+
+    def test_independent_pkeys(self):
+        self._scans(raw=[A, A | B, B, B, 0], expected=[A, A | B, A | B, A | B, B])
+        self._scans(raw=[0], expected=[0])
+
+    def _scans(self, raw: list[int], expected: list[int]) -> None:
+        actual = [self._debouncer.update(raw_mask) for raw_mask in raw]
+        self.assertEqual(expected, actual)
+
+
+class DeferDebouncerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._debouncer = Debouncer(pkeys_mask=A | B, mode=DebounceMode.DEFER, debounce_scans=3)
+
+    def test_bouncing_press(self):
+        """ raw:       _|‾|_|‾‾‾‾‾‾‾‾
+            debounced: _______|‾‾‾‾‾‾
+        """
+        self._scans(raw=[0, A, 0, A, A, A, A], expected=[0, 0, 0, 0, 0, A, A])
+
+    def test_short_spike_is_ignored(self):
+        self._scans(raw=[A, A, 0, 0, 0, 0], expected=[0, 0, 0, 0, 0, 0])
+
+    def test_independent_pkeys(self):
+        self._scans(raw=[A, A | B, A | B, B, B, B], expected=[0, 0, A, A | B, A | B, B])
+
+    def _scans(self, raw: list[int], expected: list[int]) -> None:
+        actual = [self._debouncer.update(raw_mask) for raw_mask in raw]
+        self.assertEqual(expected, actual)
@@ -0,0 +1,41 @@
+import unittest
+
+from fixedkeylist import FixedKeyList
+from virtualkeyboard import SimpleKey
+
+
+class FixedKeyListTest(unittest.TestCase):
+
+    def setUp(self):
+        self._keys = [SimpleKey(serial) for serial in range(4)]
+        self._list = FixedKeyList(capacity=4)
+        for key in self._keys:
+            self._list.append(key)
+
+    def test_append_beyond_capacity(self):
+        with self.assertRaises(IndexError):
+            self._list.append(SimpleKey(9))
+
+    def test_mark_and_compact_keeps_order(self):
+        self._list.mark(0)
+        self._list.mark(2)
+        self.assertEqual(4, len(self._list))
+
+        self._list.compact()
+        self.assertEqual([self._keys[1], self._keys[3]], [self._list[i] for i in range(len(self._list))])
+        self.assertNotIn(self._keys[0], self._list)
+
+        self._list.append(self._keys[0])
+        self.assertEqual(2, self._list.index(self._keys[0]))
+
+    def test_remove(self):
+        self._list.remove(self._keys[1])
+        self.assertEqual(-1, self._list.index(self._keys[1]))
+        self.assertEqual([self._keys[0], self._keys[2], self._keys[3]], list(self._list))
+
+        with self.assertRaises(ValueError):
+            self._list.remove(self._keys[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
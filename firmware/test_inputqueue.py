@@ -0,0 +1,61 @@
+import unittest
+
+from inputqueue import InputQueue
+from keyboardhalf import VKeyPressEvent
+
+
+class InputQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self._queue = InputQueue(capacity=2)
+
+    def _push(self, time, mask=0, dx=0, encoder_offset=0, other_vkey_events=()):
+        self._queue.push(time=time, my_pressed_pkeys_mask=mask, mouse_dx=dx, mouse_dy=0,
+                         encoder_offset=encoder_offset, other_vkey_events=list(other_vkey_events))
+
+    def test_empty(self):
+        self.assertEqual(0, len(self._queue))
+        self.assertIsNone(self._queue.pop())
+
+    def test_merge_mouse_moves(self):
+        self._push(1, dx=2)
+        self._push(2, dx=3, encoder_offset=1)
+        self._push(3)
+
+        self.assertEqual(1, len(self._queue))
+        item = self._queue.pop()
+        self.assertEqual((3, 5, 1), (item.time, item.mouse_dx, item.encoder_offset))
+        self.assertIsNone(self._queue.pop())
+
+    def test_key_change_keeps_time(self):
+        self._push(1, mask=0x1)
+        self._push(2, mask=0x1, dx=4)
+        self._push(3, mask=0x3)
+
+        item = self._queue.pop()
+        self.assertEqual((1, 0x1, 4), (item.time, item.my_pressed_pkeys_mask, item.mouse_dx))
+        item = self._queue.pop()
+        self.assertEqual((3, 0x3), (item.time, item.my_pressed_pkeys_mask))
+
+    def test_events_are_copied(self):
+        vkey_events = [VKeyPressEvent(vkey_serial=1, pressed=True)]
+        self._push(1, other_vkey_events=vkey_events)
+        vkey_events.clear()
+
+        self.assertEqual(1, len(self._queue.pop().other_vkey_events))
+
+    def test_overflow(self):
+        self._push(1, mask=0x1)
+        self._push(2, mask=0x3)
+        self._push(3, mask=0x7, other_vkey_events=[VKeyPressEvent(vkey_serial=1, pressed=True)])
+
+        self.assertEqual(2, len(self._queue))
+        self.assertEqual(1, self._queue.num_overflows)
+        self._queue.pop()
+        item = self._queue.pop()
+        self.assertEqual((3, 0x7, 1), (item.time, item.my_pressed_pkeys_mask, len(item.other_vkey_events)))
+
+    def test_ring(self):
+        for time in range(1, 6):
+            self._push(time, mask=time)
+            self.assertEqual(time, self._queue.pop().my_pressed_pkeys_mask)
@@ -5,8 +5,8 @@ from kbdlayoutdata import VIRTUAL_KEY_ORDER, LAYERS, \
     MODIFIERS, MACROS
 from keyboardcreator import KeyboardCreator
 from keyboardhalf import VKeyPressEvent
-from keysdata import LPU, NO_KEY
-from reactions import KeyCmdKind, KeyCmd
+from keysdata import LPU, LPD, NO_KEY, LC1, LC2
+from reactions import KeyCmdKind, KeyCmd, DelayCmd, MacroCmd, decode_reaction_codes
 
 
 class KeyboardCreatorTest(unittest.TestCase):
@@ -20,10 +20,106 @@ class KeyboardCreatorTest(unittest.TestCase):
         keyboard = creator.create()
 
         vkey_event = VKeyPressEvent(vkey_serial=LPU, pressed=True)
-        act_reaction_commands = list(keyboard.update(time=210, vkey_events=[vkey_event]))
+        act_reaction_commands = decode_reaction_codes(keyboard.update(time=210, vkey_events=[vkey_event]))
         expected_reaction_commands = [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.A)]
         self.assertEqual(expected_reaction_commands, act_reaction_commands)
 
+    def test_combo(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU]],
+                                  layers={NO_KEY: ['a']},
+                                  modifiers={},
+                                  macros={},
+                                  combos={LC1: 'b'},
+                                  )
+        keyboard = creator.create()
+
+        vkey_event = VKeyPressEvent(vkey_serial=LC1, pressed=True)
+        act_reaction_commands = decode_reaction_codes(keyboard.update(time=210, vkey_events=[vkey_event]))
+        expected_reaction_commands = [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.B)]
+        self.assertEqual(expected_reaction_commands, act_reaction_commands)
+
+    def test_combo_without_reaction(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU]],
+                                  layers={NO_KEY: ['a']},
+                                  modifiers={},
+                                  macros={},
+                                  combos={LC1: 'b'},
+                                  combo_vkeys={LC1, LC2},
+                                  )
+        with self.assertRaises(ValueError):
+            creator.create()
+
+    def test_combo_reaction_without_combo(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU]],
+                                  layers={NO_KEY: ['a']},
+                                  modifiers={},
+                                  macros={},
+                                  combos={LC1: 'b', LC2: 'c'},
+                                  combo_vkeys={LC1},
+                                  )
+        with self.assertRaises(ValueError):
+            creator.create()
+
+    def test_tap_hold_strategy(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU, LPD]],
+                                  layers={NO_KEY: ['a b']},
+                                  modifiers={LPU: ('LShift', 'HoldOnOtherKeyPress')},
+                                  macros={},
+                                  )
+        keyboard = creator.create()
+
+        self.assertEqual([], decode_reaction_codes(keyboard.update(time=0, vkey_events=[VKeyPressEvent(LPU, pressed=True)])))
+        act_reaction_commands = decode_reaction_codes(keyboard.update(time=10, vkey_events=[VKeyPressEvent(LPD, pressed=True)]))
+        expected_reaction_commands = [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.LEFT_SHIFT),
+                                      KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.B)]
+        self.assertEqual(expected_reaction_commands, act_reaction_commands)
+
+    def test_interned_reactions(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU, LPD]],
+                                  layers={NO_KEY: ['a LShift'],
+                                          LPU: ['LShift a']},
+                                  modifiers={},
+                                  macros={},
+                                  )
+        keyboard = creator.create()
+
+        default_layer = keyboard.layer_tables[0]
+        lpu_layer = keyboard.layer_tables[1]
+        self.assertIs(default_layer[LPU], lpu_layer[LPD])
+        self.assertIs(default_layer[LPD], lpu_layer[LPU])
+        self.assertEqual(2, creator.num_interned_reactions)
+        self.assertEqual(4, creator.num_reaction_cells)
+
+    def test_macro(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU]],
+                                  layers={NO_KEY: ['M1']},
+                                  modifiers={},
+                                  macros={'M0': 'a', 'M1': 'A 300ms b'},
+                                  )
+        keyboard = creator.create()
+
+        act_reaction_commands = decode_reaction_codes(keyboard.update(time=210, vkey_events=[VKeyPressEvent(LPU, True)]))
+        self.assertEqual([MacroCmd(macro_index=1)], act_reaction_commands)
+
+        expected_macro_commands = [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.LEFT_SHIFT),
+                                   KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.A),
+                                   KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.A),
+                                   KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.LEFT_SHIFT),
+                                   DelayCmd(delay=255),
+                                   DelayCmd(delay=45),
+                                   KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.B),
+                                   KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.B)]
+        self.assertEqual(expected_macro_commands, decode_reaction_codes(creator.macro_codes[1]))
+
+    def test_macro_in_macro(self):
+        creator = KeyboardCreator(virtual_key_order=[[LPU]],
+                                  layers={NO_KEY: ['a']},
+                                  modifiers={},
+                                  macros={'M0': 'a', 'M1': 'M0'},
+                                  )
+        with self.assertRaises(ValueError):
+            creator.create()
+
     def test_with_real_layout(self):
         creator = KeyboardCreator(virtual_key_order=VIRTUAL_KEY_ORDER,
                                   layers=LAYERS,
@@ -33,7 +129,7 @@ class KeyboardCreatorTest(unittest.TestCase):
         keyboard = creator.create()
 
         vkey_event = VKeyPressEvent(vkey_serial=LPU, pressed=True)
-        act_reaction_commands = list(keyboard.update(time=210, vkey_events=[vkey_event]))   # todo: not working with 10
+        act_reaction_commands = decode_reaction_codes(keyboard.update(time=210, vkey_events=[vkey_event]))   # todo: not working with 10
 
         expected_reaction_commands = [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.Q)]
         self.assertEqual(expected_reaction_commands, act_reaction_commands)
@@ -0,0 +1,120 @@
+import unittest
+
+from base import TimeInMs, PhysicalKeySerial, VirtualKeySerial
+from keyboardhalf import KeyboardHalf, KeyGroup
+
+
+PKEY_A = 1
+PKEY_B = 2
+PKEY_X = 3
+PKEY_C = 4
+
+VKEY_A = 1
+VKEY_B = 2
+VKEY_X = 3
+VKEY_AB = 4  # combo over two groups
+VKEY_AC = 5  # chord in the group of a
+VKEY_ABX = 6  # combo over three groups
+
+
+class ComboTest(unittest.TestCase):
+
+    def setUp(self):
+        KeyGroup.COMBO_TERM = 50
+        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(1, {VKEY_A: [PKEY_A]}),
+                                                  KeyGroup(2, {VKEY_B: [PKEY_B]}),
+                                                  KeyGroup(3, {VKEY_X: [PKEY_X]})],
+                                      combos={VKEY_AB: [PKEY_A, PKEY_B]})
+        self._pressed_pkeys: set[PhysicalKeySerial] = set()
+
+    def test_abba_fast(self):
+        """       COMBO_TERM
+        +--------------|--------------+
+        | +----------+ |              |
+        | |    a     | |              |
+        | +----------+ |              |
+        |   +------+   |              |
+        |   |  b   |   |              |
+        |   +------+   |              |
+        +--------------|--------------+
+          | |      | |
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(10, press=PKEY_B, expect=[(VKEY_AB, True)])
+        self._step(20, release=PKEY_B, expect=[(VKEY_AB, False)])
+        self._step(30, release=PKEY_A, expect=[])
+
+    def test_a_fast(self):
+        """       COMBO_TERM
+        +--------------|--------------+
+        |  +--------+  |              |
+        |  |   a    |  |              |
+        |  +--------+  |              |
+        +--------------|--------------+
+           |        |
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(10, release=PKEY_A, expect=[(VKEY_A, True), (VKEY_A, False)])
+
+    def test_a_slow(self):
+        """       COMBO_TERM
+        +--------------|----------------+
+        | +------------|---+            |
+        | |    a       |   |            |
+        | +------------|---+            |
+        +--------------|----------------+
+          |              | |
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(60, expect=[(VKEY_A, True)])
+        self._step(70, release=PKEY_A, expect=[(VKEY_A, False)])
+
+    def test_a_slow_in_chord_group(self):
+        """ a is passed to its group with the time of its press, so the group does not wait COMBO_TERM again
+        """
+        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(1, {VKEY_A: [PKEY_A], VKEY_AC: [PKEY_A, PKEY_C]}),
+                                                  KeyGroup(2, {VKEY_B: [PKEY_B]})],
+                                      combos={VKEY_AB: [PKEY_A, PKEY_B]})
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(50, expect=[(VKEY_A, True)])
+        self._step(70, release=PKEY_A, expect=[(VKEY_A, False)])
+
+    def test_ab_released_at_combo_term(self):
+        """ ab can still grow into abx, both are released in the first update after COMBO_TERM
+        """
+        self._kbd_half = KeyboardHalf(key_groups=[KeyGroup(1, {VKEY_A: [PKEY_A]}),
+                                                  KeyGroup(2, {VKEY_B: [PKEY_B]}),
+                                                  KeyGroup(3, {VKEY_X: [PKEY_X]})],
+                                      combos={VKEY_AB: [PKEY_A, PKEY_B], VKEY_ABX: [PKEY_A, PKEY_B, PKEY_X]})
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(10, press=PKEY_B, expect=[])
+        self._pressed_pkeys.clear()
+        self._step(60, expect=[(VKEY_AB, True), (VKEY_AB, False)])
+        self._step(70, press=PKEY_A, expect=[])
+
+    def test_ax(self):
+        """ x can't be part of a combo => a is decided at once
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(10, press=PKEY_X, expect=[(VKEY_A, True), (VKEY_X, True)])
+        self._step(20, release=PKEY_X, expect=[(VKEY_X, False)])
+        self._step(30, release=PKEY_A, expect=[(VKEY_A, False)])
+
+    def test_x_without_delay(self):
+        self._step(0, press=PKEY_X, expect=[(VKEY_X, True)])
+        self._step(10, release=PKEY_X, expect=[(VKEY_X, False)])
+
+    def _step(self, time: TimeInMs,
+              press: PhysicalKeySerial | None = None,
+              release: PhysicalKeySerial | None = None,
+              expect: list[tuple[VirtualKeySerial, bool]] | None = None
+              ) -> None:
+        if press:
+            self._pressed_pkeys.add(press)
+        if release:
+            self._pressed_pkeys.remove(release)
+
+        vkey_events = list(self._kbd_half.update(time=time, cur_pressed_pkeys=self._pressed_pkeys))
+        actual_result = [(vkey_evt.vkey_serial, vkey_evt.pressed) for vkey_evt in vkey_events]
+
+        self.assertEqual(expect, actual_result)
@@ -1,15 +1,22 @@
 import unittest
 
 from base import TimeInMs, PhysicalKeySerial, VirtualKeySerial
+from chordtiming import ChordTimingStats
 from keyboardhalf import KeyGroup
+from kbdlayoutdata import LEFT_KEY_GROUPS
+from keysdata import LI, LI1M, LI2M, LEFT_INDEX_UP, LEFT_INDEX_DOWN, LEFT_INDEX_RIGHT
 
 
 PKEY_A = 1
 PKEY_B = 2
+PKEY_C = 3
+PKEY_D = 4
 
 VKEY_A = 1
 VKEY_B = 2
 VKEY_C = 3
+VKEY_D = 4
+VKEY_E = 5
 
 
 class KeyGroupTestBase(unittest.TestCase):
@@ -215,3 +222,178 @@ class KeyGroupTest2Combo(KeyGroupTestBase):
         self._step(60, press=PKEY_B, expect=[(VKEY_A, True)])
         self._step(120, release=PKEY_A, expect=[(VKEY_A, False), (VKEY_B, True)])
         self._step(130, release=PKEY_B, expect=[(VKEY_B, False)])
+
+
+class KeyGroupTestTwoVKeys(KeyGroupTestBase):
+
+    @staticmethod
+    def _create_key_group() -> KeyGroup:
+        return KeyGroup(serial=1, vkey_map={VKEY_A: [PKEY_A],
+                                            VKEY_B: [PKEY_B],
+                                            VKEY_C: [PKEY_A, PKEY_B],
+                                            VKEY_D: [PKEY_C]})
+
+    def test_ad_together(self):
+        """ a and d (pkey c) are pressed in one scan
+
+                  COMBO_TERM
+        +--------------|--------------+
+        | +------------|---+          |
+        | |    a       |   |          |
+        | +------------|---+          |
+        | +------------|------+       |
+        | |    d       |      |       |
+        | +------------|------+       |
+        +--------------|--------------+
+          |            |   |  |
+        """
+        self._step(0, press=PKEY_A)
+        self._step(0, press=PKEY_C, expect=[(VKEY_A, True), (VKEY_D, True)])  # d decides a
+        self._step(60, expect=[])
+        self._step(70, release=PKEY_A, expect=[(VKEY_A, False)])
+        self._step(80, release=PKEY_C, expect=[(VKEY_D, False)])
+
+    def test_adad_fast(self):
+        """ d (pkey c) decides a, which can still grow into c
+
+                  COMBO_TERM
+        +--------------|--------------+
+        | +-----+      |              |
+        | |  a  |      |              |
+        | +-----+      |              |
+        |   +------+   |              |
+        |   |  d   |   |              |
+        |   +------+   |              |
+        +--------------|--------------+
+          | |   |  |
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(10, press=PKEY_C, expect=[(VKEY_A, True), (VKEY_D, True)])
+        self._step(20, release=PKEY_A, expect=[(VKEY_A, False)])
+        self._step(30, release=PKEY_C, expect=[(VKEY_D, False)])
+
+
+class KeyGroupTestTwoChords(KeyGroupTestBase):
+
+    @staticmethod
+    def _create_key_group() -> KeyGroup:
+        return KeyGroup(serial=1, vkey_map={VKEY_A: [PKEY_A],
+                                            VKEY_B: [PKEY_B],
+                                            VKEY_C: [PKEY_A, PKEY_B],
+                                            VKEY_D: [PKEY_C],
+                                            VKEY_E: [PKEY_C, PKEY_D]})
+
+    def test_ad_rolling(self):
+        """ a and d (pkey c) are both undecided, the press of d does not postpone the decision of a
+
+                  COMBO_TERM(a)   COMBO_TERM(d)
+        +--------------|--------------|--------------+
+        | +------------|--------------|-----+        |
+        | |    a       |              |     |        |
+        | +------------|--------------|-----+        |
+        |        +-----|--------------|--------+     |
+        |        |  d  |              |        |     |
+        |        +-----|--------------|--------+     |
+        +--------------|--------------|--------------+
+          |      |     |              |
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(30, press=PKEY_C, expect=[])
+        self._step(50, expect=[(VKEY_A, True)])
+        self._step(70, expect=[])
+        self._step(80, expect=[(VKEY_D, True)])
+        self._step(90, release=PKEY_A, expect=[(VKEY_A, False)])
+        self._step(100, release=PKEY_C, expect=[(VKEY_D, False)])
+
+
+class KeyGroupTestIndexFinger(KeyGroupTestBase):
+
+    @staticmethod
+    def _create_key_group() -> KeyGroup:
+        return KeyGroup(serial=LI, vkey_map=LEFT_KEY_GROUPS[LI])
+
+    def test_roll_over_all_three(self):
+        """ up, down and right are pressed in one scan => two vkeys instead of nothing
+        """
+        self._step(0, press=LEFT_INDEX_UP)
+        self._step(0, press=LEFT_INDEX_DOWN)
+        self._step(0, press=LEFT_INDEX_RIGHT, expect=[(LI1M, True), (LI2M, True)])
+        self._step(20, release=LEFT_INDEX_RIGHT, expect=[(LI2M, False)])
+        self._step(30, release=LEFT_INDEX_UP, expect=[(LI1M, False)])
+        self._step(40, release=LEFT_INDEX_DOWN, expect=[])
+
+
+class KeyGroupTestLearnedTerm(KeyGroupTestBase):
+
+    def setUp(self):
+        self._chord_stats = ChordTimingStats()
+        for _ in range(ChordTimingStats.MIN_SAMPLES):
+            self._chord_stats.record_gap(10)
+        self._chord_stats.mark_saved()
+        super().setUp()
+
+    def _create_key_group(self) -> KeyGroup:
+        return KeyGroup(serial=1, vkey_map={VKEY_A: [PKEY_A],
+                                            VKEY_B: [PKEY_B],
+                                            VKEY_C: [PKEY_A, PKEY_B]},
+                        chord_stats=self._chord_stats)
+
+    def test_a_decided_earlier(self):
+        """   learned term    COMBO_TERM
+        +--------|--------------|-----+
+        | +------|--------+     |     |
+        | |    a |        |     |     |
+        | +------|--------+     |     |
+        +--------|--------------|-----+
+          |      |        |
+        """
+        self.assertEqual(30, self._key_group.combo_term)
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(30, expect=[(VKEY_A, True)])
+        self._step(60, release=PKEY_A, expect=[(VKEY_A, False)])
+        self.assertEqual(0, self._chord_stats.num_new_samples)
+
+    def test_chord_gap_is_recorded(self):
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(12, press=PKEY_B, expect=[(VKEY_C, True)])
+        self._step(50, release=PKEY_A, expect=[(VKEY_C, False)])
+        self.assertEqual(1, self._chord_stats.num_new_samples)
+
+    def test_missed_chord_is_recorded(self):
+        """ b comes after the learned term, but within COMBO_TERM
+        """
+        self._step(0, press=PKEY_A, expect=[])
+        self._step(30, expect=[(VKEY_A, True)])
+        self._step(40, press=PKEY_B, expect=[])
+        self.assertEqual(1, self._chord_stats.num_new_samples)
+
+
+class KeyGroupTestSpeculative(KeyGroupTestBase):
+
+    @staticmethod
+    def _create_key_group() -> KeyGroup:
+        return KeyGroup(serial=1, vkey_map={VKEY_A: [PKEY_A],
+                                            VKEY_B: [PKEY_B],
+                                            VKEY_C: [PKEY_A, PKEY_B]},
+                        speculative_vkeys={VKEY_A})
+
+    def test_a_confirmed_by_release(self):
+        self._step(0, press=PKEY_A, expect=[(VKEY_A, True)])
+        self._step(10, release=PKEY_A, expect=[(VKEY_A, True), (VKEY_A, False)])
+
+    def test_a_confirmed_by_time(self):
+        self._step(0, press=PKEY_A, expect=[(VKEY_A, True)])
+        self._step(50, expect=[(VKEY_A, True)])
+        self._step(60, release=PKEY_A, expect=[(VKEY_A, False)])
+
+    def test_ab_rolled_back(self):
+        self._step(0, press=PKEY_A, expect=[(VKEY_A, True)])
+        events = list(self._key_group.update(time=10, all_pressed_pkeys={PKEY_A, PKEY_B}))
+        self.assertEqual([(VKEY_A, False, True), (VKEY_C, True, False)],
+                         [(evt.vkey_serial, evt.pressed, evt.speculative) for evt in events])
+        self._pressed_pkeys.add(PKEY_B)
+        self._step(20, release=PKEY_A, expect=[(VKEY_C, False)])
+
+    def test_b_is_not_speculative(self):
+        self._step(0, press=PKEY_B, expect=[])
+        self._step(10, release=PKEY_B, expect=[(VKEY_B, True), (VKEY_B, False)])
@@ -0,0 +1,55 @@
+import unittest
+
+from adafruit_hid.keycode import Keycode as KC
+
+from keyboardhalf import VKeyPressEvent
+from keylog import KeyLog, KeyLogKind, LogItemDumper
+from keysdata import LPU, LPD
+from reactions import KeyCmdKind, KeyCmd
+
+
+def _press_code(key_code: int) -> int:
+    return KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=key_code).to_code()
+
+
+class KeyLogTest(unittest.TestCase):
+
+    def _add_tick(self, key_log: KeyLog, time: int, vkey_serial: int) -> None:
+        key_log.add_tick(time)
+        key_log.add_vkey_events(KeyLogKind.MY_VKEY_EVENT, [VKeyPressEvent(vkey_serial, pressed=True)])
+        key_log.add_reaction_codes([_press_code(KC.A)])
+
+    def test_dump(self):
+        key_log = KeyLog(capacity=16)
+        key_log.add_tick(65536 + 10)
+        key_log.add_vkey_events(KeyLogKind.OTHER_VKEY_EVENT, [VKeyPressEvent(LPD, pressed=False, speculative=True)])
+        key_log.add_vkey_events(KeyLogKind.MY_VKEY_EVENT, [VKeyPressEvent(LPU, pressed=True)])
+        key_log.add_reaction_codes([_press_code(KC.A)])
+
+        dumper = LogItemDumper(key_code_map={KC.A: 'a'})
+        self.assertEqual(['10: , other=[~lpd], self=[+lpu],  -> [+a]'],
+                         [dumper.dump(log_item) for log_item in key_log.iter_log_items()])
+
+    def test_late_time(self):
+        key_log = KeyLog(capacity=16)
+        self._add_tick(key_log, 0xFFFF, LPU)
+
+        self.assertEqual([0xFFFF], [log_item.time for log_item in key_log.iter_log_items()])
+
+    def test_skipped_ticks(self):
+        key_log = KeyLog(capacity=16)
+        for time in (1, 2, 3):
+            self._add_tick(key_log, time, LPU)
+
+        self.assertEqual([1], [log_item.time for log_item in key_log.iter_log_items(num_skipped_ticks=2)])
+
+    def test_overwritten(self):
+        key_log = KeyLog(capacity=4)
+        self._add_tick(key_log, 1, LPU)
+        self._add_tick(key_log, 2, LPD)
+
+        self.assertEqual(4, len(key_log))
+        log_items = list(key_log.iter_log_items())
+        self.assertEqual([2], [log_item.time for log_item in log_items])
+        self.assertEqual(LPD, log_items[0].my_vkey_events[0].vkey_serial)
+        self.assertEqual([_press_code(KC.A)], log_items[0].reaction_codes)
@@ -0,0 +1,56 @@
+import os
+import types
+import unittest
+
+import kbdlayoutdata
+from keyboardhalf import VKeyPressEvent
+from keysdata import LTD, RI1M
+from layoutcompiler import LayoutCompiler
+from layoutloader import create_virtual_keyboard
+from reactions import decode_reaction_codes
+
+
+class LayoutCompilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._compiler = LayoutCompiler(kbdlayoutdata)
+        self._source = self._compiler.compile()
+        self._tables = types.ModuleType('layouttables')
+        exec(compile(self._source, 'layouttables.py', 'exec'), self._tables.__dict__)
+
+    def test_same_layer_tables(self):
+        expected_keyboard = self._compiler.create_creator().create()
+        actual_keyboard = create_virtual_keyboard(self._tables)
+
+        self.assertEqual(len(expected_keyboard.layer_tables), len(actual_keyboard.layer_tables))
+        for expected_layer, actual_layer in zip(expected_keyboard.layer_tables, actual_keyboard.layer_tables):
+            self.assertEqual(expected_layer is None, actual_layer is None)
+            if expected_layer is None:
+                continue
+            self.assertEqual([self._to_codes(reactions) for reactions in expected_layer],
+                             [self._to_codes(reactions) for reactions in actual_layer])
+
+    def test_layer_key(self):
+        keyboard = create_virtual_keyboard(self._tables)
+        self.assertEqual([], decode_reaction_codes(keyboard.update(0, [VKeyPressEvent(LTD, pressed=True)])))
+        self.assertEqual([], decode_reaction_codes(keyboard.update(300, [])))
+        expected_keyboard = self._compiler.create_creator().create()
+        list(expected_keyboard.update(0, [VKeyPressEvent(LTD, pressed=True)]))
+        list(expected_keyboard.update(300, []))
+
+        vkey_events = [VKeyPressEvent(RI1M, pressed=True)]
+        self.assertEqual(decode_reaction_codes(expected_keyboard.update(310, vkey_events)),
+                         decode_reaction_codes(keyboard.update(310, vkey_events)))
+
+    def test_generated_module_is_up_to_date(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouttables.py')
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(self._source, file.read(), 'run layoutcompiler.py')
+
+    @staticmethod
+    def _to_codes(one_key_reactions) -> tuple | None:
+        if one_key_reactions is None:
+            return None
+        undo_codes = one_key_reactions.on_undo_reaction_codes
+        return (list(one_key_reactions.on_press_reaction_codes), list(one_key_reactions.on_release_reaction_codes),
+                None if undo_codes is None else list(undo_codes))
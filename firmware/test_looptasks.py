@@ -0,0 +1,39 @@
+import asyncio
+import unittest
+
+import looptasks
+from looptasks import run_periodically
+
+
+class LoopTasksTest(unittest.TestCase):
+
+    def test_periodically(self):
+        calls = []
+
+        async def run():
+            task = asyncio.create_task(run_periodically(lambda: calls.append(1), interval_ms=1))
+            await asyncio.sleep(0.02)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertGreater(len(calls), 2)
+
+    def test_error_continues(self):
+        calls = []
+
+        def step():
+            calls.append(1)
+            raise ValueError('step')
+
+        async def run():
+            task = asyncio.create_task(run_periodically(step, interval_ms=1))
+            await asyncio.sleep(0.03)
+            task.cancel()
+
+        error_pause = looptasks.ERROR_PAUSE
+        looptasks.ERROR_PAUSE = 0.001
+        try:
+            asyncio.run(run())
+        finally:
+            looptasks.ERROR_PAUSE = error_pause
+        self.assertGreater(len(calls), 1)
@@ -0,0 +1,57 @@
+import unittest
+from array import array
+
+from adafruit_hid.keycode import Keycode as KC
+
+from macroplayer import MacroPlayer
+from reactions import KeyCmdKind, KeyCmd, DelayCmd, encode_reaction_cmds, decode_reaction_codes
+
+
+def _tap(key_code: int) -> list:
+    return [KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=key_code), KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=key_code)]
+
+
+class MacroPlayerTest(unittest.TestCase):
+
+    def test_not_playing(self):
+        player = MacroPlayer([array('H')])
+        self.assertFalse(player.is_playing)
+        self.assertEqual([], list(player.update(time=0)))
+
+    def test_few_codes_per_update(self):
+        macro_cmds = _tap(KC.A) + _tap(KC.B) + _tap(KC.C)
+        player = MacroPlayer([encode_reaction_cmds(macro_cmds)])
+        player.play(0)
+
+        self.assertEqual(macro_cmds[:4], decode_reaction_codes(player.update(time=0)))
+        self.assertTrue(player.is_playing)
+        self.assertEqual(macro_cmds[4:], decode_reaction_codes(player.update(time=1)))
+        self.assertEqual([], list(player.update(time=2)))
+        self.assertFalse(player.is_playing)
+
+    def test_delay(self):
+        player = MacroPlayer([encode_reaction_cmds(_tap(KC.A) + [DelayCmd(50)] + _tap(KC.B))])
+        player.play(0)
+
+        self.assertEqual(_tap(KC.A), decode_reaction_codes(player.update(time=10)))
+        self.assertEqual([], list(player.update(time=59)))
+        self.assertEqual(_tap(KC.B), decode_reaction_codes(player.update(time=60)))
+
+    def test_queued_macros(self):
+        player = MacroPlayer([encode_reaction_cmds(_tap(KC.A)), encode_reaction_cmds(_tap(KC.B))])
+        player.play(1)
+        player.play(0)
+
+        self.assertEqual(_tap(KC.B) + _tap(KC.A), decode_reaction_codes(player.update(time=0)))
+        self.assertFalse(player.is_playing)
+
+    def test_next_step_time(self):
+        player = MacroPlayer([encode_reaction_cmds(_tap(KC.A) + [DelayCmd(50)] + _tap(KC.B))])
+        self.assertIsNone(player.next_step_time)
+        player.play(0)
+        self.assertEqual(0, player.next_step_time)
+
+        list(player.update(time=10))
+        self.assertEqual(60, player.next_step_time)
+        list(player.update(time=60))
+        self.assertIsNone(player.next_step_time)
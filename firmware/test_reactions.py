@@ -0,0 +1,41 @@
+import unittest
+
+from adafruit_hid.keycode import Keycode as KC
+from adafruit_hid.mouse import Mouse
+
+from reactions import KeyCmdKind, KeyCmd, MouseButtonCmd, MouseButtonCmdKind, MouseWheelCmd, LogCmd, Opcode, \
+    DelayCmd, MacroCmd, OneKeyReactions, make_reaction_code, decode_reaction_code, decode_reaction_codes
+
+
+class ReactionCodeTest(unittest.TestCase):
+
+    def test_key_cmd(self):
+        key_cmd = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.A)
+        self.assertEqual(make_reaction_code(Opcode.KEY_PRESS, KC.A), key_cmd.to_code())
+        self.assertEqual(key_cmd, decode_reaction_code(key_cmd.to_code()))
+
+    def test_round_trip(self):
+        reaction_commands = [KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.LEFT_SHIFT),
+                             KeyCmd(kind=KeyCmdKind.KEY_SEND, key_code=KC.BACKSPACE),
+                             MouseButtonCmd(Mouse.RIGHT_BUTTON, kind=MouseButtonCmdKind.MOUSE_PRESS),
+                             MouseWheelCmd(offset=-1),
+                             MouseWheelCmd(offset=1),
+                             LogCmd(),
+                             DelayCmd(delay=200),
+                             MacroCmd(macro_index=3)]
+        reaction_codes = [reaction_cmd.to_code() for reaction_cmd in reaction_commands]
+        self.assertEqual(reaction_commands, decode_reaction_codes(reaction_codes))
+
+    def test_one_key_reactions(self):
+        press_cmd = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.B)
+        release_cmd = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.B)
+        reactions = OneKeyReactions(on_press_key_reaction_commands=[press_cmd],
+                                    on_release_key_reaction_commands=[release_cmd])
+        self.assertEqual('H', reactions.on_press_reaction_codes.typecode)
+        self.assertEqual([press_cmd], decode_reaction_codes(reactions.on_press_reaction_codes))
+        self.assertEqual([release_cmd], decode_reaction_codes(reactions.on_release_reaction_codes))
+        self.assertIsNone(reactions.on_undo_reaction_codes)
+
+    def test_unknown_opcode(self):
+        with self.assertRaises(ValueError):
+            decode_reaction_code(make_reaction_code(0x7F))
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import unittest
+
+from scheduler import DeadlineScheduler
+
+
+def _now() -> float:
+    return time.monotonic() * 1000
+
+
+class DeadlineSchedulerTest(unittest.TestCase):
+
+    def test_next_time(self):
+        async def run():
+            scheduler = DeadlineScheduler(num_slots=2)
+            self.assertIsNone(scheduler.next_time)
+            scheduler.set_deadline(0, 30)
+            scheduler.set_deadline(1, 20)
+            self.assertEqual(20, scheduler.next_time)
+            scheduler.set_deadline(1, None)
+            self.assertEqual(30, scheduler.next_time)
+
+        asyncio.run(run())
+
+    def test_wait_for_deadline(self):
+        async def run():
+            scheduler = DeadlineScheduler(num_slots=1)
+            start = _now()
+            scheduler.set_deadline(0, start + 20)
+            await scheduler.wait()
+            return _now() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 19)
+
+    def test_wake(self):
+        async def run():
+            scheduler = DeadlineScheduler(num_slots=1)
+            start = _now()
+            scheduler.set_deadline(0, start + 10000)
+
+            async def wake():
+                await asyncio.sleep(0.01)
+                scheduler.wake()
+
+            await asyncio.gather(scheduler.wait(), wake())
+            return _now() - start
+
+        self.assertLess(asyncio.run(run()), 1000)
+
+    def test_overdue(self):
+        async def run():
+            scheduler = DeadlineScheduler(num_slots=1)
+            scheduler.set_deadline(0, _now() - 5)
+            await asyncio.wait_for(scheduler.wait(), 1)
+
+        asyncio.run(run())
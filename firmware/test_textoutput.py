@@ -0,0 +1,39 @@
+import unittest
+
+from adafruit_hid.keycode import Keycode as KC
+
+from textoutput import TextReportWriter, create_char_reports
+
+_SHIFT = 0x02
+_ALT_GR = 0x40
+
+
+class TextReportWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        char_reports = create_char_reports({'a': (KC.A, False, False),
+                                            'A': (KC.A, True, False),
+                                            'b': (KC.B, False, False),
+                                            '{': (KC.SEVEN, False, True)})
+        self._writer = TextReportWriter(char_reports)
+
+    def _write(self, text: str) -> list[bytes]:
+        return [bytes(report[:3]) for report in self._writer.iter_reports(text)]
+
+    def test_modifiers_in_report(self):
+        self.assertEqual([bytes((_SHIFT, 0, KC.A)), bytes((_ALT_GR, 0, KC.SEVEN)), bytes((0, 0, KC.ENTER)),
+                          bytes(3)],
+                         self._write('A{\n'))
+
+    def test_one_report_per_char(self):
+        self.assertEqual([bytes((0, 0, KC.A)), bytes((0, 0, KC.B)), bytes((0, 0, KC.SPACE)), bytes((0, 0, KC.A)),
+                          bytes(3)],
+                         self._write('ab a'))
+
+    def test_repeated_key(self):
+        self.assertEqual([bytes((0, 0, KC.A)), bytes(3), bytes((_SHIFT, 0, KC.A)), bytes(3)],
+                         self._write('aA'))
+
+    def test_unknown_char(self):
+        self.assertEqual([bytes((0, 0, KC.B)), bytes(3)], self._write('€b'))
+        self.assertEqual([], self._write(''))
@@ -0,0 +1,33 @@
+import unittest
+
+from tracestrip import strip_traces
+
+_SOURCE = '''\
+def read(dx):
+    if UART_TRACE.level >= TraceLevel.DEBUG:
+        UART_TRACE.write('read mouse',
+                         dx)
+    if dx != 0:
+        if MOUSE_TRACE.level >= TraceLevel.DEBUG and dx > 1:
+            MOUSE_TRACE.write('move', dx)
+    if level >= 2:
+        return dx
+    return 0
+'''
+
+_STRIPPED_SOURCE = '''\
+def read(dx):
+    if dx != 0:
+        pass
+    if level >= 2:
+        return dx
+    return 0
+'''
+
+
+class TraceStripTest(unittest.TestCase):
+
+    def test_strip(self):
+        stripped = strip_traces(_SOURCE)
+        self.assertEqual(_STRIPPED_SOURCE, stripped)
+        compile(stripped, 'stripped.py', 'exec')
@@ -0,0 +1,20 @@
+import unittest
+
+from tracing import Trace, TraceLevel, TraceRing
+
+
+class TraceTest(unittest.TestCase):
+
+    def test_ring(self):
+        ring = TraceRing(capacity=2)
+        trace = Trace('uart', level=TraceLevel.DEBUG, ring=ring)
+        trace.write('read mouse', 1, -2)
+        trace.write('read key event', 3)
+        trace.write('read unknown byte', b'\x09')
+
+        self.assertEqual(2, len(ring))
+        lines = [line.split(' ', 1)[1] for line in ring.iter_lines()]  # without time
+        self.assertEqual(['uart: read key event 3', "uart: read unknown byte b'\\t'"], lines)
+
+        ring.clear()
+        self.assertEqual([], list(ring.iter_lines()))
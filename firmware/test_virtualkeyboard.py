@@ -6,11 +6,11 @@ from base import KeyCode, TimeInMs, VirtualKeySerial, PhysicalKeySerial
 from keyboardcreator import KeyboardCreator
 from keyboardhalf import VKeyPressEvent, KeyGroup, \
     KeyboardHalf
-from virtualkeyboard import SimpleKey, TapHoldKey, ModKey, \
-    VirtualKeyboard, Layer
+from virtualkeyboard import SimpleKey, TapHoldKey, ModKey, LayerKey, \
+    VirtualKeyboard, Layer, TapHoldStrategy, create_flat_layer, create_layer_tables, create_independent_keys
 from kbdlayoutdata import VIRTUAL_KEY_ORDER, LAYERS, MODIFIERS, MACROS
-from reactions import KeyCmdKind, KeyCmd, ReactionCommands, OneKeyReactions
-from keysdata import RIGHT_THUMB_DOWN, RIGHT_THUMB_UP, RTU, RTM, RTD, NO_KEY, RT, RI1U, LRU
+from reactions import KeyCmdKind, KeyCmd, ReactionCommands, OneKeyReactions, decode_reaction_codes
+from keysdata import RIGHT_THUMB_DOWN, RIGHT_THUMB_UP, RIGHT_INDEX_UP, RTU, RTM, RTD, NO_KEY, RT, RI, RI1U, LRU
 
 A_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.A)
 A_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.A)
@@ -18,6 +18,10 @@ B_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.B)
 B_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.B)
 SHIFT_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.LEFT_SHIFT)
 SHIFT_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.LEFT_SHIFT)
+C_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.C)
+C_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.C)
+D_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.D)
+D_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.D)
 
 
 class TapKeyTest(unittest.TestCase):
@@ -27,10 +31,10 @@ class TapKeyTest(unittest.TestCase):
     def setUp(self):
         self._mod_key = ModKey(serial=self.VKEY_A, mod_key_code=KC.LEFT_SHIFT)
         self._simple_key = SimpleKey(serial=self.VKEY_B)
-        default_layer: Layer = {
+        default_layer = create_flat_layer({
             self.VKEY_A: self._create_key_assignment(KC.A),
             self.VKEY_B: self._create_key_assignment(KC.B),
-        }
+        }, num_vkeys=3)
         self._kbd =  VirtualKeyboard(simple_keys=[self._simple_key], mod_keys=[self._mod_key], layer_keys=[],
                                      default_layer=default_layer)
         TapHoldKey.TAP_HOLD_TERM = 200
@@ -188,7 +192,7 @@ class TapKeyTest(unittest.TestCase):
             vkey_event = VKeyPressEvent(vkey_serial, pressed=False)
             vkey_events.append(vkey_event)
 
-        act_reaction_commands = list(self._kbd.update(time=time, vkey_events=vkey_events))
+        act_reaction_commands = decode_reaction_codes(self._kbd.update(time=time, vkey_events=vkey_events))
 
         self.assertEqual(expected_key_seq, act_reaction_commands)
 
@@ -200,6 +204,395 @@ class TapKeyTest(unittest.TestCase):
             return self.VKEY_B
 
 
+class TapHoldStrategyTest(unittest.TestCase):
+    """ a: tap/hold key (tap: 'a', hold: LShift) with the strategy of the test, b: simple key
+    """
+    VKEY_A = 1
+    VKEY_B = 2
+
+    def setUp(self):
+        TapHoldKey.TAP_HOLD_TERM = 200
+
+    def _create_keyboard(self, strategy: int) -> None:
+        default_layer = create_flat_layer({
+            self.VKEY_A: TapKeyTest._create_key_assignment(KC.A),
+            self.VKEY_B: TapKeyTest._create_key_assignment(KC.B),
+        }, num_vkeys=3)
+        mod_key = ModKey(serial=self.VKEY_A, mod_key_code=KC.LEFT_SHIFT, strategy=strategy)
+        self._kbd = VirtualKeyboard(simple_keys=[SimpleKey(serial=self.VKEY_B)], mod_keys=[mod_key], layer_keys=[],
+                                    default_layer=default_layer)
+
+    def test_hold_on_other_key_press(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +----------+ |              |
+        | |    a     | |              |
+        | +----------+ |              |
+        |    +----+    |              |
+        |    | b  |    |              |
+        |    +----+    |              |
+        +--------------|--------------+
+        =>   B
+        """
+        self._create_keyboard(TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(50, press='b', expected_key_seq=[SHIFT_DOWN, B_DOWN])
+        self._step(80, release='b', expected_key_seq=[B_UP])
+        self._step(100, release='a', expected_key_seq=[SHIFT_UP])
+
+    def test_next_decision_time(self) -> None:
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self.assertIsNone(self._kbd.next_decision_time)
+        self._step(10, press='a', expected_key_seq=[])
+        self.assertEqual(210, self._kbd.next_decision_time)
+        self._step(210, expected_key_seq=[SHIFT_DOWN])
+        self.assertIsNone(self._kbd.next_decision_time)
+
+    def test_permissive_hold(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +----------+ |              |
+        | |    a     | |              |
+        | +----------+ |              |
+        |    +----+    |              |
+        |    | b  |    |              |
+        |    +----+    |              |
+        +--------------|--------------+
+        =>        B
+        """
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(50, press='b', expected_key_seq=[])
+        self._step(80, release='b', expected_key_seq=[SHIFT_DOWN, B_DOWN, B_UP])
+        self._step(100, release='a', expected_key_seq=[SHIFT_UP])
+
+    def test_permissive_hold_rolled(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +------+     |              |
+        | |   a  |     |              |
+        | +------+     |              |
+        |    +------+  |              |
+        |    |  b   |  |              |
+        |    +------+  |              |
+        +--------------|--------------+
+        =>       a  b
+        """
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(50, press='b', expected_key_seq=[])
+        self._step(80, release='a', expected_key_seq=[A_DOWN, A_UP, B_DOWN])
+        self._step(100, release='b', expected_key_seq=[B_UP])
+
+    def test_tap_preferred(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +----------+ |              |
+        | |    a     | |              |
+        | +----------+ |              |
+        |    +----+    |              |
+        |    | b  |    |              |
+        |    +----+    |              |
+        +--------------|--------------+
+        =>           a b
+        """
+        self._create_keyboard(TapHoldStrategy.TAP_PREFERRED)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(50, press='b', expected_key_seq=[])
+        self._step(80, release='b', expected_key_seq=[])
+        self._step(100, release='a', expected_key_seq=[A_DOWN, A_UP, B_DOWN, B_UP])
+
+    def test_tap_preferred_slow(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +------------|---+          |
+        | |    a       |   |          |
+        | +------------|---+          |
+        |    +----+    |              |
+        |    | b  |    |              |
+        |    +----+    |              |
+        +--------------|--------------+
+        =>             B
+        """
+        self._create_keyboard(TapHoldStrategy.TAP_PREFERRED)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(50, press='b', expected_key_seq=[])
+        self._step(80, release='b', expected_key_seq=[])
+        self._step(200, expected_key_seq=[SHIFT_DOWN, B_DOWN, B_UP])
+        self._step(250, release='a', expected_key_seq=[SHIFT_UP])
+
+    def test_retro_tapping(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +------------|-----+        |
+        | |    a       |     |        |
+        | +------------|-----+        |
+        +--------------|--------------+
+        =>                   a
+        """
+        self._create_keyboard(TapHoldStrategy.RETRO_TAPPING)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(200, expected_key_seq=[SHIFT_DOWN])
+        self._step(300, release='a', expected_key_seq=[SHIFT_UP, A_DOWN, A_UP])
+
+    def test_retro_tapping_with_other_key(self) -> None:
+        """       TAPPING_TERM
+        +--------------|--------------+
+        | +------------|-----+        |
+        | |    a       |     |        |
+        | +------------|-----+        |
+        |              | +-+          |
+        |              | |b|          |
+        |              | +-+          |
+        +--------------|--------------+
+        =>             | B
+        """
+        self._create_keyboard(TapHoldStrategy.RETRO_TAPPING)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(200, expected_key_seq=[SHIFT_DOWN])
+        self._step(220, press='b', expected_key_seq=[B_DOWN])
+        self._step(230, release='b', expected_key_seq=[B_UP])
+        self._step(300, release='a', expected_key_seq=[SHIFT_UP])
+
+    def _step(self, time: TimeInMs, expected_key_seq: ReactionCommands,
+              press: str | None = None, release: str | None = None) -> None:
+        vkey_events: list[VKeyPressEvent] = []
+        if press is not None:
+            vkey_events.append(VKeyPressEvent(self.VKEY_A if press == 'a' else self.VKEY_B, pressed=True))
+        elif release is not None:
+            vkey_events.append(VKeyPressEvent(self.VKEY_A if release == 'a' else self.VKEY_B, pressed=False))
+
+        act_reaction_commands = decode_reaction_codes(self._kbd.update(time=time, vkey_events=vkey_events))
+
+        self.assertEqual(expected_key_seq, act_reaction_commands)
+
+
+class TypingStreakTest(unittest.TestCase):
+    VKEY_A = TapHoldStrategyTest.VKEY_A
+    VKEY_B = TapHoldStrategyTest.VKEY_B
+
+    def setUp(self):
+        TapHoldKey.TAP_HOLD_TERM = 200
+        VirtualKeyboard.TYPING_STREAK_TERM = 100
+
+    _create_keyboard = TapHoldStrategyTest._create_keyboard
+    _step = TapHoldStrategyTest._step
+
+    def test_streak_tap(self) -> None:
+        """       TYPING_STREAK_TERM
+        +--------------|--------------+
+        | +--+         |              |
+        | |b |         |              |
+        | +--+         |              |
+        |       +----------+          |
+        |       |    a     |          |
+        |       +----------+          |
+        +--------------|--------------+
+        =>  b   a
+        """
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self._step(0, press='b', expected_key_seq=[B_DOWN])
+        self._step(20, release='b', expected_key_seq=[B_UP])
+        self._step(60, press='a', expected_key_seq=[A_DOWN])
+        self._step(300, expected_key_seq=[])
+        self._step(310, release='a', expected_key_seq=[A_UP])
+
+    def test_after_streak(self) -> None:
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self._step(0, press='b', expected_key_seq=[B_DOWN])
+        self._step(20, release='b', expected_key_seq=[B_UP])
+        self._step(120, press='a', expected_key_seq=[])
+        self._step(320, expected_key_seq=[SHIFT_DOWN])
+        self._step(330, release='a', expected_key_seq=[SHIFT_UP])
+
+    def test_hold_release_does_not_start_streak(self) -> None:
+        self._create_keyboard(TapHoldStrategy.PERMISSIVE_HOLD)
+        self._step(0, press='a', expected_key_seq=[])
+        self._step(200, expected_key_seq=[SHIFT_DOWN])
+        self._step(210, release='a', expected_key_seq=[SHIFT_UP])
+        self._step(230, press='a', expected_key_seq=[])
+
+
+class LayerStackTest(unittest.TestCase):
+    """ l1, l2: layer keys, x, y: simple keys
+
+        default: x -> 'a', y -> 'b'
+        layer 1: x -> 'c', y -> '·'
+        layer 2: x -> '·', y -> 'd'
+    """
+    VKEY_L1 = 1
+    VKEY_L2 = 2
+    VKEY_X = 3
+    VKEY_Y = 4
+
+    def setUp(self):
+        TapHoldKey.TAP_HOLD_TERM = 200
+        VirtualKeyboard.TYPING_STREAK_TERM = 0
+        create = TapKeyTest._create_key_assignment
+        default_layer = create_flat_layer({self.VKEY_X: create(KC.A), self.VKEY_Y: create(KC.B)}, num_vkeys=5)
+        layer_keys = [LayerKey(serial=self.VKEY_L1, layer=create_flat_layer({self.VKEY_X: create(KC.C)}, num_vkeys=5),
+                               strategy=TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS),
+                      LayerKey(serial=self.VKEY_L2, layer=create_flat_layer({self.VKEY_Y: create(KC.D)}, num_vkeys=5),
+                               strategy=TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS)]
+        self._kbd = VirtualKeyboard(simple_keys=[SimpleKey(serial=self.VKEY_X), SimpleKey(serial=self.VKEY_Y)],
+                                    mod_keys=[], layer_keys=layer_keys, default_layer=default_layer)
+
+    def tearDown(self):
+        VirtualKeyboard.TYPING_STREAK_TERM = 100
+
+    def test_create_layer_tables(self) -> None:
+        default_layer: Layer = [None, 'a', 'b']
+        tables = create_layer_tables(default_layer, [[None, 'c', None], [None, None, 'd']], max_depth=2)
+        self.assertEqual(9, len(tables))
+        self.assertIs(default_layer, tables[0])
+        self.assertEqual([None, 'c', 'b'], tables[1])
+        self.assertEqual([None, 'a', 'd'], tables[2])
+        self.assertEqual([None, 'c', 'd'], tables[1 + 2 * 3])
+        self.assertEqual([None, 'c', 'd'], tables[2 + 1 * 3])
+        self.assertIsNone(tables[1 + 1 * 3])
+
+    def test_fall_through(self) -> None:
+        self._step(0, press=self.VKEY_L1, expected_key_seq=[])
+        self._step(50, press=self.VKEY_Y, expected_key_seq=[B_DOWN])
+        self._step(60, release=self.VKEY_Y, expected_key_seq=[B_UP])
+        self._step(70, press=self.VKEY_X, expected_key_seq=[C_DOWN])
+        self._step(80, release=self.VKEY_X, expected_key_seq=[C_UP])
+        self._step(90, release=self.VKEY_L1, expected_key_seq=[])
+
+    def test_two_layers(self) -> None:
+        self._step(0, press=self.VKEY_L1, expected_key_seq=[])
+        self._step(20, press=self.VKEY_L2, expected_key_seq=[])
+        self._step(50, press=self.VKEY_X, expected_key_seq=[C_DOWN])
+        self._step(60, release=self.VKEY_X, expected_key_seq=[C_UP])
+        self._step(70, press=self.VKEY_Y, expected_key_seq=[D_DOWN])
+        self._step(80, release=self.VKEY_Y, expected_key_seq=[D_UP])
+        self._step(90, release=self.VKEY_L1, expected_key_seq=[])
+        self._step(100, press=self.VKEY_X, expected_key_seq=[A_DOWN])
+        self._step(110, release=self.VKEY_X, expected_key_seq=[A_UP])
+        self._step(120, press=self.VKEY_Y, expected_key_seq=[D_DOWN])
+        self._step(130, release=self.VKEY_Y, expected_key_seq=[D_UP])
+        self._step(140, release=self.VKEY_L2, expected_key_seq=[])
+
+    def test_release_with_reaction_of_press(self) -> None:
+        """ the layer key is released before x: x is released with the reaction of layer 1
+        """
+        self._step(0, press=self.VKEY_L1, expected_key_seq=[])
+        self._step(50, press=self.VKEY_X, expected_key_seq=[C_DOWN])
+        self._step(60, release=self.VKEY_L1, expected_key_seq=[])
+        self._step(70, release=self.VKEY_X, expected_key_seq=[C_UP])
+
+    def _step(self, time: TimeInMs, expected_key_seq: ReactionCommands,
+              press: VirtualKeySerial | None = None, release: VirtualKeySerial | None = None) -> None:
+        vkey_events: list[VKeyPressEvent] = []
+        if press is not None:
+            vkey_events.append(VKeyPressEvent(press, pressed=True))
+        elif release is not None:
+            vkey_events.append(VKeyPressEvent(release, pressed=False))
+
+        act_reaction_commands = decode_reaction_codes(self._kbd.update(time=time, vkey_events=vkey_events))
+
+        self.assertEqual(expected_key_seq, act_reaction_commands)
+
+
+class EventOrderTest(unittest.TestCase):
+    """ events of both halves are processed in the order of their times, each at its time
+    """
+    VKEY_A = TapHoldStrategyTest.VKEY_A
+    VKEY_B = TapHoldStrategyTest.VKEY_B
+
+    def setUp(self):
+        TapHoldKey.TAP_HOLD_TERM = 200
+        VirtualKeyboard.TYPING_STREAK_TERM = 100
+
+    _create_keyboard = TapHoldStrategyTest._create_keyboard
+
+    def test_sorted_by_time(self) -> None:
+        self._create_keyboard(TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS)
+        vkey_events = [VKeyPressEvent(self.VKEY_B, pressed=True, time=60),  # left half
+                       VKeyPressEvent(self.VKEY_A, pressed=True, time=50)]  # right half, received later
+        self.assertEqual([SHIFT_DOWN, B_DOWN], decode_reaction_codes(self._kbd.update(time=70, vkey_events=vkey_events)))
+
+    def test_same_time_keeps_order(self) -> None:
+        self._create_keyboard(TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS)
+        vkey_events = [VKeyPressEvent(self.VKEY_B, pressed=True, time=50),
+                       VKeyPressEvent(self.VKEY_A, pressed=True, time=50)]
+        self.assertEqual([B_DOWN], decode_reaction_codes(self._kbd.update(time=70, vkey_events=vkey_events)))
+
+    def test_events_time(self) -> None:
+        """ the shared events of the left half have no time, they are placed at events_time
+        """
+        self._create_keyboard(TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS)
+        my_vkey_event = VKeyPressEvent(self.VKEY_B, pressed=True)
+        vkey_events = [VKeyPressEvent(self.VKEY_A, pressed=True, time=60),  # right half
+                       my_vkey_event]
+        self.assertEqual([B_DOWN], decode_reaction_codes(self._kbd.update(time=70, vkey_events=vkey_events,
+                                                                          events_time=50)))
+        self.assertIsNone(my_vkey_event.time)
+
+    def test_decision_at_event_time(self) -> None:
+        """ a is released before TAP_HOLD_TERM, but the event arrives after it
+        """
+        self._create_keyboard(TapHoldStrategy.TAP_PREFERRED)
+        self.assertEqual([], decode_reaction_codes(self._kbd.update(time=0, vkey_events=[VKeyPressEvent(self.VKEY_A, pressed=True)])))
+        vkey_events = [VKeyPressEvent(self.VKEY_A, pressed=False, time=150)]
+        self.assertEqual([A_DOWN, A_UP], decode_reaction_codes(self._kbd.update(time=250, vkey_events=vkey_events)))
+
+
+class DecisionIndependenceTest(unittest.TestCase):
+    """ like LayerStackTest, but the layer keys decide by PERMISSIVE_HOLD
+
+        l1, l2 send nothing on tap. y is the same in layer 1, x is the same in layer 2.
+    """
+    VKEY_L1 = LayerStackTest.VKEY_L1
+    VKEY_L2 = LayerStackTest.VKEY_L2
+    VKEY_X = LayerStackTest.VKEY_X
+    VKEY_Y = LayerStackTest.VKEY_Y
+
+    def setUp(self):
+        TapHoldKey.TAP_HOLD_TERM = 200
+        VirtualKeyboard.TYPING_STREAK_TERM = 0
+        create = TapKeyTest._create_key_assignment
+        default_layer = create_flat_layer({self.VKEY_X: create(KC.A), self.VKEY_Y: create(KC.B)}, num_vkeys=5)
+        self._simple_keys = [SimpleKey(serial=self.VKEY_X), SimpleKey(serial=self.VKEY_Y)]
+        self._layer_keys = [LayerKey(serial=self.VKEY_L1, layer=create_flat_layer({self.VKEY_X: create(KC.C)}, 5)),
+                            LayerKey(serial=self.VKEY_L2, layer=create_flat_layer({self.VKEY_Y: create(KC.D)}, 5))]
+        self._kbd = VirtualKeyboard(simple_keys=self._simple_keys, mod_keys=[], layer_keys=self._layer_keys,
+                                    default_layer=default_layer)
+
+    def tearDown(self):
+        VirtualKeyboard.TYPING_STREAK_TERM = 100
+
+    def test_create_independent_keys(self) -> None:
+        independent_keys = self._kbd.independent_keys
+        self.assertEqual(bytes([1 << self.VKEY_Y]), independent_keys[self.VKEY_L1])
+        self.assertEqual(bytes([1 << self.VKEY_X]), independent_keys[self.VKEY_L2])
+        self.assertIsNone(independent_keys[self.VKEY_X])
+
+    def test_not_independent_with_tap(self) -> None:
+        create = TapKeyTest._create_key_assignment
+        default_layer = create_flat_layer({self.VKEY_L1: create(KC.D), self.VKEY_Y: create(KC.B)}, num_vkeys=5)
+        layer_tables = create_layer_tables(default_layer, [self._layer_keys[0].layer], max_depth=2)
+        independent_keys = create_independent_keys(layer_tables, self._simple_keys, mod_keys=[],
+                                                   layer_keys=self._layer_keys[:1], max_depth=2)
+        self.assertEqual(bytes(1), independent_keys[self.VKEY_L1])
+
+    def test_independent_key_is_not_deferred(self) -> None:
+        self._step(0, press=self.VKEY_L1, expected_key_seq=[])
+        self._step(20, press=self.VKEY_Y, expected_key_seq=[B_DOWN])
+        self._step(40, release=self.VKEY_Y, expected_key_seq=[B_UP])  # tap -> l1: hold
+        self._step(60, press=self.VKEY_X, expected_key_seq=[C_DOWN])
+        self._step(70, release=self.VKEY_X, expected_key_seq=[C_UP])
+        self._step(80, release=self.VKEY_L1, expected_key_seq=[])
+
+    def test_dependent_key_is_deferred(self) -> None:
+        self._step(0, press=self.VKEY_L1, expected_key_seq=[])
+        self._step(20, press=self.VKEY_X, expected_key_seq=[])
+        self._step(30, press=self.VKEY_Y, expected_key_seq=[])  # keeps the order after the deferred x
+        self._step(40, release=self.VKEY_L1, expected_key_seq=[A_DOWN, B_DOWN])
+
+    _step = LayerStackTest._step
+
+
 class ThumbUpKeyTest(unittest.TestCase):  # keyboard with only 'thumb-up' key
     """ like real keyboard, but only with the Thumb-Up-key
 
@@ -278,7 +671,98 @@ class ThumbUpKeyTest(unittest.TestCase):  # keyboard with only 'thumb-up' key
             self._pressed_pkeys.remove(RIGHT_THUMB_UP)
 
         vkey_events = list(self._kbd_half.update(time, cur_pressed_pkeys=self._pressed_pkeys))
-        act_reaction_commands = list(self._virt_keyboard.update(time=time, vkey_events=vkey_events))
+        act_reaction_commands = decode_reaction_codes(self._virt_keyboard.update(time=time, vkey_events=vkey_events))
+
+        self.assertEqual(expected_key_seq, act_reaction_commands)
+
+
+class SpeculativeThumbKeysTest(unittest.TestCase):
+    """ thumb group, where rtu and rtd are sent speculatively
+
+        rtu: 'a' (can be undone), rtm: 'b', rtd: 'Enter' (can not be undone), ri1u: 'c' or LShift
+    """
+    _BACKSPACE_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.BACKSPACE)
+    _BACKSPACE_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.BACKSPACE)
+    _ENTER_DOWN = KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=KC.ENTER)
+    _ENTER_UP = KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=KC.ENTER)
+
+    def setUp(self):
+        KeyGroup.COMBO_TERM = 50
+        TapHoldKey.TAP_HOLD_TERM = 200
+
+        rt_group = KeyGroup(RT, {
+                        RTU: [RIGHT_THUMB_UP],
+                        RTM: [RIGHT_THUMB_UP, RIGHT_THUMB_DOWN],
+                        RTD: [RIGHT_THUMB_DOWN],
+                    }, speculative_vkeys={RTU, RTD})
+        ri_group = KeyGroup(RI, {RI1U: [RIGHT_INDEX_UP]})
+        self._kbd_half = KeyboardHalf(key_groups=[rt_group, ri_group])
+
+        creator = KeyboardCreator(virtual_key_order=[[RTU], [RTM], [RTD], [RI1U]],
+                                  layers={NO_KEY: ['a', 'b', 'Enter', 'c']},
+                                  modifiers={RI1U: 'LShift'},
+                                  macros={},
+                                  )
+        self._virt_keyboard = creator.create()
+        self._pressed_pkeys: set[PhysicalKeySerial] = set()
+
+    def test_tap(self):
+        self._step(0, press=RIGHT_THUMB_UP, expected_key_seq=[A_DOWN])
+        self._step(20, release=RIGHT_THUMB_UP, expected_key_seq=[A_UP])
+        self.assertEqual(0, self._virt_keyboard.num_rollbacks)
+
+    def test_press_longer_as_combo_term(self):
+        self._step(0, press=RIGHT_THUMB_UP, expected_key_seq=[A_DOWN])
+        self._step(60, expected_key_seq=[])
+        self._step(70, release=RIGHT_THUMB_UP, expected_key_seq=[A_UP])
+
+    def test_chord_rolls_back(self):
+        """       COMBO_TERM
+        +--------------|--------------+
+        | +---------+  |              |
+        | |   rtu   |  |              |
+        | +---------+  |              |
+        |    +-----------+            |
+        |    |   rtd     |            |
+        |    +-----------+            |
+        +--------------|--------------+
+        =>a  <-b
+        """
+        self._step(0, press=RIGHT_THUMB_UP, expected_key_seq=[A_DOWN])
+        self._step(10, press=RIGHT_THUMB_DOWN, expected_key_seq=[A_UP, self._BACKSPACE_DOWN, self._BACKSPACE_UP, B_DOWN])
+        self._step(30, release=RIGHT_THUMB_UP, expected_key_seq=[B_UP])
+        self._step(60, release=RIGHT_THUMB_DOWN, expected_key_seq=[])
+        self.assertEqual(1, self._virt_keyboard.num_speculations)
+        self.assertEqual(1, self._virt_keyboard.num_rollbacks)
+
+    def test_not_undoable_waits(self):
+        self._step(0, press=RIGHT_THUMB_DOWN, expected_key_seq=[])
+        self._step(10, press=RIGHT_THUMB_UP, expected_key_seq=[B_DOWN])
+        self._step(30, release=RIGHT_THUMB_DOWN, expected_key_seq=[B_UP])
+        self._step(40, release=RIGHT_THUMB_UP, expected_key_seq=[])
+        self.assertEqual(0, self._virt_keyboard.num_speculations)
+
+    def test_held_modifier_waits(self):
+        """ the undo (Backspace) can not undo a shifted key -> no speculation while shift is held
+        """
+        self._step(0, press=RIGHT_INDEX_UP, expected_key_seq=[])
+        self._step(250, expected_key_seq=[SHIFT_DOWN])
+        self._step(300, press=RIGHT_THUMB_UP, expected_key_seq=[])
+        self._step(310, release=RIGHT_THUMB_UP, expected_key_seq=[A_DOWN, A_UP])
+        self._step(400, release=RIGHT_INDEX_UP, expected_key_seq=[SHIFT_UP])
+        self._step(500, press=RIGHT_THUMB_UP, expected_key_seq=[A_DOWN])
+        self._step(510, release=RIGHT_THUMB_UP, expected_key_seq=[A_UP])
+        self.assertEqual(1, self._virt_keyboard.num_speculations)
+
+    def _step(self, time: TimeInMs, expected_key_seq: ReactionCommands,
+              press: PhysicalKeySerial | None = None, release: PhysicalKeySerial | None = None):
+        if press is not None:
+            self._pressed_pkeys.add(press)
+        if release is not None:
+            self._pressed_pkeys.remove(release)
+
+        vkey_events = list(self._kbd_half.update(time, cur_pressed_pkeys=self._pressed_pkeys))
+        act_reaction_commands = decode_reaction_codes(self._virt_keyboard.update(time=time, vkey_events=vkey_events))
 
         self.assertEqual(expected_key_seq, act_reaction_commands)
 
@@ -294,13 +778,23 @@ class RealVKeyboardTest(unittest.TestCase):
         self._virt_keyboard = creator.create()
 
     def test_W_wrong(self):
-        """
+        """ the old behavior, now with RI1U as 'TapPreferred'
+
         614919:,other=[+ri1u]
         614973:,self=[+lmu]
         615043:,self=[-lmu],->[+e,-e]
         615119:,,->[+LShift]
         615149:,other=[-ri1u],->[-LShift]
         """
+        modifiers = dict(MODIFIERS)
+        modifiers[RI1U] = (MODIFIERS[RI1U], 'TapPreferred')
+        creator = KeyboardCreator(virtual_key_order=VIRTUAL_KEY_ORDER,
+                                  layers=LAYERS,
+                                  modifiers=modifiers,
+                                  macros=MACROS,
+                                  )
+        self._virt_keyboard = creator.create()
+
         press_w = KeyCmd(KeyCmdKind.KEY_PRESS, KC.W)
         release_w = KeyCmd(KeyCmdKind.KEY_RELEASE, KC.W)
         press_shift = KeyCmd(KeyCmdKind.KEY_PRESS, KC.LEFT_SHIFT)
@@ -332,6 +826,6 @@ class RealVKeyboardTest(unittest.TestCase):
         self._step(249, [VKeyPressEvent(RI1U, pressed=False)], expected_reactions=[release_shift])
 
     def _step(self, time: TimeInMs, vkey_events: list[VKeyPressEvent], expected_reactions: list[KeyCmd]):
-        actual_reactions = list(
+        actual_reactions = decode_reaction_codes(
             self._virt_keyboard.update(time=time, vkey_events=vkey_events))
         self.assertEqual(expected_reactions, actual_reactions)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from adafruit_hid.keycode import Keycode as KC
+
+from base import KeyCode
+
+try:
+    from typing import Iterator
+except ImportError:
+    pass
+
+CharReports = dict  # dict[str, bytes]: char -> (modifier byte, key code) of the keyboard HID report
+
+_LEFT_SHIFT_BIT = 1 << (KC.LEFT_SHIFT - KC.LEFT_CONTROL)
+_RIGHT_ALT_BIT = 1 << (KC.RIGHT_ALT - KC.LEFT_CONTROL)  # AltGr
+
+
+def create_char_reports(char_key_codes: dict[str, tuple[KeyCode, bool, bool]]) -> CharReports:
+    """ char_key_codes: char -> (key code, with shift, with alt), s. KeyboardCreator.create_reaction_map()
+        (on the host, the result is stored in layouttables.py)
+    """
+    char_reports = {'\n': bytes((0, KC.ENTER)), ' ': bytes((0, KC.SPACE))}
+    for char, (key_code, with_shift, with_alt) in char_key_codes.items():
+        modifier = (_LEFT_SHIFT_BIT if with_shift else 0) | (_RIGHT_ALT_BIT if with_alt else 0)
+        char_reports[char] = bytes((modifier, key_code))
+    return char_reports
+
+
+class TextReportWriter:
+    """ types text with the fewest keyboard HID reports
+
+        Every char is one report with its modifiers folded in. The report of the next char releases the key,
+        only a repeated key needs an empty report in between. Chars without a report are skipped.
+    """
+
+    def __init__(self, char_reports: CharReports):
+        self._char_reports = char_reports
+        self._report = bytearray(8)  # modifiers, reserved, 6 key codes
+
+    def iter_reports(self, text: str) -> Iterator[bytearray]:
+        """ the same report buffer is yielded every time, so it must be sent before the next one
+        """
+        report = self._report
+        for char in text:
+            char_report = self._char_reports.get(char)
+            if char_report is None:
+                continue
+
+            if report[2] == char_report[1]:
+                report[0] = report[2] = 0
+                yield report
+            report[0] = char_report[0]
+            report[2] = char_report[1]
+            yield report
+
+        if report[2] != 0:
+            report[0] = report[2] = 0
+            yield report
@@ -0,0 +1,78 @@
+""" host side build step (CPython, not for the device): removes the trace call sites from the firmware sources
+
+    usage: python tracestrip.py -o build uart.py mainleft.py mainright.py ...
+           mpy-cross build/uart.py  (optional)
+
+    Every statement 'if <NAME>_TRACE.level ... [and ...]:' without else is removed (s. tracing.py),
+    so the traces cost nothing on the device. A block, which contained only traces, gets a 'pass'.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import os
+
+_TRACE_SUFFIX = '_TRACE'
+_BLOCK_FIELDS = ('body', 'orelse', 'finalbody')
+
+
+def _is_trace_statement(statement: ast.stmt) -> bool:
+    if not isinstance(statement, ast.If) or statement.orelse:
+        return False
+    test = statement.test
+    if isinstance(test, ast.BoolOp) and isinstance(test.op, ast.And):
+        test = test.values[0]  # p.e. 'if MAIN_TRACE.level >= TraceLevel.DEBUG and i % 500 == 0:'
+    if not isinstance(test, ast.Compare):
+        return False
+    left = test.left
+    return (isinstance(left, ast.Attribute) and left.attr == 'level'
+            and isinstance(left.value, ast.Name) and left.value.id.endswith(_TRACE_SUFFIX))
+
+
+def strip_traces(source: str) -> str:
+    lines = source.splitlines(keepends=True)
+    replacements: dict[int, str | None] = {}  # line index -> new line, None: removed
+
+    for node in ast.walk(ast.parse(source)):
+        for field in _BLOCK_FIELDS:
+            block = getattr(node, field, None)
+            if not isinstance(block, list) or not block or not isinstance(block[0], ast.stmt):
+                continue
+
+            trace_statements = [statement for statement in block if _is_trace_statement(statement)]
+            for statement in trace_statements:
+                for line_index in range(statement.lineno - 1, statement.end_lineno):
+                    replacements[line_index] = None
+            if trace_statements and len(trace_statements) == len(block):
+                first = trace_statements[0]
+                replacements[first.lineno - 1] = ' ' * first.col_offset + 'pass\n'
+
+    stripped_lines = []
+    for line_index, line in enumerate(lines):
+        if line_index not in replacements:
+            stripped_lines.append(line)
+        elif replacements[line_index] is not None:
+            stripped_lines.append(replacements[line_index])
+    return ''.join(stripped_lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='removes the trace call sites from the firmware sources')
+    parser.add_argument('sources', nargs='+')
+    parser.add_argument('-o', '--output-dir', default='build')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.sources:
+        with open(path, encoding='utf-8') as file:
+            source = file.read()
+        stripped = strip_traces(source)
+        output_path = os.path.join(args.output_dir, os.path.basename(path))
+        with open(output_path, 'w', encoding='utf-8') as file:
+            file.write(stripped)
+        num_removed_lines = len(source.splitlines()) - len(stripped.splitlines())
+        print(f'{output_path}: {num_removed_lines} lines removed')
+
+
+if __name__ == '__main__':
+    main()
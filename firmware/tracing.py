@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+from array import array
+
+try:
+    from typing import Iterator
+except ImportError:
+    pass
+
+
+class TraceLevel:  # enum
+    OFF = 0
+    ERROR = 1
+    INFO = 2
+    DEBUG = 3
+
+
+class TraceRing:
+    """ the last traces of all categories, written in place (the arguments are formatted only by iter_lines())
+    """
+
+    def __init__(self, capacity: int):
+        self._times = array('L', (0 for _ in range(capacity)))  # ms
+        self._categories: list[Trace | None] = [None] * capacity
+        self._messages: list[str | None] = [None] * capacity
+        self._args: list = [None] * (3 * capacity)
+        self._next = 0  # index of the next trace
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, category: Trace, message: str, arg1, arg2, arg3) -> None:
+        i = self._next
+        self._times[i] = int(time.monotonic() * 1000) & 0xFFFFFFFF
+        self._categories[i] = category
+        self._messages[i] = message
+        self._args[3 * i] = arg1
+        self._args[3 * i + 1] = arg2
+        self._args[3 * i + 2] = arg3
+        self._next = (i + 1) % len(self._times)
+        if self._size < len(self._times):
+            self._size += 1
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def iter_lines(self) -> Iterator[str]:
+        """ oldest first, p.e. 'time uart: read key event 3 True'
+        """
+        capacity = len(self._times)
+        start = (self._next - self._size) % capacity
+        for k in range(self._size):
+            i = (start + k) % capacity
+            args = ''.join(f' {arg}' for arg in self._args[3 * i:3 * i + 3] if arg is not None)
+            yield f'{self._times[i]} {self._categories[i].name}: {self._messages[i]}{args}'
+
+
+TRACE_RING = TraceRing(capacity=256)
+
+
+class Trace:
+    """ one trace category with its own level
+
+        The call site checks the level, so a disabled trace costs one int comparison and formats nothing:
+
+            if UART_TRACE.level >= TraceLevel.DEBUG:
+                UART_TRACE.write('read mouse', dx, dy)
+
+        tracestrip.py removes these if statements from the device image. Enabled traces go to TRACE_RING
+        instead of the console, which costs milliseconds per line on the Pico.
+    """
+
+    def __init__(self, name: str, level: int = TraceLevel.ERROR, ring: TraceRing = TRACE_RING):
+        # public
+        self.name = name
+        self.level = level
+        self._ring = ring
+
+    def write(self, message: str, arg1=None, arg2=None, arg3=None) -> None:
+        """ message: constant str, the args are formatted only when the ring is dumped
+        """
+        self._ring.add(self, message, arg1, arg2, arg3)
+
+
+MAIN_TRACE = Trace('main')
+UART_TRACE = Trace('uart')
+MOUSE_TRACE = Trace('mouse')
@@ -10,7 +10,9 @@ import busio
 from digitalio import DigitalInOut
 
 from base import TimeInMs
+from clockskew import ClockSkewEstimator
 from keyboardhalf import VKeyPressEvent
+from tracing import UART_TRACE, TraceLevel
 
 # TRRS standard assignment (ChatGPT):
 #   Tip: TX
@@ -24,6 +26,8 @@ _BAUDRATE = 115200  # must be the same for both sides
 _START_BYTES = b'\x07'
 _MOUSE_BYTES = b'\x02'
 _KEY_EVENT_BYTES = b'\x03'
+_SPECULATIVE_KEY_EVENT_BYTES = b'\x04'  # speculative press or rollback
+# key event: event bytes, signed vkey serial (1 byte), time of the right half (2 bytes, ms & 0xFFFF, big endian)
 
 
 class MouseMove:
@@ -58,49 +62,63 @@ class UartBase:
 class RightUart(UartBase):
 
     def write_mouse_move(self, dx: int, dy: int) -> None:
-        print(f'write_mouse_move(dx: {type(dx)} = {dx}, dy: {type(dy)} = {dy}')
         x_bytes = dx.to_bytes(1, 'big', signed=True)
         y_bytes = dy.to_bytes(1, 'big', signed=True)
         data = _MOUSE_BYTES + x_bytes + y_bytes
-        print(f'uart write {data}...')
+        if UART_TRACE.level >= TraceLevel.DEBUG:
+            UART_TRACE.write('write mouse', dx, dy)
         self._uart.write(data)
 
-    def write_vkey_events(self, vkey_events: list[VKeyPressEvent]) -> None:
+    def write_vkey_events(self, vkey_events: list[VKeyPressEvent], time: TimeInMs) -> None:
+        time_bytes = (int(time) & 0xFFFF).to_bytes(2, 'big')
         for vkey_evt in vkey_events:
             if vkey_evt.pressed:
                 signed_serial = vkey_evt.vkey_serial
             else:
                 signed_serial = -vkey_evt.vkey_serial
 
-            print(f'uart signed_serial={signed_serial}')
             vkey_bytes = signed_serial.to_bytes(1, 'big', signed=True)
-            data = _KEY_EVENT_BYTES + vkey_bytes
+            event_bytes = _SPECULATIVE_KEY_EVENT_BYTES if vkey_evt.speculative else _KEY_EVENT_BYTES
+            data = event_bytes + vkey_bytes + time_bytes
 
-            print(f'uart write {data}...')
+            if UART_TRACE.level >= TraceLevel.DEBUG:
+                UART_TRACE.write('write key event', signed_serial, vkey_evt.speculative)
             self._uart.write(data)
 
 
 class LeftUart(UartBase):
 
-    def read_items(self) -> Iterator[MouseMove | VKeyPressEvent]:
+    def __init__(self, tx, rx):
+        super().__init__(tx, rx)
+        self._clock_skew = ClockSkewEstimator()
+
+    def read_items(self, time: TimeInMs) -> Iterator[MouseMove | VKeyPressEvent]:
+        """ time: local time of the read, the key events get their time in the local clock
+        """
         while self._uart.in_waiting > 0:
             read_1st_bytes = self._uart.read(1)
             if read_1st_bytes == _START_BYTES:
                 continue
             elif read_1st_bytes == _MOUSE_BYTES:
                 byte1, byte2 = self._uart.read(2)
-                print(f'uart readd mouse: byte1={byte1}, byte2={byte2}')
                 dx = byte1 if byte1 < 128 else byte1 - 256
                 dy = byte2 if byte2 < 128 else byte2 - 256
-                print(f'uart read mouse: dx={dx}, dy={dy}')
+                if UART_TRACE.level >= TraceLevel.DEBUG:
+                    UART_TRACE.write('read mouse', dx, dy)
                 yield MouseMove(-dx, -dy)
-            elif read_1st_bytes == _KEY_EVENT_BYTES:
-                read_bytes = self._uart.read(1)
+            elif read_1st_bytes == _KEY_EVENT_BYTES or read_1st_bytes == _SPECULATIVE_KEY_EVENT_BYTES:
+                read_bytes = self._uart.read(3)
                 byte1 = read_bytes[0]
                 signed_value = byte1 if byte1 < 128 else byte1 - 256
                 vkey_serial = abs(signed_value)
                 pressed = (signed_value > 0)
-                print(f'uart read key event: {vkey_serial} {pressed}')
-                yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=pressed)
+                speculative = (read_1st_bytes == _SPECULATIVE_KEY_EVENT_BYTES)
+                remote_time16 = (read_bytes[1] << 8) | read_bytes[2]
+                event_time = self._clock_skew.to_local_time(remote_time16, receive_time=time)
+                if UART_TRACE.level >= TraceLevel.DEBUG:
+                    UART_TRACE.write('read key event', signed_value, speculative, event_time)
+                yield VKeyPressEvent(vkey_serial=vkey_serial, pressed=pressed, speculative=speculative,
+                                     time=event_time)
             else:
-                print(f'uart read unknown byte: {read_1st_bytes}')
+                if UART_TRACE.level >= TraceLevel.ERROR:
+                    UART_TRACE.write('read unknown byte', read_1st_bytes)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from base import TimeInMs, KeyCode, VirtualKeySerial
+from fixedkeylist import FixedKeyList
 from keyboardhalf import VKeyPressEvent
-from reactions import KeyCmdKind, KeyCmd, OneKeyReactions, ReactionCmd
+from reactions import Opcode, OneKeyReactions, ReactionCode, make_reaction_code
 
 try:
     from typing import Iterator
@@ -10,18 +11,39 @@ except ImportError:
     pass
 
 
-Layer = dict  # dict[VirtualKeySerial, OneKeyReactions]
+Layer = list  # list[OneKeyReactions | None], indexed by VirtualKeySerial (None: not set)
+
+
+class TapHoldStrategy:  # enum
+    """ decides an undecided tap/hold key before TAP_HOLD_TERM (s. https://docs.qmk.fm/tap_hold)
+
+        In all strategies the release of the key means tap and TAP_HOLD_TERM means hold.
+    """
+    HOLD_ON_OTHER_KEY_PRESS = 0  # hold, as soon as another key is pressed
+    PERMISSIVE_HOLD = 1  # hold, if another key is pressed and released (tapped)
+    TAP_PREFERRED = 2  # hold only after TAP_HOLD_TERM
+    RETRO_TAPPING = 3  # like PERMISSIVE_HOLD, but a hold without other keys is a tap at the end
+
+
+class VirtualKeyType:  # enum, index into the handler tables of VirtualKeyboard
+    SIMPLE = 0
+    MOD = 1
+    LAYER = 2
 
 
 class VirtualKey:
+    key_type = -1  # VirtualKeyType
 
     def __init__(self, serial: VirtualKeySerial):
         # public
         self.serial = serial
         self.last_press_time: TimeInMs = -1
+        self.speculative_reactions: OneKeyReactions | None = None  # sent on a speculative press, not confirmed yet
+        self.pressed_reactions: OneKeyReactions | None = None  # taken from the layer at the press, for the release
 
 
 class SimpleKey(VirtualKey):
+    key_type = VirtualKeyType.SIMPLE
 
     def __init__(self, serial: VirtualKeySerial):
         super().__init__(serial=serial)
@@ -30,14 +52,24 @@ class SimpleKey(VirtualKey):
 class TapHoldKey(VirtualKey):
     TAP_HOLD_TERM = 200  # ms
 
-    def __init__(self, serial: VirtualKeySerial):
+    def __init__(self, serial: VirtualKeySerial, strategy: int = TapHoldStrategy.PERMISSIVE_HOLD):
         super().__init__(serial=serial)
+        self._strategy = strategy
+
+        # public
+        self.press_count = 0  # VirtualKeyboard press count at the press of this key
+
+    @property
+    def strategy(self) -> int:
+        return self._strategy
 
 
 class ModKey(TapHoldKey):
+    key_type = VirtualKeyType.MOD
 
-    def __init__(self, serial: VirtualKeySerial, mod_key_code: KeyCode):
-        super().__init__(serial=serial)
+    def __init__(self, serial: VirtualKeySerial, mod_key_code: KeyCode,
+                 strategy: int = TapHoldStrategy.PERMISSIVE_HOLD):
+        super().__init__(serial=serial, strategy=strategy)
         self._mod_key_code = mod_key_code
 
     @property
@@ -46,211 +78,597 @@ class ModKey(TapHoldKey):
 
 
 class LayerKey(TapHoldKey):
+    key_type = VirtualKeyType.LAYER
 
-    def __init__(self, serial: VirtualKeySerial, layer: Layer):
-        super().__init__(serial=serial)
+    def __init__(self, serial: VirtualKeySerial, layer: Layer, strategy: int = TapHoldStrategy.PERMISSIVE_HOLD):
+        super().__init__(serial=serial, strategy=strategy)
 
         # public
         self.layer = layer
 
 
+def create_flat_layer(reactions: dict[VirtualKeySerial, OneKeyReactions], num_vkeys: int) -> Layer:
+    layer: Layer = [None] * num_vkeys
+    for vkey_serial, one_key_reactions in reactions.items():
+        layer[vkey_serial] = one_key_reactions
+    return layer
+
+
+def create_layer_tables(default_layer: Layer, layers: list[Layer], max_depth: int) -> list[Layer | None]:
+    """ stack code -> merged layer (None: no valid stack)
+
+        The stack code of the layers with the indices i0 (bottom), i1, ... is i0 + i1 * base + ...
+        with base = len(layers) + 1 and the layer index 1, 2, ... (the empty stack has code 0).
+        A reaction not set in an upper layer ('·') falls through to the lower layers and to the default layer.
+    """
+    base = len(layers) + 1
+    tables: list[Layer | None] = [None] * (base ** max_depth)
+    tables[0] = default_layer
+
+    def add_tables(code: int, weight: int, depth: int, merged_layer: Layer, used_indices: set[int]) -> None:
+        if depth == max_depth:
+            return
+        for layer_index in range(1, base):
+            if layer_index in used_indices:
+                continue
+            stack_code = code + layer_index * weight
+            stack_layer = [lower if upper is None else upper
+                           for lower, upper in zip(merged_layer, layers[layer_index - 1])]
+            tables[stack_code] = stack_layer
+            add_tables(stack_code, weight * base, depth + 1, stack_layer, used_indices | {layer_index})
+
+    add_tables(0, 1, 0, default_layer, set())
+    return tables
+
+
+def create_independent_keys(layer_tables: list[Layer | None], simple_keys: list[SimpleKey],
+                            mod_keys: list[ModKey], layer_keys: list[LayerKey],
+                            max_depth: int) -> list[bytes | None]:
+    """ tap/hold vkey serial -> bit table of the simple keys, whose reactions do not depend on the tap/hold
+        decision of this key (bit (serial & 7) of byte (serial >> 3)), None: no tap/hold key
+
+        Proven for every reachable layer stack:
+        - the tap of the tap/hold key sends nothing (otherwise the order of the reactions would change)
+        - mod key: the simple key has no reaction (every reaction could be modified)
+        - layer key: the simple key has the same reaction with and without this layer on top of the stack
+    """
+    num_vkeys = len(layer_tables[0])
+    base = len(layer_keys) + 1
+    valid_codes = [code for code in range(len(layer_tables)) if layer_tables[code] is not None]
+    layer_indices = {layer_key.serial: layer_index for layer_index, layer_key in enumerate(layer_keys, 1)}
+
+    def stack_indices(code: int) -> list[int]:
+        indices = []
+        while code > 0:
+            indices.append(code % base)
+            code //= base
+        return indices
+
+    def is_independent(simple_serial: VirtualKeySerial, layer_index: int) -> bool:
+        if layer_index == 0:  # mod key
+            return all(layer_tables[code][simple_serial] is None for code in valid_codes)
+
+        for code in valid_codes:
+            indices = stack_indices(code)
+            if len(indices) == max_depth or layer_index in indices:
+                continue  # the layer key would be ignored
+            upper_code = code + layer_index * base ** len(indices)
+            if not _is_same_reaction(layer_tables[code][simple_serial], layer_tables[upper_code][simple_serial]):
+                return False
+        return True
+
+    independent_keys: list[bytes | None] = [None] * num_vkeys
+    for tap_hold_key in mod_keys + layer_keys:
+        bits = bytearray((num_vkeys + 7) >> 3)
+        tap_sends_nothing = all(layer_tables[code][tap_hold_key.serial] is None for code in valid_codes)
+        if tap_sends_nothing:
+            for simple_key in simple_keys:
+                serial = simple_key.serial
+                if is_independent(serial, layer_indices.get(tap_hold_key.serial, 0)):
+                    bits[serial >> 3] |= 1 << (serial & 7)
+        independent_keys[tap_hold_key.serial] = bytes(bits)
+
+    return independent_keys
+
+
+def _is_same_reaction(reactions1: OneKeyReactions | None, reactions2: OneKeyReactions | None) -> bool:
+    if reactions1 is reactions2:
+        return True
+    if reactions1 is None or reactions2 is None:
+        return False
+    return (list(reactions1.on_press_reaction_codes) == list(reactions2.on_press_reaction_codes)
+            and list(reactions1.on_release_reaction_codes) == list(reactions2.on_release_reaction_codes))
+
+
 class VirtualKeyboard:
+    """ Every tap/hold key decides by its TapHoldStrategy. While a tap/hold key is undecided, the press and
+        release events of the simple keys pressed later are deferred. They are sent in their order, as soon as
+        no tap/hold key pressed before them is undecided.
+
+        Speculative presses of simple keys are sent at once, if their reaction can be undone
+        (OneKeyReactions.on_undo_reaction_codes) and no tap/hold key is undecided. Otherwise they are ignored
+        and the key waits for the confirmation (normal press).
+
+        The undecided keys and deferred events are kept in FixedKeyLists (capacity from the number of keys),
+        so a tap/hold decision allocates no memory.
+
+        Typing streak: a tap/hold key pressed within TYPING_STREAK_TERM after the last tap is a tap at once
+        (only if no other tap/hold key is undecided).
+
+        The held layer keys form a layer stack (up to MAX_LAYER_STACK_DEPTH, more are ignored). For every
+        stack a merged layer is precomputed (s. create_layer_tables()). The layers are flat lists and the static
+        data of the keys (type, mod key code, layer index) are kept in parallel arrays, all indexed by the vkey
+        serial (dense small ints), so a key event needs no dict lookup.
+        A simple key takes its reactions at the press (after the deferral) and uses them for the release.
+    """
+    TYPING_STREAK_TERM = 100  # ms, 0: off
+    MAX_LAYER_STACK_DEPTH = 2
 
     def __init__(self, simple_keys: list[SimpleKey], mod_keys: list[ModKey], layer_keys: list[LayerKey],
-                 default_layer: Layer):
+                 default_layer: Layer, layer_tables: list[Layer | None] | None = None,
+                 independent_keys: list[bytes | None] | None = None):
+        """
+            default_layer: its length is the number of vkey serials (s. create_flat_layer())
+            layer_tables: from create_layer_tables() with the layers of layer_keys (default: created here)
+            independent_keys: from create_independent_keys() (default: created here)
+        """
         self._simple_keys = simple_keys
         self._mod_keys = mod_keys
         self._layer_keys = layer_keys
-        self._all_keys = {key.serial: key for key in simple_keys + mod_keys + layer_keys}
         self._default_layer = default_layer
 
-        self._cur_layer = default_layer
-        self._undecided_tap_hold_keys: list[TapHoldKey] = []
-        self._deferred_simple_keys: list[SimpleKey] = []  # wait for Tap/Hold decision
+        # vkey serial -> ...
+        num_vkeys = len(default_layer)
+        self._all_keys: list[VirtualKey | None] = [None] * num_vkeys
+        self._key_types = bytearray(num_vkeys)  # VirtualKeyType
+        self._mod_key_codes = bytearray(num_vkeys)  # ModKey only
+        self._layer_indices = bytearray(num_vkeys)  # LayerKey only: 1, 2, ...
+        for key in simple_keys + mod_keys + layer_keys:
+            self._all_keys[key.serial] = key
+            self._key_types[key.serial] = key.key_type
+        for mod_key in mod_keys:
+            self._mod_key_codes[mod_key.serial] = mod_key.mod_key_code
+        for layer_index, layer_key in enumerate(layer_keys, 1):
+            self._layer_indices[layer_key.serial] = layer_index
+
+        if layer_tables is None:
+            layer_tables = create_layer_tables(default_layer, [layer_key.layer for layer_key in layer_keys],
+                                               self.MAX_LAYER_STACK_DEPTH)
+        self._layer_tables = layer_tables
+        if independent_keys is None:
+            independent_keys = create_independent_keys(layer_tables, simple_keys, mod_keys, layer_keys,
+                                                       self.MAX_LAYER_STACK_DEPTH)
+        self._independent_keys = independent_keys
+        self._layer_stack_base = len(layer_keys) + 1
+        self._layer_stack = FixedKeyList(capacity=self.MAX_LAYER_STACK_DEPTH)  # of LayerKey, bottom first
+        self._cur_layer = default_layer  # == self._layer_tables[stack code]
+        self._num_holding_mod_keys = 0
+        num_keys = len(simple_keys) + len(mod_keys) + len(layer_keys)
+        self._undecided_tap_hold_keys = FixedKeyList(capacity=num_keys)  # of TapHoldKey
+        # press and release events of SimpleKeys, wait for Tap/Hold decision
+        self._deferred_simple_key_events = FixedKeyList(capacity=2 * num_keys)
         self._next_decision_time: TimeInMs | None = None
+        self._last_event_time: TimeInMs = 0.0
+        self._press_count = 0  # all presses (for RETRO_TAPPING)
+        self._last_tap_release_time: TimeInMs = -self.TYPING_STREAK_TERM  # typing streak
+        self._streak_tap_keys_mask = 0  # bit (1 << vkey serial): tap/hold key pressed as tap in a typing streak
+
+        self._num_speculations = 0
+        self._num_rollbacks = 0
 
-    def update(self, time: TimeInMs, vkey_events: list[VKeyPressEvent]) -> Iterator[ReactionCmd]:
+        # VirtualKeyType -> handler (no isinstance() on the hot path)
+        self._vkey_event_handlers = [self._update_simple_key_event,  # SIMPLE
+                                     self._update_tap_hold_key_event,  # MOD
+                                     self._update_tap_hold_key_event]  # LAYER
+
+    @property
+    def simple_keys(self) -> list[SimpleKey]:
+        return self._simple_keys
+
+    @property
+    def mod_keys(self) -> list[ModKey]:
+        return self._mod_keys
+
+    @property
+    def layer_keys(self) -> list[LayerKey]:
+        return self._layer_keys
+
+    @property
+    def layer_tables(self) -> list[Layer | None]:
+        return self._layer_tables
+
+    @property
+    def independent_keys(self) -> list[bytes | None]:
+        return self._independent_keys
+
+    @property
+    def next_decision_time(self) -> TimeInMs | None:
+        """ update() must be called at this time even without events (None: only with events)
+        """
+        return self._next_decision_time
+
+    @property
+    def num_speculations(self) -> int:
+        return self._num_speculations
+
+    @property
+    def num_rollbacks(self) -> int:
+        return self._num_rollbacks
+
+    def update(self, time: TimeInMs, vkey_events: list[VKeyPressEvent],
+               events_time: TimeInMs | None = None) -> Iterator[ReactionCode]:
+        """ yields reaction codes (s. reactions.Opcode, readable by reactions.decode_reaction_codes())
+
+            events_time: the time of the vkey_events without an own time (None: time),
+                         so the shared events of the KeyGroups are not changed
+        """
         if len(vkey_events) == 0 and (self._next_decision_time is None or self._next_decision_time > time):
             return  # too early
 
+        if events_time is None:
+            events_time = time
+        for vkey_event in self._sorted_vkey_events(vkey_events, events_time):
+            # the events of both halves in press order, every event at its own time
+            event_time = vkey_event.time
+            if event_time is None:
+                event_time = events_time
+            if event_time > time:
+                event_time = time
+            if event_time < self._last_event_time:
+                event_time = self._last_event_time  # decisions before are already made
+            self._last_event_time = event_time
+
+            yield from self._update_by_time(event_time)
+            yield from self._update_vkey_event(event_time, vkey_event)
+
         yield from self._update_by_time(time)
+        self._last_event_time = time
+
+        self._next_decision_time = self._get_next_decision_time()
 
-        for vkey_event in self._sorted_vkey_events(vkey_events):
-            yield from self._update_vkey_event(time, vkey_event)
+    def _get_next_decision_time(self) -> TimeInMs | None:
+        undecided_keys = self._undecided_tap_hold_keys
+        if len(undecided_keys) == 0:
+            return None
 
-        self._next_decision_time = min((vkey.last_press_time + TapHoldKey.TAP_HOLD_TERM
-                                        for vkey in self._undecided_tap_hold_keys),
-                                        default=None)
+        oldest_press_time = undecided_keys[0].last_press_time
+        for i in range(1, len(undecided_keys)):
+            if undecided_keys[i].last_press_time < oldest_press_time:
+                oldest_press_time = undecided_keys[i].last_press_time
+        return oldest_press_time + TapHoldKey.TAP_HOLD_TERM
 
-    def _sorted_vkey_events(self, vkey_events: list[VKeyPressEvent]) -> Iterator[VKeyPressEvent]:
-        yield from vkey_events   # todo: implement it correct
+    @staticmethod
+    def _sorted_vkey_events(vkey_events: list[VKeyPressEvent], events_time: TimeInMs) -> list[VKeyPressEvent]:
+        """ stable sorted by time (events without time at events_time)
 
-    def _update_by_time(self, time: TimeInMs) -> Iterator[ReactionCmd]:
+            Insertion sort: the lists are short and nearly sorted, and list.sort() of CircuitPython is not stable.
+        """
+        if len(vkey_events) < 2:
+            return vkey_events
+
+        sorted_events = list(vkey_events)
+        for i in range(1, len(sorted_events)):
+            vkey_event = sorted_events[i]
+            event_time = events_time if vkey_event.time is None else vkey_event.time
+            j = i
+            while j > 0:
+                prev_time = sorted_events[j - 1].time
+                if prev_time is None:
+                    prev_time = events_time
+                if prev_time <= event_time:
+                    break
+                sorted_events[j] = sorted_events[j - 1]
+                j -= 1
+            sorted_events[j] = vkey_event
+        return sorted_events
+
+    def _update_by_time(self, time: TimeInMs) -> Iterator[ReactionCode]:
         """
             tap/hold: undecided -> hold
             simple: deferred -> press
         """
         # tap/hold: undecided -> hold
-        tap_hold_key_press_times: list[TimeInMs] = []
-        tap_hold_keys_to_remove: list[TapHoldKey] = []
+        undecided_keys = self._undecided_tap_hold_keys
 
-        for tap_hold_key in self._undecided_tap_hold_keys:
+        for i in range(len(undecided_keys)):
+            tap_hold_key = undecided_keys[i]
             if time - tap_hold_key.last_press_time >= TapHoldKey.TAP_HOLD_TERM:
                 yield from self._on_begin_holding_reaction(tap_hold_key)
-                tap_hold_key_press_times.append(tap_hold_key.last_press_time)
-                tap_hold_keys_to_remove.append(tap_hold_key)
+                undecided_keys.mark(i)
 
-        for tap_hold_key in tap_hold_keys_to_remove:
-            self._undecided_tap_hold_keys.remove(tap_hold_key)
+        undecided_keys.compact()
 
         # simple: deferred -> press
-        if len(tap_hold_key_press_times) > 0:
-            oldest_tap_hold_key_press_time = min(tap_hold_key_press_times)
-            simple_keys_to_remove: list[SimpleKey] = []
+        yield from self._send_deferred_simple_key_events()
+
+    def _decide_holds(self, pressed_before: TimeInMs | None, strategies_mask: int) -> Iterator[ReactionCode]:
+        """
+            tap/hold: undecided -> hold, if pressed before (None: all) and the strategy is in strategies_mask
+                      (bit (1 << strategy))
+        """
+        undecided_keys = self._undecided_tap_hold_keys
 
-            for simple_key in self._deferred_simple_keys:
-                if simple_key.last_press_time > oldest_tap_hold_key_press_time:
-                    one_key_reactions = self._cur_layer.get(simple_key.serial)  # for simplifying, take current layer
-                    if one_key_reactions:
-                        yield from one_key_reactions.on_press_key_reaction_commands
-                    simple_keys_to_remove.append(simple_key)
+        for i in range(len(undecided_keys)):
+            tap_hold_key = undecided_keys[i]
+            if ((pressed_before is None or tap_hold_key.last_press_time < pressed_before)
+                    and strategies_mask & (1 << tap_hold_key.strategy)):
+                yield from self._on_begin_holding_reaction(tap_hold_key)
+                undecided_keys.mark(i)
 
-            for simple_key in simple_keys_to_remove:
-                self._deferred_simple_keys.remove(simple_key)
+        undecided_keys.compact()
 
-    def _update_vkey_event(self, time: TimeInMs, vkey_event: VKeyPressEvent) -> Iterator[ReactionCmd]:
-        vkey_serial = vkey_event.vkey_serial
-        vkey = self._all_keys[vkey_serial]
+    def _on_other_key_press(self) -> Iterator[ReactionCode]:
+        self._press_count += 1
+        if len(self._undecided_tap_hold_keys) > 0:
+            yield from self._decide_holds(pressed_before=None, strategies_mask=_ON_OTHER_KEY_PRESS_MASK)
 
-        if isinstance(vkey, TapHoldKey):
-            if vkey_event.pressed:
-                self._on_begin_press_tap_hold_key(vkey)
-                vkey.last_press_time = time
+    def _on_other_key_tap(self, key: VirtualKey) -> Iterator[ReactionCode]:
+        if len(self._undecided_tap_hold_keys) > 0:
+            yield from self._decide_holds(pressed_before=key.last_press_time, strategies_mask=_ON_OTHER_KEY_TAP_MASK)
+
+    def _send_deferred_simple_key_events(self) -> Iterator[ReactionCode]:
+        """
+            simple: deferred -> press or release,
+                    if no tap/hold key pressed before the event is undecided
+        """
+        undecided_keys = self._undecided_tap_hold_keys
+        oldest_undecided_press_time: TimeInMs | None = None
+        for i in range(len(undecided_keys)):
+            press_time = undecided_keys[i].last_press_time
+            if oldest_undecided_press_time is None or press_time < oldest_undecided_press_time:
+                oldest_undecided_press_time = press_time
+
+        deferred_events = self._deferred_simple_key_events
+
+        for i in range(len(deferred_events)):
+            if oldest_undecided_press_time is not None and deferred_events.get_time(i) >= oldest_undecided_press_time:
+                break  # this and all later events wait
+
+            simple_key = deferred_events[i]
+            if deferred_events.is_pressed(i):
+                one_key_reactions = self._cur_layer[simple_key.serial]
+                simple_key.pressed_reactions = one_key_reactions
+                if one_key_reactions:
+                    yield from one_key_reactions.on_press_reaction_codes
             else:
-                yield from self._on_end_press_tap_hold_key(vkey)
+                one_key_reactions = simple_key.pressed_reactions
+                simple_key.pressed_reactions = None
+                if one_key_reactions:
+                    yield from one_key_reactions.on_release_reaction_codes
+            deferred_events.mark(i)
+
+        deferred_events.compact()
+
+    def _defer_simple_key_event(self, time: TimeInMs, simple_key: SimpleKey, pressed: bool
+                                ) -> Iterator[ReactionCode]:
+        if self._deferred_simple_key_events.is_full:
+            # too many events within TAP_HOLD_TERM: decide all as hold
+            yield from self._decide_holds(pressed_before=None, strategies_mask=_ALL_STRATEGIES_MASK)
+            yield from self._send_deferred_simple_key_events()
 
-        elif isinstance(vkey, SimpleKey):
+        self._deferred_simple_key_events.append(simple_key, time=time, pressed=pressed)
+        yield from self._send_deferred_simple_key_events()
+
+    def _update_vkey_event(self, time: TimeInMs, vkey_event: VKeyPressEvent) -> Iterator[ReactionCode]:
+        vkey_serial = vkey_event.vkey_serial
+        yield from self._vkey_event_handlers[self._key_types[vkey_serial]](time, self._all_keys[vkey_serial],
+                                                                          vkey_event)
+
+    def _update_tap_hold_key_event(self, time: TimeInMs, tap_hold_key: TapHoldKey,
+                                   vkey_event: VKeyPressEvent) -> Iterator[ReactionCode]:
+        if vkey_event.speculative:
+            return  # tap/hold keys wait for the confirmation
+        if vkey_event.pressed:
+            yield from self._on_begin_press_tap_hold_key(time, tap_hold_key)
+        else:
+            yield from self._on_end_press_tap_hold_key(time, tap_hold_key)
+
+    def _update_simple_key_event(self, time: TimeInMs, simple_key: SimpleKey,
+                                 vkey_event: VKeyPressEvent) -> Iterator[ReactionCode]:
+        if vkey_event.speculative:
             if vkey_event.pressed:
-                yield from self._on_begin_press_simple_key(vkey)
-                vkey.last_press_time = time
+                yield from self._on_speculative_press_simple_key(time, simple_key)
+            else:
+                yield from self._on_rollback_simple_key(simple_key)
+        elif vkey_event.pressed:
+            if simple_key.speculative_reactions is not None:
+                # confirmed: already pressed
+                simple_key.pressed_reactions = simple_key.speculative_reactions
+                simple_key.speculative_reactions = None
+                self._press_count += 1
             else:
-                yield from self._on_end_press_simple_key(vkey)
+                yield from self._on_begin_press_simple_key(time, simple_key)
+        else:
+            yield from self._on_end_press_simple_key(time, simple_key)
 
-    def _on_begin_press_tap_hold_key(self, tap_hold_key: TapHoldKey) -> None:
+    def _on_begin_press_tap_hold_key(self, time: TimeInMs, tap_hold_key: TapHoldKey) -> Iterator[ReactionCode]:
         """
-            tap/hold: inactive -> undecided
+            other tap/hold: undecided -> hold (HOLD_ON_OTHER_KEY_PRESS)
+            tap/hold: inactive -> undecided or streak tap
         """
-        self._undecided_tap_hold_keys.append(tap_hold_key)
+        yield from self._on_other_key_press()
+        yield from self._send_deferred_simple_key_events()
+
+        tap_hold_key.last_press_time = time
+        tap_hold_key.press_count = self._press_count
+
+        if (time - self._last_tap_release_time < self.TYPING_STREAK_TERM
+                and len(self._undecided_tap_hold_keys) == 0):
+            # tap/hold: -> streak tap (press)
+            self._streak_tap_keys_mask |= 1 << tap_hold_key.serial
+            one_key_reactions = self._cur_layer[tap_hold_key.serial]
+            tap_hold_key.pressed_reactions = one_key_reactions
+            if one_key_reactions:
+                yield from one_key_reactions.on_press_reaction_codes
+        else:
+            self._undecided_tap_hold_keys.append(tap_hold_key)
 
-    def _on_end_press_tap_hold_key(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCmd]:
+    def _on_end_press_tap_hold_key(self, time: TimeInMs, tap_hold_key: TapHoldKey) -> Iterator[ReactionCode]:
         """
-            tap/hold: undecided -> tap (press + release) + simple: deferred -> press
-                      hold -> inactive
+            tap/hold: undecided -> tap (press + release) + other tap/hold: undecided -> hold (PERMISSIVE_HOLD)
+                                                         + simple: deferred -> press
+                      streak tap -> release
+                      hold -> inactive (RETRO_TAPPING: + tap)
         """
-        if tap_hold_key in self._undecided_tap_hold_keys:
-            # tap/hold: tap (press + release)
-            one_key_reactions = self._cur_layer.get(tap_hold_key.serial)  # for simplifying, take current layer
+        streak_tap_key_bit = 1 << tap_hold_key.serial
+        if self._streak_tap_keys_mask & streak_tap_key_bit:
+            # tap/hold: streak tap -> release
+            self._streak_tap_keys_mask &= ~streak_tap_key_bit
+            self._last_tap_release_time = time
+            one_key_reactions = tap_hold_key.pressed_reactions
+            tap_hold_key.pressed_reactions = None
             if one_key_reactions:
-                yield from one_key_reactions.on_press_key_reaction_commands
-                yield from one_key_reactions.on_release_key_reaction_commands
+                yield from one_key_reactions.on_release_reaction_codes
+            return
 
-            self._undecided_tap_hold_keys.remove(tap_hold_key)
+        undecided_index = self._undecided_tap_hold_keys.index(tap_hold_key)
+        if undecided_index >= 0:
+            self._last_tap_release_time = time
 
-            # simple: deferred -> press
-            simple_keys_to_remove: list[SimpleKey] = []
+            self._undecided_tap_hold_keys.mark(undecided_index)
+            self._undecided_tap_hold_keys.compact()
 
-            for simple_key in self._deferred_simple_keys:
-                if simple_key.last_press_time > tap_hold_key.last_press_time:
-                    # simple: -> press
-                    one_key_reactions = self._cur_layer.get(simple_key.serial)  # for simplifying, take current layer
-                    if one_key_reactions:
-                        yield from one_key_reactions.on_press_key_reaction_commands
-                    simple_keys_to_remove.append(simple_key)
+            # other tap/hold: undecided -> hold
+            yield from self._on_other_key_tap(tap_hold_key)
 
-            for simple_key in simple_keys_to_remove:
-                self._deferred_simple_keys.remove(simple_key)
+            # tap/hold: tap (press + release)
+            yield from self._tap_reaction(tap_hold_key)
+
+            # simple: deferred -> press
+            yield from self._send_deferred_simple_key_events()
 
         else:  # was hold
             # tap/hold: hold -> inactive
             yield from self._on_end_holding_reaction(tap_hold_key)
 
-    def _on_begin_press_simple_key(self, simple_key: SimpleKey) -> Iterator[ReactionCmd]:
+            if tap_hold_key.strategy == TapHoldStrategy.RETRO_TAPPING and tap_hold_key.press_count == self._press_count:
+                yield from self._tap_reaction(tap_hold_key)
+
+    def _tap_reaction(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCode]:
+        one_key_reactions = self._cur_layer[tap_hold_key.serial]
+        if one_key_reactions:
+            yield from one_key_reactions.on_press_reaction_codes
+            yield from one_key_reactions.on_release_reaction_codes
+
+    def _on_begin_press_simple_key(self, time: TimeInMs, simple_key: SimpleKey) -> Iterator[ReactionCode]:
         """
+             tap/hold: undecided -> hold (HOLD_ON_OTHER_KEY_PRESS)
              simple: inactive -> press or deferred
         """
-        if len(self._undecided_tap_hold_keys) > 0:
+        yield from self._on_other_key_press()
+        simple_key.last_press_time = time
+
+        if len(self._undecided_tap_hold_keys) > 0 and not (len(self._deferred_simple_key_events) == 0
+                                                           and self._is_decision_independent(simple_key)):
             # simple: -> deferred
-            self._deferred_simple_keys.append(simple_key)
+            yield from self._defer_simple_key_event(time, simple_key, pressed=True)
         else:
             # simple: -> press
-            one_key_reactions = self._cur_layer.get(simple_key.serial)  # for simplifying, take current layer
+            yield from self._send_deferred_simple_key_events()
+            one_key_reactions = self._cur_layer[simple_key.serial]
+            simple_key.pressed_reactions = one_key_reactions
             if one_key_reactions:
-                yield from one_key_reactions.on_press_key_reaction_commands
+                yield from one_key_reactions.on_press_reaction_codes
 
-    def _on_end_press_simple_key(self, simple_key: SimpleKey) -> Iterator[ReactionCmd]:
+    def _is_decision_independent(self, simple_key: SimpleKey) -> bool:
+        """ True: the reaction of the simple key is the same for every decision of the undecided tap/hold keys
         """
-            tap/hold: undecided -> hold   # Permissive Hold (s. https://docs.qmk.fm/tap_hold)
-            simple: deferred -> press + release
-                    pressed -> release
+        serial = simple_key.serial
+        byte_index = serial >> 3
+        bit = 1 << (serial & 7)
+        undecided_keys = self._undecided_tap_hold_keys
+        for i in range(len(undecided_keys)):
+            if not self._independent_keys[undecided_keys[i].serial][byte_index] & bit:
+                return False
+        return True
+
+    def _on_speculative_press_simple_key(self, time: TimeInMs, simple_key: SimpleKey) -> Iterator[ReactionCode]:
         """
-        # tap/hold: undecided -> hold
-        tap_hold_key_press_times: list[TimeInMs] = []
-        tap_hold_keys_to_remove: list[TapHoldKey] = []
-
-        for tap_hold_key in self._undecided_tap_hold_keys:
-            if tap_hold_key.last_press_time < simple_key.last_press_time:
-                yield from self._on_begin_holding_reaction(tap_hold_key)
-                tap_hold_key_press_times.append(tap_hold_key.last_press_time)
-                tap_hold_keys_to_remove.append(tap_hold_key)
-
-        for tap_hold_key in tap_hold_keys_to_remove:
-            self._undecided_tap_hold_keys.remove(tap_hold_key)
+             simple: inactive -> press (if it can be undone)
+        """
+        if len(self._undecided_tap_hold_keys) > 0:
+            return  # it would be deferred -> wait for confirmation
+        if self._num_holding_mod_keys > 0 or len(self._layer_stack) > 0:
+            return  # the undo codes do not undo a modified or layer reaction -> wait for confirmation
 
-        # other simples: deferred -> press (cause tap/hold is decided now)
-        if len(tap_hold_key_press_times) > 0:
-            oldest_tap_hold_key_press_time = min(tap_hold_key_press_times)
-            simple_keys_to_remove: list[SimpleKey] = []
+        one_key_reactions = self._cur_layer[simple_key.serial]
+        if one_key_reactions is None or one_key_reactions.on_undo_reaction_codes is None:
+            return  # wait for confirmation
 
-            for simple_key2 in self._deferred_simple_keys:
-                if simple_key2.serial == simple_key.serial:
-                    continue  # this case will be later considered
+        simple_key.speculative_reactions = one_key_reactions
+        simple_key.last_press_time = time
+        self._num_speculations += 1
+        yield from one_key_reactions.on_press_reaction_codes
 
-                if simple_key2.last_press_time > oldest_tap_hold_key_press_time:
-                    # simple: -> press
-                    one_key_reactions = self._cur_layer.get(simple_key2.serial)  # for simplifying, take current layer
-                    if one_key_reactions:
-                        yield from one_key_reactions.on_press_key_reaction_commands
-                    simple_keys_to_remove.append(simple_key2)
+    def _on_rollback_simple_key(self, simple_key: SimpleKey) -> Iterator[ReactionCode]:
+        """
+             simple: speculative press -> release + undo
+        """
+        one_key_reactions = simple_key.speculative_reactions
+        if one_key_reactions is None:
+            return  # nothing sent
 
-            for simple_key2 in simple_keys_to_remove:
-                self._deferred_simple_keys.remove(simple_key2)
+        simple_key.speculative_reactions = None
+        self._num_rollbacks += 1
+        yield from one_key_reactions.on_release_reaction_codes
+        yield from one_key_reactions.on_undo_reaction_codes
 
-        # this simple:
-        one_key_reactions = self._cur_layer.get(simple_key.serial)  # for simplifying, take current layer
+    def _on_end_press_simple_key(self, time: TimeInMs, simple_key: SimpleKey) -> Iterator[ReactionCode]:
+        """
+            tap/hold: undecided -> hold (PERMISSIVE_HOLD, RETRO_TAPPING)
+            simple: deferred -> press + release (or still deferred)
+                    pressed -> release
+        """
+        self._last_tap_release_time = time
 
-        if simple_key in self._deferred_simple_keys:
-            # simple: deferred -> press + release
-            if one_key_reactions:
-                yield from one_key_reactions.on_press_key_reaction_commands
-                yield from one_key_reactions.on_release_key_reaction_commands
+        # tap/hold: undecided -> hold
+        yield from self._on_other_key_tap(simple_key)
 
-            self._deferred_simple_keys.remove(simple_key)
+        if self._deferred_simple_key_events.index(simple_key) >= 0:
+            # simple: deferred -> press + release (or still deferred)
+            yield from self._defer_simple_key_event(time, simple_key, pressed=False)
         else:
+            # other simples: deferred -> press (cause tap/hold is decided now)
+            yield from self._send_deferred_simple_key_events()
+
             # simple: pressed -> release
+            one_key_reactions = simple_key.pressed_reactions
+            simple_key.pressed_reactions = None
             if one_key_reactions:
-                yield from one_key_reactions.on_release_key_reaction_commands
-
-    def _on_begin_holding_reaction(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCmd]:
-        if isinstance(tap_hold_key, LayerKey):
-            layer_key = tap_hold_key
-            self._cur_layer = layer_key.layer
-        elif isinstance(tap_hold_key, ModKey):
-            mod_key = tap_hold_key
-            yield KeyCmd(kind=KeyCmdKind.KEY_PRESS, key_code=mod_key.mod_key_code)
-
-    def _on_end_holding_reaction(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCmd]:
-        if isinstance(tap_hold_key, LayerKey):
-            self._cur_layer = self._default_layer
-        elif isinstance(tap_hold_key, ModKey):
-            mod_key = tap_hold_key
-            yield KeyCmd(kind=KeyCmdKind.KEY_RELEASE, key_code=mod_key.mod_key_code)
+                yield from one_key_reactions.on_release_reaction_codes
+
+    def _on_begin_holding_reaction(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCode]:
+        vkey_serial = tap_hold_key.serial
+        if self._key_types[vkey_serial] == VirtualKeyType.MOD:
+            self._num_holding_mod_keys += 1
+            yield _KEY_PRESS_CODE | self._mod_key_codes[vkey_serial]
+        elif not self._layer_stack.is_full:
+            self._layer_stack.append(tap_hold_key)
+            self._update_cur_layer()
+
+    def _on_end_holding_reaction(self, tap_hold_key: TapHoldKey) -> Iterator[ReactionCode]:
+        vkey_serial = tap_hold_key.serial
+        if self._key_types[vkey_serial] == VirtualKeyType.MOD:
+            self._num_holding_mod_keys -= 1
+            yield _KEY_RELEASE_CODE | self._mod_key_codes[vkey_serial]
+        else:
+            stack_index = self._layer_stack.index(tap_hold_key)
+            if stack_index >= 0:
+                self._layer_stack.mark(stack_index)
+                self._layer_stack.compact()
+                self._update_cur_layer()
+
+    def _update_cur_layer(self) -> None:
+        stack_code = 0
+        weight = 1
+        for i in range(len(self._layer_stack)):
+            stack_code += self._layer_indices[self._layer_stack[i].serial] * weight
+            weight *= self._layer_stack_base
+        self._cur_layer = self._layer_tables[stack_code]
+
+
+_ON_OTHER_KEY_PRESS_MASK = 1 << TapHoldStrategy.HOLD_ON_OTHER_KEY_PRESS
+_ON_OTHER_KEY_TAP_MASK = (1 << TapHoldStrategy.PERMISSIVE_HOLD) | (1 << TapHoldStrategy.RETRO_TAPPING)
+_ALL_STRATEGIES_MASK = 0xF
+_KEY_PRESS_CODE = make_reaction_code(Opcode.KEY_PRESS)
+_KEY_RELEASE_CODE = make_reaction_code(Opcode.KEY_RELEASE)